@@ -0,0 +1,77 @@
+"""Compare two benchmark result files and flag regressions.
+
+    python benchmarks/compare.py benchmarks/results/base.json benchmarks/results/new.json [--threshold 0.15]
+
+A route regresses when its p50, p95 or p99 latency grows, or its
+requests/sec drops, by more than --threshold (default 15%). The exit
+status is 1 if anything regressed, so this can gate CI.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def change(old, new):
+    if not old or new is None:
+        return None
+    return (new - old) / old
+
+
+def compare(base, new, threshold):
+    rows, regressions = [], []
+    for route, b in base['routes'].items():
+        n = new['routes'].get(route)
+        if n is None:
+            continue
+        for key in LATENCY_KEYS + ('rps',):
+            delta = change(b.get(key), n.get(key))
+            worse = delta is not None and (delta < -threshold if key == 'rps' else delta > threshold)
+            rows.append((route, key, b.get(key), n.get(key), delta, worse))
+            if worse:
+                regressions.append((route, key, delta))
+        if n.get('errors', 0) > b.get('errors', 0):
+            regressions.append((route, 'errors', None))
+            rows.append((route, 'errors', b.get('errors', 0), n['errors'], None, True))
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare two benchmarks/run.py result files.')
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.15, help='allowed relative change (0.15 = 15%%)')
+    args = parser.parse_args(argv)
+
+    base, new = load(args.base), load(args.new)
+    for label, r in (('base', base), ('new', new)):
+        m = r['meta']
+        print(f'{label}: {m.get("commit")} {m["timestamp"]} {m["mode"]}/{m["backend"]} '
+              f'x{m["concurrency"]} dataset={m["dataset"]}')
+    for key in ('dataset', 'mode', 'backend', 'concurrency'):
+        if base['meta'][key] != new['meta'][key]:
+            print(f'warning: the runs used a different {key}')
+
+    rows, regressions = compare(base, new, args.threshold)
+    print(f'\n{"route":32} {"metric":7} {"base":>10} {"new":>10} {"change":>8}')
+    for route, key, old, cur, delta, worse in rows:
+        pct = f'{delta:+.1%}' if delta is not None else ''
+        print(f'{route:32} {key:7} {old!s:>10} {cur!s:>10} {pct:>8}{"  REGRESSION" if worse else ""}')
+    if base.get('startup_ms') and new.get('startup_ms'):
+        print(f'\nstartup: {base["startup_ms"]} ms -> {new["startup_ms"]} ms')
+
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.threshold:.0%}')
+        return 1
+    print(f'\nno regressions beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Generate a synthetic dataset in the app's own file formats.
+
+    python benchmarks/generate_data.py --scale medium --out /tmp/bench-medium
+
+Writes billsList.txt, users.json, publishes.json (+ publishes.next_id) and
+comments.jsonl into --out, plus manifest.json describing what was generated.
+The same --scale and --seed always produce the same files, so results from
+different runs are comparable. Point the app (or benchmarks/run.py) at the
+directory with DATABASE_DIR.
+"""
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+
+SCALES = {
+    'small': {'bills': 100, 'comments': 1_000, 'publishes': 1_000, 'users': 100},
+    'medium': {'bills': 10_000, 'comments': 100_000, 'publishes': 10_000, 'users': 1_000},
+    'large': {'bills': 100_000, 'comments': 1_000_000, 'publishes': 10_000, 'users': 10_000},
+}
+
+CATEGORIES = ['Healthcare', 'Housing', 'Economy', 'Education', 'Environment', 'Energy', 'Defense',
+              'Transportation', 'Technology', 'Agriculture', 'Immigration', 'Justice']
+
+WORDS = ('act reform tax credit relief public health care housing school student teacher clean energy '
+         'water air climate carbon grid rural farm small business worker wage labor safety police court '
+         'veteran family child senior medicare insurance drug price broadband privacy data security border '
+         'road bridge transit rail infrastructure budget deficit fund grant loan program access community '
+         'local state federal national modernization protection accountability transparency investment '
+         'innovation research development emergency disaster resilience affordable fair equal voting').split()
+
+PUBLISH_TYPES = ['Article', 'Blog']
+
+DERIVED_FILES = ['comments.snapshot.json', 'state.snapshot',
+                 'political_app.db', 'political_app.db-wal', 'political_app.db-shm']
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def words(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def title(rng):
+    return words(rng, rng.randint(2, 5)).title() + ' Act'
+
+
+def write_bills(path, rng, n):
+    with open(path, 'w', encoding='utf-8') as fh:
+        for i in range(1, n + 1):
+            description = words(rng, rng.randint(8, 16)).capitalize()
+            fh.write(f'B{i:03d}: {title(rng)} — {description}. [{rng.choice(CATEGORIES)}]\n')
+
+
+def write_users(path, n):
+    users = {'admin': {'password': '1234', 'is_admin': True}}
+    for i in range(n):
+        users[f'user{i}'] = {'password': f'pw{i}', 'is_admin': False}
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(users, fh, indent=2)
+        fh.write('\n')
+
+
+def write_publishes(path, counter_path, rng, n):
+    records = []
+    for i in range(1, n + 1):
+        ts = BASE_TIME + timedelta(minutes=i)
+        records.append({'id': i, 'title': title(rng), 'content': words(rng, rng.randint(20, 60)).capitalize() + '.',
+                        'type': rng.choice(PUBLISH_TYPES), 'timestamp': ts.isoformat().replace('+00:00', 'Z')})
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump(records, fh, indent=2)
+    with open(counter_path, 'w') as fh:
+        fh.write(f'{n + 1}\n')
+
+
+def bill_weights(n):
+    # Zipf-like popularity: a few hot bills get most of the comments
+    return list(itertools.accumulate(1.0 / (i + 1) for i in range(n)))
+
+
+def write_comments(path, rng, n, bills, users):
+    cumulative = bill_weights(bills)
+    total = cumulative[-1]
+    counts = [0] * bills
+    with open(path, 'w', encoding='utf-8') as fh:
+        for seq in range(1, n + 1):
+            b = bisect.bisect_left(cumulative, rng.random() * total)
+            b = min(b, bills - 1)
+            counts[b] += 1
+            ts = (BASE_TIME + timedelta(seconds=seq * 7)).isoformat().replace('+00:00', 'Z')
+            rec = {'seq': seq, 'bill': f'B{b + 1:03d}', 'text': words(rng, rng.randint(4, 25)).capitalize(),
+                   'user': f'user{rng.randrange(users)}' if users else 'anonymous', 'ts': ts}
+            fh.write(json.dumps(rec) + '\n')
+    return counts
+
+
+def generate(out, bills, comments, publishes, users, seed=42, scale=None):
+    os.makedirs(out, exist_ok=True)
+    # state derived from an earlier dataset in the same directory would shadow the new files
+    for name in DERIVED_FILES:
+        if os.path.exists(os.path.join(out, name)):
+            os.remove(os.path.join(out, name))
+    rng = random.Random(seed)
+    write_bills(os.path.join(out, 'billsList.txt'), rng, bills)
+    write_users(os.path.join(out, 'users.json'), users)
+    write_publishes(os.path.join(out, 'publishes.json'), os.path.join(out, 'publishes.next_id'), rng, publishes)
+    counts = write_comments(os.path.join(out, 'comments.jsonl'), rng, comments, bills, users)
+    manifest = {
+        'scale': scale, 'seed': seed,
+        'bills': bills, 'comments': comments, 'publishes': publishes, 'users': users,
+        'max_comments_per_bill': max(counts) if counts else 0,
+        'words': WORDS, 'categories': CATEGORIES,
+    }
+    with open(os.path.join(out, 'manifest.json'), 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic Political App dataset.')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--out', required=True, help='directory to write the dataset into')
+    parser.add_argument('--seed', type=int, default=42)
+    for kind in ('bills', 'comments', 'publishes', 'users'):
+        parser.add_argument(f'--{kind}', type=int, help=f'override the number of {kind} for --scale')
+    args = parser.parse_args(argv)
+
+    sizes = dict(SCALES[args.scale])
+    for kind in sizes:
+        if getattr(args, kind) is not None:
+            sizes[kind] = getattr(args, kind)
+    manifest = generate(args.out, seed=args.seed, scale=args.scale, **sizes)
+    print(', '.join(f'{manifest[k]} {k}' for k in ('bills', 'comments', 'publishes', 'users')) + f' -> {args.out}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Measure how much memory the comment and user stores take once loaded.
+
+    python benchmarks/generate_data.py --scale large --out /tmp/bench-large
+    python benchmarks/memory.py --data /tmp/bench-large
+    python benchmarks/memory.py --data /tmp/bench-large --layouts compact,compact-mmap --out /tmp/mem.json
+
+Each layout is loaded from --data in a fresh Python process, and the growth
+of that process's resident set (VmRSS) over the load is reported:
+
+* ``dicts``: the previous layout, one dict per comment and per user, as
+  parsed from comments.jsonl and users.json. This is the baseline.
+* ``compact``: CommentStore and JsonUserStore as they are now: comment
+  columns over one text buffer, slotted user records.
+* ``compact-mmap``: the same with ``COMMENTS_TEXT_MMAP=1``. The text buffer
+  is file-backed, so only the pages that have been read count.
+
+The state snapshot is not used, so every layout parses the same files.
+Results are printed in MB and MB per million comments, and written as JSON
+to --out when given. Linux only (reads /proc/self/status).
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'frontend', 'src')
+LAYOUTS = ('dicts', 'compact', 'compact-mmap')
+
+
+def rss_bytes():
+    with open('/proc/self/status') as fh:
+        for line in fh:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError('VmRSS not found in /proc/self/status')
+
+
+def load_dicts(data_dir):
+    comments = {}
+    snapshot = os.path.join(data_dir, 'comments.snapshot.json')
+    last_seq = 0
+    if os.path.exists(snapshot):
+        with open(snapshot, encoding='utf-8') as fh:
+            doc = json.load(fh)
+        last_seq = doc.get('last_seq', 0)
+        comments = {bill_id: list(records) for bill_id, records in (doc.get('comments') or {}).items()}
+    with open(os.path.join(data_dir, 'comments.jsonl'), 'rb') as fh:
+        for raw in fh:
+            rec = json.loads(raw)
+            if rec.get('seq', 0) > last_seq:
+                comments.setdefault(rec['bill'], []).append(
+                    {'text': rec['text'], 'user': rec['user'], 'ts': rec.get('ts')})
+    with open(os.path.join(data_dir, 'users.json'), encoding='utf-8') as fh:
+        users = json.load(fh)
+    return (comments, users), sum(len(v) for v in comments.values())
+
+
+def load_compact(data_dir):
+    from comment_store import CommentStore
+    from user_store import JsonUserStore
+    comments = CommentStore(os.path.join(data_dir, 'comments.jsonl'),
+                            os.path.join(data_dir, 'comments.snapshot.json'), compact_ratio=0)
+    comments.load()
+    users = JsonUserStore(os.path.join(data_dir, 'users.json'))
+    users.load()
+    return (comments, users), len(comments._off)
+
+
+def measure(layout, data_dir):
+    """Runs in the child process: load one layout and report its footprint."""
+    # import the stores before the baseline, so module code is not counted
+    if layout != 'dicts':
+        sys.path.insert(0, SRC)
+        import comment_store, user_store  # noqa: F401
+    gc.collect()
+    before = rss_bytes()
+    start = time.perf_counter()
+    held, count = (load_dicts if layout == 'dicts' else load_compact)(data_dir)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    grown = rss_bytes() - before
+    del held
+    return {'layout': layout, 'comments': count, 'rss_bytes': grown, 'load_seconds': round(elapsed, 3)}
+
+
+def run_child(layout, data_dir):
+    env = dict(os.environ, STATE_SNAPSHOT='0', COMMENTS_TEXT_MMAP='1' if layout == 'compact-mmap' else '0')
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--data', data_dir, '--child', layout],
+                         env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure the memory taken by the loaded stores.')
+    parser.add_argument('--data', required=True, help='dataset directory from generate_data.py')
+    parser.add_argument('--layouts', default=','.join(LAYOUTS), help='comma-separated subset of: ' + ', '.join(LAYOUTS))
+    parser.add_argument('--out', help='also write the results here as JSON')
+    parser.add_argument('--child', choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    data_dir = os.path.abspath(args.data)
+
+    if args.child:
+        print(json.dumps(measure(args.child, data_dir)))
+        return 0
+
+    layouts = [name.strip() for name in args.layouts.split(',') if name.strip()]
+    unknown = sorted(set(layouts) - set(LAYOUTS))
+    if unknown:
+        parser.error('unknown layouts: ' + ', '.join(unknown))
+    results = []
+    print(f'{"layout":<14}{"comments":>10}{"RSS MB":>10}{"MB/1M":>10}{"load s":>9}')
+    for layout in layouts:
+        r = run_child(layout, data_dir)
+        mb = r['rss_bytes'] / 2 ** 20
+        r['mb_per_million'] = round(mb * 1e6 / r['comments'], 1) if r['comments'] else None
+        results.append(r)
+        print(f'{layout:<14}{r["comments"]:>10}{mb:>10.1f}{r["mb_per_million"] or 0:>10.1f}{r["load_seconds"]:>9.2f}')
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump({'data': data_dir, 'results': results}, fh, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Measure per-route latency and throughput against a dataset.
+
+    python benchmarks/generate_data.py --scale medium --out /tmp/bench-medium
+    python benchmarks/run.py --data /tmp/bench-medium                      # in-process test client
+    python benchmarks/run.py --data /tmp/bench-medium --backend sqlite
+    python benchmarks/run.py --data /tmp/bench-medium --url http://localhost:5000 --concurrency 8
+
+Without --url the Flask app is imported with DATABASE_DIR pointed at --data
+and driven through its test client, so no server or network is involved.
+With --url an already running server is measured instead (start it with
+the same DATABASE_DIR). Requests are issued by --concurrency threads.
+
+Results (p50/p95/p99/mean/max latency in ms, requests/sec and error counts
+per route, plus startup time and run metadata) are printed and written as
+JSON to --out, default benchmarks/results/<scale>-<backend>-<time>.json.
+Compare two result files with benchmarks/compare.py.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'frontend', 'src')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+# -- scenarios: each returns (method, path, json body or None) for one request --
+
+def bills(rng, m):
+    return 'GET', '/api/bills', None
+
+
+def bills_search(rng, m):
+    return 'GET', f'/api/bills?q={rng.choice(m["words"])}&limit=50', None
+
+
+def comments(rng, m):
+    # half the requests hit the ten most commented bills, like a front page would
+    n = rng.randint(1, min(10, m['bills'])) if rng.random() < 0.5 else rng.randint(1, m['bills'])
+    return 'GET', f'/api/bills/B{n:03d}/comments', None
+
+
+def publishes(rng, m):
+    ptype = rng.choice(['', '&type=article', '&type=blog'])
+    return 'GET', f'/api/publishes?limit=20&offset={rng.randrange(0, 200, 20)}{ptype}', None
+
+
+def publishes_search(rng, m):
+    return 'GET', f'/api/publishes?q={rng.choice(m["words"])}&limit=20', None
+
+
+def login(rng, m):
+    if not m['users']:
+        return 'POST', '/login', {'username': 'admin', 'password': '1234'}
+    i = rng.randrange(m['users'])
+    return 'POST', '/login', {'username': f'user{i}', 'password': f'pw{i}'}
+
+
+SCENARIOS = {
+    'GET /api/bills': bills,
+    'GET /api/bills?q=': bills_search,
+    'GET /api/bills/<id>/comments': comments,
+    'GET /api/publishes': publishes,
+    'GET /api/publishes?q=': publishes_search,
+    'POST /login': login,
+}
+
+
+# -- clients ---------------------------------------------------------------
+
+class TestClient:
+    """In-process: imports the app against the dataset."""
+
+    def __init__(self, data_dir, backend):
+        os.environ['DATABASE_DIR'] = data_dir
+        os.environ['STORAGE_BACKEND'] = backend
+        # every request comes from one address here; rate limits would measure the 429 path
+        os.environ.setdefault('ADMISSION_ENABLED', '0')
+        sys.path.insert(0, SRC)
+        if backend == 'sqlite' and not os.path.exists(os.path.join(data_dir, 'political_app.db')):
+            from storage import migrate
+            migrate.main(['--source', data_dir])
+        import app as app_module
+        started = time.perf_counter()
+        app_module.create_app()
+        self.startup_ms = (time.perf_counter() - started) * 1000
+        self.app = app_module.app
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.open(path, method=method, json=body)
+        resp.get_data()
+        return resp.status_code
+
+
+class HttpClient:
+    """Against a running server."""
+
+    def __init__(self, url):
+        import requests
+        self.url = url.rstrip('/')
+        self.startup_ms = None
+        self._requests = requests
+        self._local = threading.local()
+
+    def request(self, method, path, body):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session.request(method, self.url + path, json=body, timeout=30).status_code
+
+
+# -- measurement -----------------------------------------------------------
+
+def percentile(sorted_values, p):
+    # nearest-rank
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values), math.ceil(p / 100 * len(sorted_values))) - 1)
+    return sorted_values[k]
+
+
+def measure(client, scenario, manifest, requests, concurrency, seed):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_thread = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    def worker(i):
+        rng = random.Random(seed * 1000 + i)
+        local, failed = [], 0
+        for _ in range(per_thread[i]):
+            method, path, body = scenario(rng, manifest)
+            t = time.perf_counter()
+            try:
+                status = client.request(method, path, body)
+            except Exception:
+                status = 0
+            local.append(time.perf_counter() - t)
+            if not 200 <= status < 400:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [v * 1000 for v in latencies]
+    return {
+        'requests': len(ms),
+        'errors': errors[0],
+        'rps': round(len(ms) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'mean_ms': round(sum(ms) / len(ms), 3),
+        'max_ms': round(ms[-1], 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Political App routes.')
+    parser.add_argument('--data', required=True, help='dataset directory from generate_data.py')
+    parser.add_argument('--backend', choices=['file', 'sqlite'], default='file')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process test client')
+    parser.add_argument('--requests', type=int, default=2000, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=100, help='unmeasured requests per route first')
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--routes', help='comma-separated subset of: ' + ', '.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='result file (default: benchmarks/results/<scale>-<backend>-<time>.json)')
+    args = parser.parse_args(argv)
+
+    data_dir = os.path.abspath(args.data)
+    with open(os.path.join(data_dir, 'manifest.json')) as fh:
+        manifest = json.load(fh)
+    names = [r.strip() for r in args.routes.split(',')] if args.routes else list(SCENARIOS)
+    unknown = [r for r in names if r not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown route(s): {", ".join(unknown)}')
+
+    client = HttpClient(args.url) if args.url else TestClient(data_dir, args.backend)
+    now = datetime.now(timezone.utc)
+    result = {
+        'meta': {
+            'timestamp': now.isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': 'http' if args.url else 'test_client',
+            'backend': args.backend,
+            'concurrency': args.concurrency,
+            'requests_per_route': args.requests,
+            'dataset': {k: manifest[k] for k in ('scale', 'seed', 'bills', 'comments', 'publishes', 'users')},
+        },
+        'startup_ms': round(client.startup_ms, 1) if client.startup_ms is not None else None,
+        'routes': {},
+    }
+    if client.startup_ms is not None:
+        print(f'startup (create_app): {client.startup_ms:.1f} ms')
+    print(f'{"route":32} {"rps":>9} {"p50":>9} {"p95":>9} {"p99":>9} {"errors":>7}')
+    for name in names:
+        if args.warmup:
+            measure(client, SCENARIOS[name], manifest, args.warmup, args.concurrency, args.seed + 1)
+        r = measure(client, SCENARIOS[name], manifest, args.requests, args.concurrency, args.seed)
+        result['routes'][name] = r
+        print(f'{name:32} {r["rps"]:>9} {r["p50_ms"]:>9} {r["p95_ms"]:>9} {r["p99_ms"]:>9} {r["errors"]:>7}')
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f'{manifest.get("scale") or "custom"}-{args.backend}-{now.strftime("%Y%m%dT%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as fh:
+        json.dump(result, fh, indent=2)
+    print(f'wrote {out}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
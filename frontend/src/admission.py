@@ -0,0 +1,221 @@
+"""Admission control for the write and auth routes.
+
+Signups, logins, comments and bill/publish writes each read and rewrite
+files under a lock. A burst of them can tie up the disk and every worker
+thread, and reads then queue behind the burst. Each of these routes
+belongs to a policy group (``ENDPOINTS``), and a request is admitted in
+two steps:
+
+* Rate: token buckets per client IP, plus per logged-in user for writes.
+  Buckets are refilled continuously at the policy's per-minute rate, up
+  to its burst size. They live in one LRU bounded by
+  ``ADMISSION_MAX_CLIENTS``, so a flood of new addresses evicts the oldest
+  buckets instead of growing memory. An empty bucket gives 429 with the
+  seconds until the next token in Retry-After.
+* Concurrency: at most ``concurrency`` requests of a group run at once.
+  Up to ``queue`` more wait, for at most ``ADMISSION_QUEUE_TIMEOUT``
+  seconds. When the queue is full, or the wait times out, the request is
+  shed with 503 and Retry-After. Load is dropped before any file is
+  touched.
+
+Reads are never checked. Rejections are counted per group and reason for
+/metrics (``stats()``).
+
+The ASGI login handler uses the same state, but it does not queue: it is
+admitted or shed right away, so the event loop never blocks.
+``ADMISSION_ENABLED=0`` turns the whole layer off.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g, jsonify, request, session
+
+ENABLED = os.environ.get('ADMISSION_ENABLED', '1') != '0'
+MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS', 10000))
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 2))
+# behind a reverse proxy every request comes from the proxy; take the client from X-Forwarded-For
+TRUST_PROXY = os.environ.get('ADMISSION_TRUST_PROXY', '0') == '1'
+
+# per_minute/burst apply per client IP, user_per_minute/user_burst per logged-in user
+Policy = namedtuple('Policy', 'per_minute burst user_per_minute user_burst concurrency queue')
+
+POLICIES = {
+    'auth': Policy(float(os.environ.get('ADMISSION_AUTH_PER_MINUTE', 20)), 10, None, None,
+                   int(os.environ.get('ADMISSION_AUTH_CONCURRENCY', 4)), 16),
+    'write': Policy(float(os.environ.get('ADMISSION_WRITE_PER_MINUTE', 120)), 30,
+                    float(os.environ.get('ADMISSION_WRITE_USER_PER_MINUTE', 30)), 10,
+                    int(os.environ.get('ADMISSION_WRITE_CONCURRENCY', 8)), 32),
+    'bulk': Policy(6, 2, None, None, 1, 2),
+}
+
+# Flask endpoint -> policy group; only non-GET requests are checked
+ENDPOINTS = {
+    'login': 'auth',
+    'signup': 'auth',
+    'post_comment': 'write',
+    'api_bills_post': 'write',
+    'api_publishes_post': 'write',
+    'api_bills_bulk': 'bulk',
+}
+
+
+class Rejected(Exception):
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBuckets:
+    """``key -> [tokens, last refill]`` in an LRU of at most ``max_keys`` entries."""
+
+    def __init__(self, max_keys=MAX_CLIENTS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def take(self, key, per_minute, burst, now):
+        """Take one token. Returns 0 on success, else the seconds until one is available."""
+        rate = per_minute / 60.0
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(burst), now]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(burst), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+
+class ConcurrencyLimit:
+    def __init__(self, limit, queue, timeout=QUEUE_TIMEOUT):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+
+    def acquire(self, wait=True):
+        """True once a slot is held; False if the queue is full or the wait timed out."""
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if not wait or self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.timeout
+                while self.active >= self.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class Admission:
+    def __init__(self, policies=POLICIES, max_clients=MAX_CLIENTS):
+        self.policies = policies
+        self.limits = {name: ConcurrencyLimit(p.concurrency, p.queue) for name, p in policies.items()}
+        self._buckets = TokenBuckets(max_clients)
+        self._lock = threading.Lock()
+        self.rejected = {(name, reason): 0 for name in policies for reason in ('rate', 'busy')}
+        self.admitted = {name: 0 for name in policies}
+
+    def _reject(self, group, status, reason, retry_after):
+        with self._lock:
+            self.rejected[(group, reason)] = self.rejected.get((group, reason), 0) + 1
+        raise Rejected(status, reason, retry_after)
+
+    def admit(self, group, ip, user=None, wait=True):
+        """Admit one request of ``group`` or raise Rejected. Call ``release(group)`` when it is done."""
+        policy = self.policies[group]
+        now = time.monotonic()
+        with self._lock:
+            retry = self._buckets.take((group, 'ip', ip), policy.per_minute, policy.burst, now)
+            if not retry and user and policy.user_per_minute:
+                retry = self._buckets.take((group, 'user', user), policy.user_per_minute, policy.user_burst, now)
+        if retry:
+            self._reject(group, 429, 'rate', retry)
+        if not self.limits[group].acquire(wait):
+            self._reject(group, 503, 'busy', 1)
+        with self._lock:
+            self.admitted[group] += 1
+
+    def release(self, group):
+        self.limits[group].release()
+
+    def stats(self):
+        with self._lock:
+            rejected = dict(self.rejected)
+            admitted = dict(self.admitted)
+            clients = len(self._buckets)
+        return {
+            'rejected': rejected,
+            'admitted': admitted,
+            'in_flight': {name: limit.active for name, limit in self.limits.items()},
+            'queued': {name: limit.waiting for name, limit in self.limits.items()},
+            'clients': clients,
+        }
+
+
+ADMISSION = Admission()
+
+
+def client_ip(remote_addr, forwarded_for=None):
+    if TRUST_PROXY and forwarded_for:
+        return forwarded_for.split(',')[0].strip()
+    return remote_addr or 'unknown'
+
+
+def rejection_body(rejected):
+    if rejected.status == 429:
+        return {'error': 'too many requests, slow down', 'retry_after': rejected.retry_after}
+    return {'error': 'server busy, try again shortly', 'retry_after': rejected.retry_after}
+
+
+def init_app(app):
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _admit():
+        group = ENDPOINTS.get(request.endpoint)
+        if group is None or request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        ip = client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))
+        try:
+            ADMISSION.admit(group, ip, session.get('user'))
+        except Rejected as e:
+            resp = jsonify(rejection_body(e))
+            resp.headers['Retry-After'] = str(e.retry_after)
+            return resp, e.status
+        g._admission = group
+        return None
+
+    @app.teardown_request
+    def _release(exc):
+        group = g.pop('_admission', None)
+        if group is not None:
+            ADMISSION.release(group)
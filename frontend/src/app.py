@@ -1,11 +1,27 @@
+import math
 import os
-import json
-import requests
+import threading
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session, Response
 from flask_cors import CORS
-from collections import defaultdict
 from datetime import datetime, timedelta
 
+import admission
+import bill_ingest
+import compression
+import events
+import export
+import quiz
+import static_assets
+from admission import ADMISSION
+from bill_index import DEFAULT_PAGE_SIZE
+from events import EVENTS
+from geo_index import GeoIndex
+from java_client import BackendUnavailable, JavaBackendClient
+from metrics import METRICS, init_app as init_metrics, instrument_storage
+from persistence import WRITER
+from storage import DATABASE_DIR, open_storage
+from trending import ACTIVITY
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 app = Flask(__name__, template_folder=os.path.join(BASE_DIR, 'templates'), static_folder=os.path.join(BASE_DIR, 'static'))
@@ -13,107 +29,121 @@ CORS(app)
 app.secret_key = os.environ.get('FLASK_SECRET', 'dev-secret-key-change-in-production')
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)  # Sessions last 7 days
 
-# In-memory comments: {bill_id: [ {"text": ..., "user": ...}, ... ]}
-COMMENTS = defaultdict(list)
-COMMENTS_FILE = os.path.abspath(os.path.join(BASE_DIR, '..', '..', 'database', 'comments.json'))
-
-# Users persistence
-USERS = {}
-USERS_FILE = os.path.abspath(os.path.join(BASE_DIR, '..', '..', 'database', 'users.json'))
-
-
-def load_comments_from_file():
-    global COMMENTS
-    try:
-        if os.path.exists(COMMENTS_FILE):
-            with open(COMMENTS_FILE, 'r', encoding='utf-8') as fh:
-                COMMENTS = defaultdict(list, json.load(fh))
-                return
-    except Exception:
-        COMMENTS = defaultdict(list)
-
-
-def save_comments_to_file():
-    try:
-        os.makedirs(os.path.dirname(COMMENTS_FILE), exist_ok=True)
-        with open(COMMENTS_FILE, 'w', encoding='utf-8') as fh:
-            json.dump(COMMENTS, fh, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
-
-
-def load_users_from_file():
-    global USERS
-    try:
-        if os.path.exists(USERS_FILE):
-            with open(USERS_FILE, 'r', encoding='utf-8') as fh:
-                USERS = json.load(fh)
-                return
-    except Exception:
-        USERS = {}
-
-    # seed admin user if missing
-    USERS = {
-        'admin': {'password': '1234', 'is_admin': True}
-    }
-    save_users_to_file()
-
-
-def save_users_to_file():
-    try:
-        os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-        with open(USERS_FILE, 'w', encoding='utf-8') as fh:
-            json.dump(USERS, fh, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+# Users, bills, comments and publishes all live behind one storage backend:
+# the files in database/ (default) or SQLite, chosen with STORAGE_BACKEND.
+STORAGE = instrument_storage(open_storage())
+
+# Map features from database/geo.json, gridded and clustered per zoom level
+GEO = GeoIndex(os.path.join(DATABASE_DIR, 'geo.json'))
+
+# Quiz question bank (read once) and sharded per-question answer stats
+QUIZ_BANK, QUIZ_STATS = quiz.open_quiz(DATABASE_DIR)
+
+# Pooled, circuit-broken client for the Java service; shared by every proxied route
+JAVA = JavaBackendClient.from_env()
+
+# Per-route latency histograms, status counts and timing spans, served at /metrics
+init_metrics(app)
+
+# Per-client token buckets and concurrency limits for the write and auth routes
+admission.init_app(app)
+
+# Hashed, precompressed static files with immutable caching; large responses are gzipped
+static_assets.init_app(app)
+compression.init_app(app)
+
+
+def backend_metrics():
+    w, j, e, a = WRITER.stats(), JAVA.stats(), EVENTS.stats(), ADMISSION.stats()
+    return [
+        ('group_commit_flushes_total', 'counter', 'Group-commit flushes.', None, w['flushes']),
+        ('group_commit_mutations_total', 'counter', 'Mutations written by group commits.', None, w['mutations']),
+        ('group_commit_errors_total', 'counter', 'Group-commit flushes that failed.', None, w['errors']),
+        ('group_commit_avg_batch_size', 'gauge', 'Mutations per flush.', None, round(w['avg_batch_size'], 3)),
+        ('group_commit_max_flush_seconds', 'gauge', 'Slowest flush.', None, round(w['max_flush_ms'] / 1000, 6)),
+        ('java_backend_requests_total', 'counter', 'Requests sent to the Java backend.', None, j['requests']),
+        ('java_backend_errors_total', 'counter', 'Java backend requests that failed.', None, j['errors']),
+        ('java_backend_cache_hits_total', 'counter', 'Proxy responses served from cache.', {'freshness': 'fresh'}, j['cache_hits']),
+        ('java_backend_cache_hits_total', 'counter', 'Proxy responses served from cache.', {'freshness': 'stale'}, j['stale_hits']),
+        ('java_backend_rejected_total', 'counter', 'Requests rejected by the open circuit.', None, j['rejected']),
+        ('java_backend_circuit_open', 'gauge', '1 while the circuit breaker fails fast.', None, int(j['breaker'] == 'open')),
+        ('sse_subscribers', 'gauge', 'Open event streams.', None, e['subscribers']),
+        ('sse_thread_streams', 'gauge', 'Open event streams holding a worker thread.', None, e['thread_streams']),
+        ('sse_events_published_total', 'counter', 'Events published to the push channels.', None, e['published']),
+        ('sse_subscribers_dropped_total', 'counter', 'Event streams closed because the client fell behind.', None, e['dropped']),
+        ('quiz_submissions_total', 'counter', 'Quizzes graded.', None, QUIZ_STATS.submissions),
+        ('quiz_stats_flushes_total', 'counter', 'Quiz stats flushes to disk.', None, QUIZ_STATS.flushes),
+        ('admission_clients', 'gauge', 'Clients with a rate-limit bucket.', None, a['clients']),
+    ] + [
+        ('admission_rejected_total', 'counter', 'Requests shed by admission control.',
+         {'group': group, 'reason': reason}, n) for (group, reason), n in sorted(a['rejected'].items())
+    ] + [
+        ('admission_in_flight', 'gauge', 'Admitted requests running, per group.', {'group': group}, n)
+        for group, n in a['in_flight'].items()
+    ] + [
+        ('admission_queued', 'gauge', 'Requests waiting for a slot, per group.', {'group': group}, n)
+        for group, n in a['queued'].items()
+    ]
 
-JAVA_BACKEND = os.environ.get('JAVA_BACKEND_URL', 'http://localhost:8080')
 
-# File-backed publishes store (persisted to database/publishes.json)
-PUBLISHES = []
-PUBLISHES_FILE = os.path.abspath(os.path.join(BASE_DIR, '..', '..', 'database', 'publishes.json'))
+METRICS.add_collector(backend_metrics)
 
-def load_publishes_from_file():
-    global PUBLISHES
-    try:
-        if os.path.exists(PUBLISHES_FILE):
-            with open(PUBLISHES_FILE, 'r', encoding='utf-8') as fh:
-                PUBLISHES = json.load(fh)
-                return
-    except Exception:
-        # If reading fails, fall back to an empty list and overwrite on save
-        PUBLISHES = []
 
-    # If file missing or failed to load, seed default publishes and persist
+def default_publishes():
     now = datetime.utcnow().isoformat() + 'Z'
-    PUBLISHES = [
+    return [
         {'id': 1, 'title': 'New Tax Policy Announced', 'content': 'The government revealed a new tax policy aimed at supporting small businesses.', 'type': 'Article', 'timestamp': now},
         {'id': 2, 'title': 'Understanding the New Voting Bill', 'content': 'A detailed look into the implications of the latest voting rights bill.', 'type': 'Article', 'timestamp': now},
         {'id': 3, 'title': 'Behind the Scenes: Policy Reform Journey', 'content': 'A first-hand blog on what it’s like to navigate the policy reform process.', 'type': 'Blog', 'timestamp': now},
         {'id': 4, 'title': 'My Experience at the National Debate', 'content': 'An inside story from a young journalist attending the annual national debate.', 'type': 'Blog', 'timestamp': now},
     ]
-    save_publishes_to_file()
 
 
-def save_publishes_to_file():
+def seed_publishes():
+    if len(STORAGE.publishes):
+        return
     try:
-        os.makedirs(os.path.dirname(PUBLISHES_FILE), exist_ok=True)
-        with open(PUBLISHES_FILE, 'w', encoding='utf-8') as fh:
-            json.dump(PUBLISHES, fh, ensure_ascii=False, indent=2)
+        if STORAGE.publishes.load():
+            return
     except Exception:
-        # Fail silently; the app will continue to serve in-memory data
+        # If reading fails, fall back to the defaults and overwrite on save
         pass
+    STORAGE.publishes.seed(default_publishes())
 
 
-def seed_publishes():
-    if PUBLISHES:
-        return
-    load_publishes_from_file()
+def load_storage():
+    # the trending counters are restored from the state snapshot along with the comments
+    STORAGE.load(indexes={'activity': ACTIVITY})
+    seed_publishes()
+    GEO.refresh()
+    QUIZ_BANK.refresh()
+
+_warm_lock = threading.Lock()
+_warmed = False
+
+def create_app():
+    """Load every store and index, then return the app. Later calls just return it.
+
+    WSGI servers should use this rather than ``app`` so no request pays for
+    the loading: ``gunicorn 'app:create_app()'`` (see gunicorn.conf.py).
+    """
+    global _warmed
+    with _warm_lock:
+        if not _warmed:
+            load_storage()
+            _warmed = True
+    return app
 
 @app.route('/api/bills/<bill_id>/comments', methods=['GET'])
 def get_comments(bill_id):
-    load_comments_from_file()
-    return jsonify(COMMENTS.get(bill_id, []))
+    position = EVENTS.position()
+    resp = jsonify(STORAGE.comments.get(bill_id))
+    resp.headers['X-Last-Event-ID'] = position
+    return resp
+
+@app.route('/api/bills/<bill_id>/comments/stream')
+def stream_comments(bill_id):
+    return event_stream(f'comments:{bill_id}')
 
 @app.route('/api/bills/<bill_id>/comments', methods=['POST'])
 def post_comment(bill_id):
@@ -122,12 +152,72 @@ def post_comment(bill_id):
     user = session.get('user', 'anonymous')
     if not text:
         return jsonify({'error': 'Comment text required'}), 400
-    load_comments_from_file()
-    COMMENTS.setdefault(bill_id, [])
-    COMMENTS[bill_id].append({'text': text, 'user': user})
-    save_comments_to_file()
+    try:
+        comment = STORAGE.comments.append(bill_id, text, user)
+    except Exception as e:
+        return jsonify({'error': 'failed to save', 'details': str(e)}), 500
+    EVENTS.publish(f'comments:{bill_id}', 'comment', dict(comment, bill=bill_id))
     return jsonify({'success': True})
 
+TRENDING_WINDOWS = ('score', 'hour', 'day')
+
+def leaderboard_args():
+    window = request.args.get('window') or 'score'
+    if window not in TRENDING_WINDOWS:
+        return None, None, (jsonify({'error': 'window must be one of ' + ', '.join(TRENDING_WINDOWS)}), 400)
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+    except ValueError:
+        return None, None, (jsonify({'error': 'limit must be an integer'}), 400)
+    return window, limit, None
+
+@app.route('/api/bills/trending')
+def api_bills_trending():
+    # most discussed bills: decayed score (default) or comment count in the last hour/day
+    window, limit, error = leaderboard_args()
+    if error:
+        return error
+    results = []
+    for row in ACTIVITY.top('bills', window, limit):
+        bill = STORAGE.bills.get(row['key']) or {}
+        results.append(dict(row, id=row.pop('key'), title=bill.get('title')))
+    return jsonify(results)
+
+@app.route('/api/users/leaderboard')
+def api_users_leaderboard():
+    window, limit, error = leaderboard_args()
+    if error:
+        return error
+    return jsonify([dict(row, user=row.pop('key')) for row in ACTIVITY.top('users', window, limit)])
+
+@app.route('/api/users/<username>/activity')
+def api_user_activity(username):
+    summary = ACTIVITY.summary('users', username)
+    if summary is None:
+        summary = {'comments': 0, 'last_hour': 0, 'last_day': 0, 'score': 0.0, 'last_comment_at': None}
+    return jsonify(dict(summary, user=username))
+
+MAX_BATCH_BILLS = 100
+MAX_BATCH_NEWEST = 20
+
+@app.route('/api/comments/batch')
+def get_comments_batch():
+    # Counts plus newest N comments for many bills in one round trip
+    bill_ids = []
+    for bill_id in (request.args.get('bills') or '').split(','):
+        bill_id = bill_id.strip()
+        if bill_id and bill_id not in bill_ids:
+            bill_ids.append(bill_id)
+    if not bill_ids:
+        return jsonify({'error': 'bills parameter required'}), 400
+    if len(bill_ids) > MAX_BATCH_BILLS:
+        return jsonify({'error': f'at most {MAX_BATCH_BILLS} bills per request'}), 400
+    try:
+        newest = min(max(int(request.args.get('n', 3)), 0), MAX_BATCH_NEWEST)
+    except ValueError:
+        return jsonify({'error': 'n must be an integer'}), 400
+    return jsonify(STORAGE.comments.summaries(bill_ids, newest))
+
 @app.route('/')
 def home():
     user = session.get('user')
@@ -137,19 +227,24 @@ def home():
 def login():
     if request.method == 'GET':
         return render_template('login.html')
-    load_users_from_file()
     data = request.get_json() or request.form or {}
+    body, status, user = authenticate(data)
+    if user:
+        session.update(user)
+        session.permanent = True  # Make session persistent
+    return jsonify(body), status
+
+def authenticate(data):
+    """Check login credentials. Returns (body, status, session values or None)."""
     username = data.get('username')
     password = data.get('password')
     if not username or not password:
-        return jsonify({"success": False, "message": "Missing credentials"}), 400
-    u = USERS.get(username)
+        return {"success": False, "message": "Missing credentials"}, 400, None
+    u = STORAGE.users.get(username)
     if not u or u.get('password') != password:
-        return jsonify({"success": False, "message": "Invalid credentials"}), 401
-    session['user'] = username
-    session['is_admin'] = bool(u.get('is_admin'))
-    session.permanent = True  # Make session persistent
-    return jsonify({"success": True, "message": "Login successful", "is_admin": session['is_admin']})
+        return {"success": False, "message": "Invalid credentials"}, 401, None
+    user = {'user': username, 'is_admin': bool(u.get('is_admin'))}
+    return {"success": True, "message": "Login successful", "is_admin": user['is_admin']}, 200, user
 
 @app.route('/logout')
 def logout():
@@ -170,14 +265,14 @@ def signup():
     if username.lower() == 'admin':
         return jsonify({'success': False, 'message': 'Username "admin" is reserved'}), 400
     
-    load_users_from_file()
-    if username in USERS:
+    # Create new user (fails if the username is already taken)
+    try:
+        created = STORAGE.users.add(username, password, is_admin=False)
+    except Exception:
+        return jsonify({'success': False, 'message': 'Could not save account'}), 500
+    if not created:
         return jsonify({'success': False, 'message': 'Username already exists'}), 400
     
-    # Create new user
-    USERS[username] = {'password': password, 'is_admin': False}
-    save_users_to_file()
-    
     # Auto-login after signup
     session['user'] = username
     session['is_admin'] = False
@@ -190,6 +285,22 @@ def map_page():
     return render_template('map.html')
 
 
+@app.route('/api/map/features')
+def api_map_features():
+    # only what is inside the viewport, clustered for the zoom level
+    try:
+        bbox = [float(v) for v in (request.args.get('bbox') or '').split(',')]
+        zoom = int(request.args.get('zoom', ''))
+        if len(bbox) != 4 or not all(math.isfinite(v) for v in bbox):
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': 'bbox=west,south,east,north and an integer zoom are required'}), 400
+    types = {t.strip() for t in request.args['types'].split(',')} if request.args.get('types') else None
+    try:
+        return jsonify(GEO.query(bbox, zoom, types))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 @app.route('/publishes')
 def publishes_page():
     seed_publishes()
@@ -199,22 +310,47 @@ def publishes_page():
 
 @app.route('/api/publishes')
 def api_publishes():
+    position = EVENTS.position()
+    body, status, total = list_publishes(request.args)
+    resp = jsonify(body)
+    if total is not None:
+        resp.headers['X-Total-Count'] = str(total)
+    resp.headers['X-Last-Event-ID'] = position
+    return resp, status
+
+@app.route('/api/publishes/stream')
+def stream_publishes():
+    return event_stream('publishes')
+
+def event_stream(channel):
+    # Server-Sent Events; each open stream holds a worker thread here (one coroutine under asgi.py),
+    # so only SSE_THREAD_STREAMS run at once and the pages poll when refused
+    try:
+        body = EVENTS.open_thread_stream(channel, events.last_event_id(request.headers, request.args))
+    except events.TooManySubscribers:
+        return jsonify({'error': 'too many event streams'}), 503, {'Retry-After': str(events.RETRY_MS // 1000)}
+    return Response(body, mimetype='text/event-stream', headers=events.STREAM_HEADERS)
+
+def list_publishes(args):
+    """Returns (body, status, total count or None) for GET /api/publishes."""
     seed_publishes()
-    q = (request.args.get('q') or '').strip().lower()
-    ptype = (request.args.get('type') or '').strip().lower()
-    results = []
-    for p in PUBLISHES:
-        if ptype and p['type'].lower() != ptype:
-            continue
-        if q and q not in p['title'].lower() and q not in p['content'].lower():
-            continue
-        results.append(p)
-    # sort newest first by timestamp
+    q = (args.get('q') or '').strip()
+    ptype = (args.get('type') or '').strip().lower()
     try:
-        results.sort(key=lambda x: x.get('timestamp',''), reverse=True)
-    except Exception:
-        pass
-    return jsonify(results)
+        limit = int(args['limit']) if args.get('limit') else None
+        offset = int(args.get('offset') or 0)
+    except ValueError:
+        return {'error': 'limit and offset must be integers'}, 400, None
+    if q:
+        # ranked by relevance; only documents containing every query word are visited
+        results = STORAGE.publishes.search(q, ptype)
+        total = len(results)
+        offset = max(offset, 0)
+        results = results[offset:offset + limit] if limit is not None else results[offset:]
+    else:
+        # newest first, straight from the pre-sorted timeline
+        results, total = STORAGE.publishes.newest(ptype, offset, limit)
+    return results, 200, total
 
 
 @app.route('/api/publishes', methods=['POST'])
@@ -228,11 +364,12 @@ def api_publishes_post():
     ptype = (data.get('type') or 'Article').strip()
     if not title or not content:
         return jsonify({'error': 'title and content required'}), 400
-    load_publishes_from_file()
-    next_id = max([p.get('id', 0) for p in PUBLISHES] or [0]) + 1
-    new = {'id': next_id, 'title': title, 'content': content, 'type': ptype, 'timestamp': datetime.utcnow().isoformat() + 'Z'}
-    PUBLISHES.append(new)
-    save_publishes_to_file()
+    seed_publishes()
+    try:
+        new = STORAGE.publishes.add(title, content, ptype)
+    except Exception as e:
+        return jsonify({'error': 'failed to save', 'details': str(e)}), 500
+    EVENTS.publish('publishes', 'publish', new)
     return jsonify({'success': True, 'publish': new})
 
 
@@ -242,8 +379,47 @@ def admin_page():
     user = session.get('user')
     if not session.get('is_admin'):
         return redirect(url_for('login'))
-    load_publishes_from_file()
-    return render_template('admin.html', user=user, publishes=PUBLISHES)
+    seed_publishes()
+    recent, _ = STORAGE.publishes.newest(limit=5)
+    return render_template('admin.html', user=user, publishes=recent)
+
+
+@app.route('/api/admin/persistence')
+def admin_persistence_stats():
+    # admin-only: group-commit flush latency and batch size counters
+    if not session.get('is_admin'):
+        return jsonify({'error': 'admin required'}), 403
+    return jsonify({'backend': STORAGE.name, 'writer': WRITER.stats()})
+
+
+@app.route('/api/export/<kind>')
+def api_export(kind):
+    # NDJSON dump for bulk consumers, streamed record by record (admin or EXPORT_TOKEN)
+    if not export.authorized(session.get('is_admin'), request.headers.get('Authorization')):
+        return jsonify({'error': 'admin required'}), 403
+    try:
+        since = export.parse_since(kind, request.args.get('since'))
+    except KeyError:
+        return jsonify({'error': f'unknown export {kind!r}', 'kinds': list(export.KINDS)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if kind == 'publishes':
+        seed_publishes()
+    return Response(export.ndjson(export.records(STORAGE, kind, since)), mimetype='application/x-ndjson')
+
+
+@app.route('/metrics')
+def metrics():
+    # Prometheus text exposition format
+    return Response(METRICS.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/admin/java-backend')
+def admin_java_backend_stats():
+    # admin-only: proxy cache hits, errors and circuit breaker state
+    if not session.get('is_admin'):
+        return jsonify({'error': 'admin required'}), 403
+    return jsonify(JAVA.stats())
 
 
 @app.route('/api/bills', methods=['POST'])
@@ -257,78 +433,154 @@ def api_bills_post():
     category = (data.get('category') or '').strip() or 'General'
     if not title or not description:
         return jsonify({'error': 'title and description required'}), 400
-    bills_file = os.path.join(os.path.dirname(__file__), '../../database/billsList.txt')
-    # determine next id
-    next_id = 1
     try:
-        if os.path.exists(bills_file):
-            with open(bills_file, encoding='utf-8') as f:
-                for line in f:
-                    m = line.strip().split(':', 1)
-                    if m and m[0].startswith('B'):
-                        try:
-                            n = int(m[0][1:])
-                            if n >= next_id:
-                                next_id = n + 1
-                        except Exception:
-                            pass
-    except Exception:
-        pass
-    bill_id = f'B{next_id:03d}'
-    line = f"{bill_id}: {title} — {description}. [{category}]\n"
-    try:
-        os.makedirs(os.path.dirname(bills_file), exist_ok=True)
-        with open(bills_file, 'a', encoding='utf-8') as f:
-            f.write(line)
+        bill_id = STORAGE.bills.add(title, description, category)
     except Exception as e:
         return jsonify({'error': 'failed to save', 'details': str(e)}), 500
     return jsonify({'success': True, 'id': bill_id})
 
 
+@app.route('/api/bills/bulk', methods=['POST'])
+def api_bills_bulk():
+    # admin-only: add many bills from a CSV or JSONL body; bad rows are reported, not fatal
+    if not session.get('is_admin'):
+        return jsonify({'error': 'admin required'}), 403
+    fmt = request.args.get('format') or bill_ingest.format_for(request.content_type)
+    if fmt not in bill_ingest.FORMATS:
+        return jsonify({'error': 'send text/csv or application/x-ndjson, or pass ?format=csv|jsonl'}), 400
+    try:
+        report = bill_ingest.ingest(STORAGE.bills, request.stream, fmt)
+    except Exception as e:
+        return jsonify({'error': 'failed to save', 'details': str(e)}), 500
+    return jsonify(dict(report, success=True))
+
+
 @app.route('/api/publishes/<int:pid>')
 def api_publish_get(pid):
     seed_publishes()
-    for p in PUBLISHES:
-        if p['id'] == pid:
-            return jsonify(p)
-    return jsonify({'error': 'not found'}), 404
+    p = STORAGE.publishes.get(pid)
+    if p is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(p)
+
+@app.route('/settings')
+def settings_page():
+    return render_template('settings.html')
+
+
+def proxy_response(r):
+    resp = Response(r.content, status=r.status, content_type=r.content_type)
+    if r.stale:
+        resp.headers['Warning'] = '110 - "Response is Stale"'
+    return resp
+
+
+@app.route('/api/settings', methods=['GET', 'POST'])
+def api_settings():
+    # Settings are owned by the Java backend; proxy them so the browser stays on this origin
+    try:
+        if request.method == 'GET':
+            return proxy_response(JAVA.get('/api/settings'))
+        return proxy_response(JAVA.send('POST', '/api/settings', data=request.get_data(),
+                                        headers={'Content-Type': request.content_type or 'application/json'}))
+    except BackendUnavailable as e:
+        resp = jsonify({'error': 'settings service unavailable', 'details': str(e)})
+        resp.headers['Retry-After'] = str(int(JAVA.breaker.reset_after))
+        return resp, 503
 
 @app.route('/quiz')
 def quiz_page():
     return render_template('quiz.html')
 
+@app.route('/api/quiz')
+def api_quiz():
+    # a random quiz; the answers stay on the server until it is submitted
+    category = request.args.get('category') or None
+    difficulty = request.args.get('difficulty') or None
+    try:
+        count = min(max(int(request.args.get('count', quiz.DEFAULT_QUIZ_SIZE)), 1), quiz.MAX_QUIZ_SIZE)
+    except ValueError:
+        return jsonify({'error': 'count must be an integer'}), 400
+    if difficulty is not None and difficulty not in quiz.DIFFICULTIES:
+        return jsonify({'error': 'difficulty must be one of ' + ', '.join(quiz.DIFFICULTIES)}), 400
+    QUIZ_BANK.refresh()
+    if category is not None and category not in QUIZ_BANK.categories:
+        return jsonify({'error': 'unknown category'}), 400
+    return jsonify({'questions': QUIZ_BANK.sample(count, category, difficulty), 'categories': QUIZ_BANK.categories,
+                    'difficulties': list(quiz.DIFFICULTIES)})
+
+@app.route('/api/quiz/submit', methods=['POST'])
+def api_quiz_submit():
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+    if not isinstance(answers, dict) or not answers:
+        return jsonify({'error': 'answers must map question ids to option numbers'}), 400
+    if len(answers) > quiz.MAX_QUIZ_SIZE:
+        return jsonify({'error': f'at most {quiz.MAX_QUIZ_SIZE} answers per quiz'}), 400
+    if not all(type(choice) is int for choice in answers.values()):
+        return jsonify({'error': 'each answer must be an option number'}), 400
+    try:
+        score, results = QUIZ_BANK.grade(answers)
+    except KeyError as e:
+        return jsonify({'error': f'unknown question {e.args[0]}'}), 400
+    QUIZ_STATS.record(results)
+    return jsonify({'success': True, 'score': score, 'total': len(results), 'results': results})
+
+@app.route('/api/quiz/stats')
+def api_quiz_stats():
+    if not session.get('is_admin'):
+        return jsonify({'error': 'admin required'}), 403
+    totals = QUIZ_STATS.totals()
+    questions = []
+    for q in QUIZ_BANK.public:
+        c = totals.get(q['id'], {'attempts': 0, 'correct': 0})
+        questions.append({'id': q['id'], 'question': q['question'], 'category': q['category'],
+                          'difficulty': q['difficulty'], 'attempts': c['attempts'], 'correct': c['correct'],
+                          'correct_rate': round(c['correct'] / c['attempts'], 4) if c['attempts'] else None})
+    return jsonify({'submissions': QUIZ_STATS.submissions, 'questions': questions})
+
 @app.route('/api/bills')
 def api_bills():
-    # Try to read bills from billsList.txt first
-    bills_file = os.path.join(os.path.dirname(__file__), '../../database/billsList.txt')
-    bills = []
+    # With any query parameter, return one filtered page plus a cursor to the next
+    if is_bill_query(request.args):
+        body, status = query_bills(request.args)
+        return jsonify(body), status
+    # Serve the pre-serialized bill list from the in-memory index
     try:
-        with open(bills_file, encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                # Format: B001: Title — Description. [Category]
-                import re
-                m = re.match(r'^(B\d+):\s*(.+?)\s+—\s+(.+?)\.\s*\[(.+)\]$', line)
-                if m:
-                    bills.append({
-                        'id': m.group(1),
-                        'title': m.group(2),
-                        'description': m.group(3),
-                        'category': m.group(4)
-                    })
-        return jsonify(bills)
+        body, etag = STORAGE.bills.payload()
     except Exception as e:
         # If file read fails, fallback to Java backend proxy
         try:
-            r = requests.get(f'{JAVA_BACKEND}/api/bills', timeout=5)
-            return Response(r.content, status=r.status_code, content_type=r.headers.get('Content-Type', 'application/json'))
-        except Exception as e2:
+            return proxy_response(JAVA.get('/api/bills'))
+        except BackendUnavailable as e2:
             return jsonify({'error': 'Could not load bills', 'details': str(e), 'proxy_error': str(e2)}), 502
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    return resp.make_conditional(request)
+
+def is_bill_query(args):
+    return any(k in args for k in ('q', 'category', 'limit', 'cursor'))
+
+def query_bills(args):
+    """Returns (body, status) for a filtered page of GET /api/bills."""
+    q = (args.get('q') or '').strip()
+    category = (args.get('category') or '').strip()
+    cursor = (args.get('cursor') or '').strip() or None
+    try:
+        limit = int(args.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        return {'error': 'limit must be an integer'}, 400
+    try:
+        bills, next_cursor, total = STORAGE.bills.query(q=q, category=category, limit=limit, cursor=cursor)
+    except KeyError:
+        return {'error': 'unknown cursor'}, 400
+    except Exception as e:
+        return {'error': 'Could not load bills', 'details': str(e)}, 502
+    return {'bills': bills, 'next_cursor': next_cursor, 'total': total}, 200
 
 if __name__ == '__main__':
-    load_users_from_file()
-    load_comments_from_file()
-    load_publishes_from_file()
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
+    create_app()
+    try:
+        app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=True)
+    finally:
+        QUIZ_STATS.flush()
@@ -0,0 +1,250 @@
+"""ASGI serving mode.
+
+    cd frontend/src && uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Only the handlers that wait on something other than this process are
+async: the event streams (a coroutine per open client instead of a worker
+thread) and the /api/settings proxy (an httpx request instead of a thread
+blocked on a slow Java backend). Every other route goes to the Flask app
+through asgiref's WsgiToAsgi, on a fixed pool of ``ASGI_THREADS`` threads
+(default 16), so pages, sessions, JSON, compression and admin endpoints
+behave exactly as under ``python app.py``.
+
+Optional dependencies: asgiref, httpx and an ASGI server (uvicorn, hypercorn);
+see requirements.txt.
+"""
+import asyncio
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+import events
+from app import JAVA, app as flask_app, create_app
+from events import EVENTS
+from java_client import AsyncJavaBackendClient, BackendUnavailable
+from metrics import begin_request, end_request, span
+
+WSGI_EXECUTOR = ThreadPoolExecutor(int(os.environ.get('ASGI_THREADS', 16)), thread_name_prefix='wsgi')
+
+
+def _closing(wsgi_app):
+    # WsgiToAsgi never calls close() on the response; do it so streamed bodies are cleaned up
+    def run(environ, start_response):
+        iterable = wsgi_app(environ, start_response)
+        try:
+            yield from iterable
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+    return run
+
+
+class _WsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs every WSGI request on one shared thread by default; use the pool instead
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False,
+                                 executor=WSGI_EXECUTOR)
+
+
+class _WsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _WsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+FLASK = _WsgiToAsgi(_closing(flask_app))
+
+
+class Request:
+    def __init__(self, scope, receive, params):
+        self.scope = scope
+        self.method = scope['method']
+        self.params = params
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope['headers']}
+        # first value wins, like request.args.get()
+        self.args = {}
+        for k, v in parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True):
+            self.args.setdefault(k, v)
+        self._receive = receive
+
+    async def body(self):
+        chunks = []
+        while True:
+            message = await self._receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+
+class Response:
+    def __init__(self, body=b'', status=200, content_type='application/json', headers=None):
+        self.body = body
+        self.status = status
+        self.headers = [('content-type', content_type)] + list(headers or [])
+
+    async def send(self, send):
+        headers = self.headers + [('content-length', str(len(self.body)))]
+        await send({'type': 'http.response.start', 'status': self.status,
+                    'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers]})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+class EventStreamResponse(Response):
+    """Server-Sent Events for one subscription; a coroutine per client instead of a thread."""
+
+    def __init__(self, sub, receive):
+        super().__init__(b'', 200, 'text/event-stream', [(k.lower(), v) for k, v in events.STREAM_HEADERS.items()])
+        self.sub = sub
+        self._receive = receive
+
+    async def _disconnected(self):
+        while (await self._receive())['type'] != 'http.disconnect':
+            pass
+
+    async def send(self, send):
+        disconnect = asyncio.ensure_future(self._disconnected())
+        try:
+            await send({'type': 'http.response.start', 'status': self.status,
+                        'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in self.headers]})
+            await send({'type': 'http.response.body', 'body': self.sub.prelude(), 'more_body': True})
+            while not self.sub.overflowed:
+                waiting = asyncio.ensure_future(self.sub.wait(events.SSE_HEARTBEAT))
+                await asyncio.wait((waiting, disconnect), return_when=asyncio.FIRST_COMPLETED)
+                if disconnect.done():
+                    waiting.cancel()
+                    return
+                batch = waiting.result()
+                body = b''.join(e.data for e in batch) if batch else events.PING
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            disconnect.cancel()
+            EVENTS.unsubscribe(self.sub)
+
+
+def json_response(body, status=200, headers=None):
+    # same bytes as flask.jsonify: compact unless the app runs in debug mode
+    provider = flask_app.json
+    if provider.compact or (provider.compact is None and not flask_app.debug):
+        options = {'separators': (',', ':')}
+    else:
+        options = {'indent': 2, 'separators': (', ', ': ')}
+    with span('json.encode'):
+        data = f'{provider.dumps(body, **options)}\n'.encode('utf-8')
+    return Response(data, status, headers=headers)
+
+
+def proxy_response(r):
+    headers = [('warning', '110 - "Response is Stale"')] if r.stale else []
+    return Response(r.content, r.status, r.content_type, headers)
+
+
+# -- async views -------------------------------------------------------------
+
+JAVA_ASYNC = None
+
+
+async def event_stream(req, channel):
+    last_id = req.headers.get('last-event-id') or req.args.get('last_event_id')
+    try:
+        sub = EVENTS.subscribe(channel, last_id, asyncio.get_running_loop())
+    except events.TooManySubscribers:
+        return json_response({'error': 'too many event streams'}, 503,
+                             [('retry-after', str(events.RETRY_MS // 1000))])
+    return EventStreamResponse(sub, req._receive)
+
+
+async def comments_stream(req):
+    return await event_stream(req, f'comments:{req.params["bill_id"]}')
+
+
+async def publishes_stream(req):
+    return await event_stream(req, 'publishes')
+
+
+async def settings(req):
+    try:
+        if req.method == 'GET':
+            return proxy_response(await JAVA_ASYNC.get('/api/settings'))
+        return proxy_response(await JAVA_ASYNC.send(
+            'POST', '/api/settings', content=await req.body(),
+            headers={'Content-Type': req.headers.get('content-type') or 'application/json'}))
+    except BackendUnavailable as e:
+        return json_response({'error': 'settings service unavailable', 'details': str(e)}, 503,
+                             [('retry-after', str(int(JAVA.breaker.reset_after)))])
+
+
+ROUTES = [
+    (('GET',), '/api/bills/<bill_id>/comments/stream', comments_stream),
+    (('GET',), '/api/publishes/stream', publishes_stream),
+    (('GET', 'POST'), '/api/settings', settings),
+]
+# same rule syntax as Flask, so metrics use the same endpoint labels in both modes
+_COMPILED = [(methods, rule, re.compile(re.sub(r'<(\w+)>', r'(?P<\1>[^/]+)', rule)), view)
+             for methods, rule, view in ROUTES]
+
+
+def route(method, path):
+    for methods, rule, pattern, view in _COMPILED:
+        m = pattern.fullmatch(path)
+        if m and method in methods:
+            return rule, view, m.groupdict()
+    return None, None, None
+
+
+# -- ASGI entry point --------------------------------------------------------
+
+_started = None
+
+
+async def startup():
+    global JAVA_ASYNC, _started
+    if _started is None:
+        _started = asyncio.get_running_loop().run_in_executor(WSGI_EXECUTOR, create_app)
+        JAVA_ASYNC = AsyncJavaBackendClient(JAVA, int(os.environ.get('JAVA_ASYNC_MAX_CONNECTIONS', 100)))
+    await _started
+
+
+async def shutdown():
+    if JAVA_ASYNC is not None:
+        await JAVA_ASYNC.aclose()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await startup()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+    await startup()  # no-op after the lifespan startup; covers servers without lifespan support
+    rule, view, params = route(scope['method'], scope['path'])
+    if view is None:
+        # Under keep-alive uvicorn starts the next request from inside asgiref's send(), so that
+        # request would inherit asgiref's context; run each one as a task in a clean context
+        return await contextvars.Context().run(asyncio.ensure_future, FLASK(scope, receive, send))
+    req = Request(scope, receive, params)
+    started = begin_request(rule)
+    response = Response(b'', 500)
+    try:
+        response = await view(req)
+    finally:
+        path = scope['path'] + ('?' + scope['query_string'].decode('latin-1') if scope['query_string'] else '')
+        end_request(rule, req.method, response.status, path, started)
+    if 'origin' in req.headers:
+        # CORS(app) allows any origin for the Flask routes; keep that here
+        response.headers.append(('access-control-allow-origin', '*'))
+    await response.send(send)
@@ -0,0 +1,292 @@
+"""In-memory index over database/billsList.txt.
+
+The file is parsed once and re-parsed only when its mtime or size changes.
+Lines appended through ``add`` / ``add_many`` are folded into the index
+directly, so adding bills never forces a full re-parse. New ids come from a
+cached high-water mark instead of a scan of the file, and ``add_many``
+writes a whole batch with one append.
+
+Besides the full list, the index keeps a category index and a token index
+(both map to ascending positions in file order) so ``query`` can filter and
+page without touching every bill.
+"""
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+
+from metrics import span
+from persistence import file_lock
+from search_index import tokenize
+
+# Format: B001: Title — Description. [Category]
+BILL_LINE_RE = re.compile(r'^(B\d+):\s*(.+?)\s+—\s+(.+?)\.\s*\[(.+)\]$')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def category_keys(category):
+    # "Environment/Energy" is reachable as the full name and as each part
+    full = category.strip().lower()
+    keys = {full}
+    keys.update(part.strip() for part in full.split('/') if part.strip())
+    return keys
+
+
+def normalize_title(title):
+    return ' '.join(title.lower().split())
+
+
+def format_bill_line(bill_id, title, description, category):
+    return f"{bill_id}: {title} — {description}. [{category}]\n"
+
+
+def _id_num(line):
+    # any "Bnnn:" line claims its id, even one too malformed to index
+    head = line.split(':', 1)[0].strip()
+    return int(head[1:]) if head[:1] == 'B' and head[1:].isdigit() else 0
+
+
+def parse_bill_line(line):
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    m = BILL_LINE_RE.match(line)
+    if not m:
+        return None
+    return {
+        'id': m.group(1),
+        'title': m.group(2),
+        'description': m.group(3),
+        'category': m.group(4),
+    }
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class BillIndex:
+    # parsed state saved by state_snapshot, including the encoded list
+    SNAPSHOT_FIELDS = ('_bills', '_by_id', '_pos_by_id', '_by_category', '_by_token', '_by_title',
+                       '_vocab', '_max_num', '_body', '_etag', '_sig')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sig = None
+        self._bills = []
+        self._by_id = {}
+        self._pos_by_id = {}
+        self._by_category = {}
+        self._by_token = {}
+        self._by_title = {}
+        self._vocab = []
+        # highest Bnnn number in the file; the next new bill gets max_num + 1
+        self._max_num = 0
+        # serialized list + strong ETag, computed lazily after each change
+        self._body = None
+        self._etag = None
+
+    def _rebuild(self, sig):
+        bills = []
+        max_num = 0
+        with span('bills.parse'), open(self.path, encoding='utf-8') as fh:
+            for line in fh:
+                max_num = max(max_num, _id_num(line))
+                bill = parse_bill_line(line)
+                if bill:
+                    bills.append(bill)
+        self._bills = []
+        self._by_id = {}
+        self._pos_by_id = {}
+        self._by_category = {}
+        self._by_token = {}
+        self._by_title = {}
+        self._max_num = max_num
+        with span('bills.index'):
+            for bill in bills:
+                self._add(bill)
+            self._vocab = sorted(self._by_token)
+        self._body = None
+        self._etag = None
+        self._sig = sig
+
+    def _add(self, bill):
+        # positions only ever grow, so every postings list stays sorted
+        pos = len(self._bills)
+        self._bills.append(bill)
+        self._by_id[bill['id']] = bill
+        self._pos_by_id[bill['id']] = pos
+        self._by_title.setdefault(normalize_title(bill['title']), bill['id'])
+        for key in category_keys(bill['category']):
+            self._by_category.setdefault(key, []).append(pos)
+        text = ' '.join((bill['id'], bill['title'], bill['description'], bill['category']))
+        new_tokens = []
+        for tok in set(tokenize(text)):
+            postings = self._by_token.get(tok)
+            if postings is None:
+                postings = self._by_token[tok] = []
+                new_tokens.append(tok)
+            postings.append(pos)
+        return new_tokens
+
+    def snapshot_sources(self):
+        return [self.path]
+
+    def refresh(self):
+        """Re-parse the file if it changed on disk. Raises OSError if unreadable."""
+        sig = _file_signature(self.path)
+        if sig == self._sig:
+            return
+        with self._lock:
+            if sig != self._sig:
+                self._rebuild(sig)
+
+    def bills(self):
+        self.refresh()
+        return self._bills
+
+    def get(self, bill_id):
+        self.refresh()
+        return self._by_id.get(bill_id)
+
+    def iter_all(self):
+        """Yield bills straight from billsList.txt, one line at a time, without touching the index."""
+        try:
+            fh = open(self.path, encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with fh:
+            for line in fh:
+                bill = parse_bill_line(line)
+                if bill:
+                    yield bill
+
+    def payload(self):
+        """Return ``(body_bytes, etag)`` for the full bill list."""
+        self.refresh()
+        body, etag = self._body, self._etag
+        if body is None:
+            with self._lock:
+                if self._body is None:
+                    with span('bills.encode'):
+                        body = json.dumps(self._bills, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                    self._etag = hashlib.sha1(body).hexdigest()
+                    self._body = body
+                body, etag = self._body, self._etag
+        return body, etag
+
+    def _append(self, bills, dedupe):
+        """Give ``bills`` the next ids and append them in one write.
+
+        Returns ``(bill_id, duplicate_of)`` per bill; with ``dedupe`` a bill whose
+        title is already taken is skipped and reports the existing id instead.
+        """
+        with self._lock, file_lock(self.path):
+            try:
+                before = _file_signature(self.path)
+            except FileNotFoundError:
+                before = None
+            if before is not None and before != self._sig:
+                # another process appended; re-parse so the high-water mark is current
+                self._rebuild(before)
+            results, lines, added = [], [], []
+            taken = {}
+            next_num = self._max_num + 1
+            for bill in bills:
+                key = normalize_title(bill['title'])
+                existing = (self._by_title.get(key) or taken.get(key)) if dedupe else None
+                if existing:
+                    results.append((None, existing))
+                    continue
+                bill = {'id': f'B{next_num:03d}', 'title': bill['title'],
+                        'description': bill['description'], 'category': bill['category']}
+                next_num += 1
+                taken[key] = bill['id']
+                lines.append(format_bill_line(bill['id'], bill['title'], bill['description'], bill['category']))
+                added.append(bill)
+                results.append((bill['id'], None))
+            if not lines:
+                return results
+            with open(self.path, 'a', encoding='utf-8') as fh:
+                fh.write(''.join(lines))
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._max_num = next_num - 1
+            if before is None:
+                # the file was just created; index it from scratch on the next read
+                self._sig = None
+                return results
+            for bill in added:
+                for tok in self._add(bill):
+                    bisect.insort(self._vocab, tok)
+            self._body = None
+            self._etag = None
+            self._sig = _file_signature(self.path)
+        return results
+
+    def add(self, title, description, category):
+        """Append a new bill with the next free ``Bnnn`` id. Returns the id."""
+        return self._append([{'title': title, 'description': description, 'category': category}], False)[0][0]
+
+    def add_many(self, bills):
+        """Append many bills with contiguous new ids in a single write, skipping taken titles.
+
+        Returns ``(bill_id, duplicate_of)`` per input bill, one of them None.
+        """
+        return self._append(bills, True)
+
+    def _prefix_positions(self, prefix):
+        vocab = self._vocab
+        i = bisect.bisect_left(vocab, prefix)
+        lists = []
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            lists.append(self._by_token[vocab[i]])
+            i += 1
+        if len(lists) == 1:
+            return lists[0]
+        return sorted(set().union(*lists))
+
+    def query(self, q='', category='', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """Filter and page the bills.
+
+        Every word in ``q`` must prefix-match a word of the bill's id, title,
+        description or category. ``cursor`` is the id of the last bill of the
+        previous page. Returns ``(bills, next_cursor, total)``.
+        """
+        self.refresh()
+        with self._lock:
+            candidates = None
+            if category:
+                candidates = self._by_category.get(category.strip().lower(), [])
+            for tok in sorted(set(tokenize(q)), key=len, reverse=True):
+                if candidates is not None and not candidates:
+                    break
+                matches = self._prefix_positions(tok)
+                if candidates is None:
+                    candidates = matches
+                else:
+                    if len(matches) < len(candidates):
+                        candidates, matches = matches, candidates
+                    keep = set(matches)
+                    candidates = [p for p in candidates if p in keep]
+            if candidates is None:
+                candidates = range(len(self._bills))
+
+            start = 0
+            if cursor:
+                after = self._pos_by_id.get(cursor)
+                if after is None:
+                    raise KeyError(cursor)
+                start = bisect.bisect_right(candidates, after)
+            limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+            page = [self._bills[p] for p in candidates[start:start + limit]]
+            next_cursor = None
+            if start + limit < len(candidates):
+                next_cursor = page[-1]['id']
+            return page, next_cursor, len(candidates)
@@ -0,0 +1,166 @@
+"""Bulk bill ingestion from CSV or JSONL.
+
+Rows need a ``title`` and a ``description``; ``category`` defaults to
+General. CSV input needs a header row. Every row is validated on its own,
+and a bad row is reported with its line number without stopping the rest.
+Titles already in use, whether in the existing bills or earlier in the same
+batch, are reported as duplicates. The valid rows get contiguous ids and are
+written together: one append to billsList.txt, or one SQLite transaction.
+
+Served at ``POST /api/bills/bulk`` (admin) and from the command line:
+
+    python bill_ingest.py session-2025.csv
+    python bill_ingest.py - --format jsonl < bills.jsonl
+"""
+import argparse
+import csv
+import json
+import sys
+
+from bill_index import format_bill_line, parse_bill_line
+
+FORMATS = ('csv', 'jsonl')
+FIELDS = ('title', 'description', 'category')
+MAX_FIELD_CHARS = 2000
+
+
+def format_for(content_type, name=None):
+    """Pick the input format from a Content-Type or a file name; None if neither says."""
+    ctype = (content_type or '').split(';')[0].strip().lower()
+    if ctype in ('text/csv', 'application/csv'):
+        return 'csv'
+    if ctype in ('application/x-ndjson', 'application/jsonl', 'application/x-jsonlines'):
+        return 'jsonl'
+    if name:
+        ext = name.rsplit('.', 1)[-1].lower()
+        if ext == 'csv':
+            return 'csv'
+        if ext in ('jsonl', 'ndjson'):
+            return 'jsonl'
+    return None
+
+
+def _lines(stream):
+    # bytes lines -> str; invalid UTF-8 is kept as surrogates and rejected per row by validate()
+    first = True
+    for raw in stream:
+        line = raw.decode('utf-8', 'surrogateescape')
+        if first:
+            line = line.removeprefix('\ufeff')
+            first = False
+        yield line
+
+
+def read_rows(stream, fmt):
+    """Yield ``(line_number, row dict or None, error or None)`` from a binary stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(_lines(stream))
+        missing = [f for f in ('title', 'description') if f not in (reader.fieldnames or [])]
+        if missing:
+            yield 1, None, f'CSV header must include {", ".join(missing)}'
+            return
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield reader.line_num, None, f'malformed CSV: {e}'
+                return
+            yield reader.line_num, row, None
+    elif fmt == 'jsonl':
+        for n, line in enumerate(_lines(stream), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield n, None, f'invalid JSON: {e}'
+                continue
+            if not isinstance(row, dict):
+                yield n, None, 'each line must be a JSON object'
+                continue
+            yield n, row, None
+    else:
+        raise ValueError(f'unknown format {fmt!r}')
+
+
+def validate(row):
+    """Return ``(bill, None)`` or ``(None, error)`` for one input row."""
+    bill = {}
+    for field in FIELDS:
+        value = row.get(field)
+        if value is None:
+            value = ''
+        if not isinstance(value, str):
+            return None, f'{field} must be a string'
+        value = value.strip()
+        try:
+            value.encode('utf-8')
+        except UnicodeEncodeError:
+            return None, f'{field} is not valid UTF-8'
+        if len(value) > MAX_FIELD_CHARS:
+            return None, f'{field} is longer than {MAX_FIELD_CHARS} characters'
+        bill[field] = value
+    bill['category'] = bill['category'] or 'General'
+    if not bill['title'] or not bill['description']:
+        return None, 'title and description required'
+    # the text format has to read back the same bill, for either backend
+    if any('\n' in v or '\r' in v for v in bill.values()):
+        return None, 'fields must be single-line'
+    parsed = parse_bill_line(format_bill_line('B1', bill['title'], bill['description'], bill['category']))
+    if not parsed or any(parsed[f] != bill[f] for f in FIELDS):
+        return None, 'title, description or category contains characters that cannot be stored'
+    return bill, None
+
+
+def ingest(bills_repo, stream, fmt):
+    """Validate, dedupe and store every row. Returns a report dict."""
+    errors, valid, lines = [], [], []
+    rows = 0
+    for line, row, error in read_rows(stream, fmt):
+        rows += 1
+        if error is None:
+            bill, error = validate(row)
+        if error is not None:
+            errors.append({'line': line, 'error': error})
+            continue
+        valid.append(bill)
+        lines.append(line)
+    created, duplicates = [], []
+    for line, bill, (bill_id, duplicate_of) in zip(lines, valid, bills_repo.add_many(valid) if valid else []):
+        if bill_id:
+            created.append({'line': line, 'id': bill_id, 'title': bill['title']})
+        else:
+            duplicates.append({'line': line, 'error': f'duplicate title (existing bill {duplicate_of})'})
+    errors = sorted(errors + duplicates, key=lambda e: e['line'])
+    return {'rows': rows, 'created': created, 'errors': errors}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Add many bills at once from CSV or JSONL.')
+    parser.add_argument('file', help="input file, or - for stdin")
+    parser.add_argument('--format', choices=FORMATS, help='default: from the file extension')
+    args = parser.parse_args(argv)
+    fmt = args.format or format_for(None, args.file)
+    if fmt is None:
+        parser.error('cannot tell the format from the file name; pass --format')
+
+    from storage import open_storage
+    storage = open_storage()
+    storage.load()
+    stream = sys.stdin.buffer if args.file == '-' else open(args.file, 'rb')
+    try:
+        report = ingest(storage.bills, stream, fmt)
+    finally:
+        if args.file != '-':
+            stream.close()
+        storage.close()
+    for e in report['errors']:
+        print(f'line {e["line"]}: {e["error"]}', file=sys.stderr)
+    print(f'{len(report["created"])} bills added, {len(report["errors"])} rows rejected, {report["rows"]} rows read')
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
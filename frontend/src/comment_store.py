@@ -0,0 +1,444 @@
+"""Append-only comment store.
+
+Comments live in two files under database/:
+
+* ``comments.jsonl``         one JSON record per posted comment, appended in O(1)
+* ``comments.snapshot.json`` every comment up to ``last_seq``, written by compaction
+
+Reads are served from an in-memory index keyed by bill id. It is laid out
+as columns, not one dict per comment. Comment ``i`` is:
+
+* ``_off[i]``: where its text starts in one shared ``TextBuffer``
+  (``compact.py``). Its timestamp follows the text directly.
+* ``_text_len[i]`` and ``_ts_len[i]``: the UTF-8 byte lengths of the text
+  and the timestamp (0 = none).
+* ``_user[i]``: the author's id in a ``NameTable`` of interned usernames.
+* ``_bill[i]``: its bill's id in a second ``NameTable``.
+
+Each bill maps to an ``array`` of its comment numbers in posting order.
+A comment costs about 26 bytes plus its text and timestamp, and response
+dicts are only built when read.
+
+Comment numbers only grow by appends until the store reloads (after
+another process compacts), which renumbers them and bumps ``_generation``.
+``since(cursor)`` hands an incremental reader such as the trending index
+the comments past its ``(generation, count)`` cursor, or all of them
+after a reload.
+
+Every record carries a sequence number, so replaying the log on top of
+the snapshot skips records that were already folded in (e.g. after a
+crash between the snapshot rename and the log truncation). Other
+processes appending to the same log are picked up by tailing it from the
+last consumed offset.
+
+Appends go through the shared group-commit writer: comments posted within
+the same few milliseconds are written with one write and one fsync.
+
+Run ``python comment_store.py import`` once to convert a legacy
+``comments.json`` ({bill_id: [{"text", "user"}, ...]}) into the new format.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+from array import array
+from datetime import datetime
+
+from compact import NameTable, open_text_buffer
+from persistence import WRITER, atomic_write, file_lock
+
+# compact once the log reaches this fraction of the snapshot's size (and at least MIN_BYTES),
+# so each posted byte is rewritten a bounded number of times however large the store gets
+DEFAULT_COMPACT_RATIO = 0.5
+DEFAULT_COMPACT_MIN_BYTES = 1 << 20
+
+
+def _sig(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def _digest(path, length):
+    """Hash of the first ``length`` bytes of ``path``; None if it is missing or shorter."""
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, 'rb') as fh:
+            while length > 0:
+                chunk = fh.read(min(length, 1 << 20))
+                if not chunk:
+                    return None
+                h.update(chunk)
+                length -= len(chunk)
+    except FileNotFoundError:
+        return None if length else h.digest()
+    return h.digest()
+
+
+class CommentStore:
+    # parsed state saved by state_snapshot; refresh() then tails whatever the log gained since
+    SNAPSHOT_FIELDS = ('_by_bill', '_names', '_text', '_off', '_text_len', '_ts_len', '_user',
+                       '_bill', '_bill_names', '_seq', '_snapshot_seq', '_snap_sig', '_log_offset',
+                       '_loaded', '_generation')
+
+    def __init__(self, log_path, snapshot_path, legacy_path=None,
+                 compact_ratio=DEFAULT_COMPACT_RATIO, compact_min_bytes=DEFAULT_COMPACT_MIN_BYTES):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.legacy_path = legacy_path
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._compacting = False
+        self._matched = None
+        self._generation = 0        # bumped by every load(), which renumbers the comments
+        self._reset()
+
+    def _reset(self):
+        self._by_bill = {}          # bill id -> array of comment numbers
+        self._names = NameTable()
+        self._text = open_text_buffer()
+        self._off = array('Q')
+        self._text_len = array('I')
+        self._ts_len = array('H')
+        self._user = array('I')
+        self._bill = array('I')
+        self._bill_names = NameTable()
+        self._seq = 0
+        self._snapshot_seq = 0
+        self._snap_sig = None
+        self._log_offset = 0
+
+    # -- loading ---------------------------------------------------------
+
+    def load(self):
+        """(Re)build the in-memory index from the snapshot and the log."""
+        with self._lock:
+            if not os.path.exists(self.snapshot_path) and not os.path.exists(self.log_path):
+                if self.legacy_path and os.path.exists(self.legacy_path):
+                    self.import_legacy(self.legacy_path)
+            self._reset()
+            self._generation += 1
+            self._read_snapshot()
+            self._read_log_tail()
+            self._loaded = True
+
+    def snapshot_sources(self):
+        return [self.snapshot_path, self.log_path]
+
+    def snapshot_signature(self):
+        """What the current state was read from: the snapshot file and the first ``_log_offset`` bytes of the log.
+
+        The log keeps growing after the state snapshot is written, so its
+        size can't be part of the signature. Its consumed prefix is hashed
+        instead; a regenerated or replaced log no longer matches.
+        """
+        with self._lock:
+            return self._snap_sig, self._log_offset, _digest(self.log_path, self._log_offset)
+
+    def snapshot_matches(self, sig):
+        snap_sig, log_offset, digest = sig
+        files = (_sig(self.snapshot_path), _sig(self.log_path))
+        if self._matched is not None and self._matched[:2] == (sig, files):
+            # the trending index asks about the same entry right after the store itself
+            return self._matched[2]
+        ok = snap_sig == files[0] and digest == _digest(self.log_path, log_offset)
+        self._matched = (sig, files, ok)
+        return ok
+
+    def refresh(self):
+        """Catch up with appends and compactions made since the last read."""
+        with self._lock:
+            self._sync()
+
+    def _read_snapshot(self):
+        self._snap_sig = _sig(self.snapshot_path)
+        if self._snap_sig is None:
+            return
+        with open(self.snapshot_path, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+        self._snapshot_seq = self._seq = int(data.get('last_seq', 0))
+        for bill_id, records in (data.get('comments') or {}).items():
+            for c in records:
+                self._add(bill_id, c['text'], c['user'], c.get('ts'))
+
+    def _read_log_tail(self):
+        # Apply complete lines past the last consumed offset; a torn trailing line is left for later
+        try:
+            fh = open(self.log_path, 'rb')
+        except FileNotFoundError:
+            return
+        with fh:
+            fh.seek(self._log_offset)
+            for raw in fh:
+                if not raw.endswith(b'\n'):
+                    break
+                self._log_offset += len(raw)
+                try:
+                    rec = json.loads(raw)
+                except ValueError:
+                    continue
+                self._apply(rec)
+
+    def _apply(self, rec):
+        seq = rec.get('seq', 0)
+        if seq and seq <= self._snapshot_seq:
+            return
+        self._seq = max(self._seq, seq)
+        self._add(rec['bill'], rec['text'], rec['user'], rec.get('ts'))
+
+    def _add(self, bill_id, text, user, ts):
+        # text and timestamp go into the buffer back to back; caller holds the lock
+        offset, text_len = self._text.append(text)
+        ts_len = self._text.append(ts)[1] if ts else 0
+        ids = self._by_bill.get(bill_id)
+        if ids is None:
+            ids = self._by_bill[bill_id] = array('I')
+        ids.append(len(self._off))
+        self._off.append(offset)
+        self._text_len.append(text_len)
+        self._ts_len.append(ts_len)
+        self._user.append(self._names.id(user))
+        self._bill.append(self._bill_names.id(bill_id))
+
+    def _columns(self):
+        return self._text, self._off, self._text_len, self._ts_len, self._user, self._names.names
+
+    def _comments(self, ids, with_ts=False, columns=None):
+        """Build the response dicts for comment numbers ``ids``."""
+        text, off, text_len, ts_len, user, names = columns or self._columns()
+        get = text.get
+        if not with_ts:
+            return [{'text': get(off[i], text_len[i]), 'user': names[user[i]]} for i in ids]
+        out = []
+        for i in ids:
+            offset, length = off[i], text_len[i]
+            out.append({'text': get(offset, length), 'user': names[user[i]],
+                        'ts': get(offset + length, ts_len[i]) if ts_len[i] else None})
+        return out
+
+    def _sync(self):
+        # Cheap staleness check: another process may have appended or compacted
+        if not self._loaded:
+            self.load()
+            return
+        if _sig(self.snapshot_path) != self._snap_sig:
+            self.load()
+            return
+        log_sig = _sig(self.log_path)
+        size = log_sig[1] if log_sig else 0
+        if size < self._log_offset:
+            self.load()
+        elif size > self._log_offset:
+            self._read_log_tail()
+
+    # -- reads -----------------------------------------------------------
+
+    def get(self, bill_id):
+        with self._lock:
+            self._sync()
+            return self._comments(self._by_bill.get(bill_id, ()))
+
+    def summaries(self, bill_ids, newest=3):
+        """Comment count plus the ``newest`` most recent comments (newest first) per bill.
+
+        Each bill's list only ever grows by appends, so its length is the
+        running count and its tail holds the latest comments; no scan of
+        other bills' comments is needed.
+        """
+        with self._lock:
+            self._sync()
+            out = {}
+            for bill_id in bill_ids:
+                ids = self._by_bill.get(bill_id, ())
+                latest = ids[-newest:] if newest > 0 else ()
+                out[bill_id] = {
+                    'count': len(ids),
+                    'latest': self._comments(reversed(latest)),
+                }
+            return out
+
+    def iter_all(self):
+        """Yield ``(bill_id, {"text", "user", "ts"})`` for every comment, in posting order per bill."""
+        with self._lock:
+            self._sync()
+            # the columns only grow by appends and a reload replaces them,
+            # so holding them plus (ids, length) pins a consistent view without copying
+            columns = self._columns()
+            snapshot = [(bill_id, ids, len(ids)) for bill_id, ids in self._by_bill.items()]
+        text, off, text_len, ts_len, user, names = columns
+        get = text.get
+        # one row at a time, so an export holds a single comment rather than a whole bill
+        for bill_id, ids, n in snapshot:
+            for k in range(n):
+                i = ids[k]
+                offset, length = off[i], text_len[i]
+                yield bill_id, {'text': get(offset, length), 'user': names[user[i]],
+                                'ts': get(offset + length, ts_len[i]) if ts_len[i] else None}
+
+    def since(self, cursor):
+        """Comments added after ``cursor``, for readers that fold them in incrementally.
+
+        Returns ``(new cursor, rebuilt, rows)``. ``rows`` yields
+        ``(bill_id, {"text", "user", "ts"})``. ``rebuilt`` is True when the
+        cursor is None or the store has reloaded since (which renumbers the
+        comments); ``rows`` then holds every comment and the reader starts over.
+        """
+        with self._lock:
+            self._sync()
+            generation, start = cursor or (None, 0)
+            rebuilt = generation != self._generation
+            if rebuilt:
+                start = 0
+            cursor = (self._generation, len(self._off))
+            columns = self._columns() + (self._bill, self._bill_names.names)
+        return cursor, rebuilt, self._rows(start, cursor[1], columns)
+
+    @staticmethod
+    def _rows(start, end, columns):
+        text, off, text_len, ts_len, user, names, bill, bill_names = columns
+        get = text.get
+        for i in range(start, end):
+            offset, length = off[i], text_len[i]
+            yield bill_names[bill[i]], {'text': get(offset, length), 'user': names[user[i]],
+                                        'ts': get(offset + length, ts_len[i]) if ts_len[i] else None}
+
+    # -- writes ----------------------------------------------------------
+
+    def append(self, bill_id, text, user):
+        """Append one comment and return it; concurrent appends share one write and fsync."""
+        with self._lock:
+            if not self._loaded:
+                # load (and import legacy data) before the first append creates the log
+                self.load()
+        ts = datetime.utcnow().isoformat() + 'Z'
+        WRITER.submit(('append', self.log_path), self._append_batch, (bill_id, text, user, ts))
+        return {'text': text, 'user': user, 'ts': ts}
+
+    def _append_batch(self, items):
+        with self._lock, file_lock(self.log_path):
+            self._sync()
+            records = [{'seq': self._seq + i, 'bill': bill_id, 'text': text, 'user': user, 'ts': ts}
+                       for i, (bill_id, text, user, ts) in enumerate(items, 1)]
+            data = b''.join((json.dumps(rec, ensure_ascii=False) + '\n').encode('utf-8') for rec in records)
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, 'ab') as fh:
+                end = fh.seek(0, os.SEEK_END)
+                if end > self._log_offset:
+                    # crashed writer left half a line; drop it before appending
+                    fh.truncate(self._log_offset)
+                fh.write(data)
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._log_offset += len(data)
+            for rec in records:
+                self._apply(rec)
+            if self._compaction_due() and not self._compacting:
+                self._compacting = True
+                threading.Thread(target=self._compact_in_background, daemon=True).start()
+        return [None] * len(items)
+
+    def _compaction_due(self):
+        if not self.compact_ratio:
+            return False
+        snapshot_size = self._snap_sig[1] if self._snap_sig else 0
+        return self._log_offset >= max(self.compact_min_bytes, self.compact_ratio * snapshot_size)
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception:
+            # the log stays authoritative; try again after the next threshold crossing
+            pass
+        finally:
+            self._compacting = False
+
+    def compact(self):
+        """Fold the log into the snapshot and drop the folded records from the log.
+
+        The store lock is only held to pin the current comments and, at the
+        end, to swap in the new files. The snapshot is serialized and fsynced
+        in between, so reads and appends carry on while it is written.
+        """
+        with self._lock:
+            self._sync()
+            seq, snap_sig, folded = self._seq, self._snap_sig, self._log_offset
+            columns = self._columns()
+            pinned = [(bill_id, ids, len(ids)) for bill_id, ids in self._by_bill.items()]
+        if not folded:
+            return
+        tmp = self._write_snapshot_tmp(seq, (
+            (bill_id, self._comments(ids[:n], True, columns)) for bill_id, ids, n in pinned))
+        try:
+            with self._lock, file_lock(self.log_path):
+                self._sync()
+                if self._snap_sig != snap_sig:
+                    # another process compacted meanwhile; its snapshot stands
+                    return
+                # records appended since the pin stay in the log
+                with open(self.log_path, 'rb') as fh:
+                    fh.seek(folded)
+                    tail = fh.read(self._log_offset - folded)
+                os.replace(tmp, self.snapshot_path)
+                # a crash before the log is replaced is harmless: replay skips seq <= last_seq
+                atomic_write(self.log_path, tail)
+                self._snapshot_seq = seq
+                self._snap_sig = _sig(self.snapshot_path)
+                self._log_offset = len(tail)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _write_snapshot_tmp(self, last_seq, by_bill):
+        """Write a snapshot to a fsynced temp file next to the real one and return its path."""
+        directory = os.path.dirname(self.snapshot_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.snapshot_path) + '.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                # one bill's comments at a time, so the whole store is never held as dicts at once
+                fh.write(b'{"last_seq":%d,"comments":{' % last_seq)
+                for n, (bill_id, records) in enumerate(by_bill):
+                    part = ((',' if n else '') + json.dumps(bill_id, ensure_ascii=False) + ':'
+                            + json.dumps(records, ensure_ascii=False, separators=(',', ':')))
+                    fh.write(part.encode('utf-8', 'surrogatepass'))
+                fh.write(b'}}')
+                fh.flush()
+                os.fsync(fh.fileno())
+        except BaseException:
+            os.remove(tmp)
+            raise
+        return tmp
+
+    def import_legacy(self, legacy_path):
+        """One-time conversion of a legacy comments.json into a snapshot."""
+        with open(legacy_path, 'r', encoding='utf-8') as fh:
+            legacy = json.load(fh)
+        by_bill = {}
+        seq = 0
+        for bill_id, comments in legacy.items():
+            for c in comments:
+                seq += 1
+                by_bill.setdefault(bill_id, []).append(
+                    {'text': c.get('text', ''), 'user': c.get('user', 'anonymous'), 'ts': None})
+        os.replace(self._write_snapshot_tmp(seq, by_bill.items()), self.snapshot_path)
+        return seq
+
+
+if __name__ == '__main__':
+    # usage: python comment_store.py import [legacy_comments.json]
+    if len(sys.argv) < 2 or sys.argv[1] != 'import':
+        print('usage: python comment_store.py import [legacy_comments.json]')
+        sys.exit(2)
+    db_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'database'))
+    legacy = sys.argv[2] if len(sys.argv) > 2 else os.path.join(db_dir, 'comments.json')
+    store = CommentStore(os.path.join(db_dir, 'comments.jsonl'), os.path.join(db_dir, 'comments.snapshot.json'))
+    if os.path.exists(store.snapshot_path) or os.path.exists(store.log_path):
+        print('comment store already exists; refusing to overwrite it')
+        sys.exit(1)
+    print(f'imported {store.import_legacy(legacy)} comments from {legacy}')
@@ -0,0 +1,151 @@
+"""Compact in-memory building blocks for the large stores.
+
+* ``NameTable`` interns repeated strings (usernames) as small integer ids,
+  so a million comments by a thousand users hold a thousand strings.
+* ``TextBuffer`` keeps many strings as UTF-8 in one contiguous
+  ``bytearray``, addressed by (offset, length). No per-string object
+  exists until a string is read.
+* ``MappedTextBuffer`` keeps the same bytes in an unlinked temporary file,
+  memory-mapped for reads. Its pages are file-backed: the kernel can drop
+  them under memory pressure instead of swapping, and workers forked from
+  a warmed master share them. A worker copies the file the first time it
+  appends.
+
+``open_text_buffer()`` picks one: mapped with ``COMMENTS_TEXT_MMAP=1``,
+otherwise in memory. Both pickle as plain bytes and unpickle through it
+(see state_snapshot.py), so the setting applies to restored state too.
+"""
+import mmap
+import os
+import tempfile
+import threading
+
+MMAP_TEXT = os.environ.get('COMMENTS_TEXT_MMAP', '0') == '1'
+MIN_MAPPED_CAPACITY = 1 << 20
+
+
+def _encode(text):
+    # lone surrogates survive a JSON round trip, so keep them byte-for-byte
+    return text.encode('utf-8', 'surrogatepass')
+
+
+def _decode(data):
+    return data.decode('utf-8', 'surrogatepass')
+
+
+class NameTable:
+    """Two-way map between names and dense integer ids."""
+
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def id(self, name):
+        i = self.ids.get(name)
+        if i is None:
+            i = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return i
+
+    def __getstate__(self):
+        return self.names
+
+    def __setstate__(self, names):
+        self.names = names
+        self.ids = {name: i for i, name in enumerate(names)}
+
+
+class TextBuffer:
+    def __init__(self, data=b''):
+        self._data = bytearray(data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def append(self, text):
+        """Store ``text``; returns ``(offset, byte length)``."""
+        data = _encode(text)
+        offset = len(self._data)
+        self._data += data
+        return offset, len(data)
+
+    def get(self, offset, length):
+        return self._data[offset:offset + length].decode('utf-8', 'surrogatepass')
+
+    def __reduce__(self):
+        return open_text_buffer, (bytes(self._data),)
+
+
+class MappedTextBuffer:
+    def __init__(self, data=b''):
+        self._open()
+        if data:
+            self._write(data)
+
+    def _open(self):
+        self._file = tempfile.TemporaryFile(prefix='comment-text-')
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._capacity = 0
+        self._map = None
+
+    def __len__(self):
+        return self._size
+
+    def _write(self, data):
+        with self._lock:
+            offset = self._size
+            end = offset + len(data)
+            capacity = self._capacity
+            if end > capacity:
+                # grow the file ahead of the data, so the mapping is only replaced now and then
+                capacity = max(end, 2 * capacity, MIN_MAPPED_CAPACITY)
+                os.ftruncate(self._file.fileno(), capacity)
+            os.pwrite(self._file.fileno(), data, offset)
+            # publish the new extent only once the file covers it, so _view never maps past EOF
+            if capacity != self._capacity:
+                self._capacity = capacity
+                self._map = None
+            self._size = end
+            return offset
+
+    def _view(self):
+        m = self._map
+        if m is None:
+            with self._lock:
+                m = self._map
+                if m is None:
+                    # readers that still hold the previous mapping keep it alive until they are done
+                    m = self._map = mmap.mmap(self._file.fileno(), self._capacity, access=mmap.ACCESS_READ)
+        return m
+
+    def append(self, text):
+        """Store ``text``; returns ``(offset, byte length)``."""
+        if self._pid != os.getpid():
+            # forked: the file is shared with the parent, so continue in a private copy
+            # (with a fresh lock: another thread of the parent may have held the old one)
+            self._lock = threading.Lock()
+            data = self._view()[:self._size] if self._size else b''
+            self._open()
+            if data:
+                self._write(data)
+        data = _encode(text)
+        return self._write(data), len(data)
+
+    def get(self, offset, length):
+        if not length:
+            return ''
+        return _decode(self._view()[offset:offset + length])
+
+    def __reduce__(self):
+        return open_text_buffer, (self._view()[:self._size] if self._size else b'',)
+
+
+def open_text_buffer(data=b''):
+    return MappedTextBuffer(data) if MMAP_TEXT else TextBuffer(data)
@@ -0,0 +1,117 @@
+"""On-the-fly gzip/brotli compression of API and page responses.
+
+Responses whose type is in ``COMPRESSIBLE`` and whose body is at least
+``COMPRESS_MIN_BYTES`` (default 1024) are compressed when the client
+accepts it. brotli is used if the optional ``brotli`` package is
+installed and the client accepts it; otherwise gzip. Bodies with an ETag
+(e.g. the full bill list) are compressed once per ETag and then served
+from a small cache. Compressed responses carry a weak ETag, which still
+matches the client's If-None-Match.
+"""
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+COMPRESSIBLE = {'application/json', 'text/html', 'text/plain', 'text/css', 'text/javascript',
+                'application/javascript', 'image/svg+xml'}
+
+# dynamic responses favour speed; precompressed static files use the maximum levels
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def accepted_encoding(accept_encoding, available=None):
+    """Pick 'br', 'gzip' or None from an Accept-Encoding header."""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.partition(';')
+        params = params.strip().replace(' ', '')
+        try:
+            q = float(params[2:]) if params.startswith('q=') else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    if available is None:
+        available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    for encoding in ('br', 'gzip'):
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return None
+
+
+def compress(data, encoding, best=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else BROTLI_QUALITY)
+    # mtime=0 keeps the output deterministic for identical input
+    return gzip.compress(data, compresslevel=9 if best else GZIP_LEVEL, mtime=0)
+
+
+class _Cache:
+    def __init__(self, size=32):
+        self.size = size
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+_cache = _Cache()
+
+
+def compress_body(data, encoding, etag=None):
+    """Compress ``data``, reusing an earlier result for the same ETag."""
+    if etag is None:
+        return compress(data, encoding)
+    key = (etag, encoding)
+    out = _cache.get(key)
+    if out is None:
+        out = compress(data, encoding)
+        _cache.put(key, out)
+    return out
+
+
+def should_compress(mimetype, length, content_encoding):
+    return (mimetype in COMPRESSIBLE and not content_encoding
+            and length is not None and length >= COMPRESS_MIN_BYTES)
+
+
+def init_app(app):
+    @app.after_request
+    def _compress(response):
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or not should_compress(response.mimetype, response.content_length,
+                                       response.headers.get('Content-Encoding'))):
+            return response
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None or request.method == 'HEAD':
+            return response
+        etag, weak = response.get_etag()
+        response.set_data(compress_body(response.get_data(), encoding, etag))
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,260 @@
+"""In-process pub/sub for Server-Sent Events.
+
+New comments are published on ``comments:<bill_id>`` and new publishes on
+``publishes``. Browsers subscribe with EventSource to
+``/api/bills/<bill_id>/comments/stream`` or ``/api/publishes/stream``, and
+each event is pushed to every open tab once, instead of every tab polling the
+full list.
+
+* Each event is encoded once, and the same bytes go to every subscriber.
+* Each subscriber has a bounded queue (``SSE_QUEUE_SIZE``). A client that
+  falls that far behind is disconnected rather than buffered without limit;
+  EventSource then reconnects and catches up from the replay buffer.
+* Every channel keeps its last ``SSE_REPLAY_SIZE`` events. A reconnect that
+  sends ``Last-Event-ID`` (or ``?last_event_id=``) gets the events it missed.
+  If those are gone, or the server restarted, it gets a ``reset`` event
+  telling it to refetch the list.
+* A comment line is sent every ``SSE_HEARTBEAT`` seconds, so proxies keep
+  idle streams open and dead clients are noticed.
+* Under a threaded WSGI server every open stream holds a worker thread.
+  Only ``SSE_THREAD_STREAMS`` of those run at once per process; further
+  streams are refused with 503 and the pages fall back to polling. Under
+  asgi.py a stream is a coroutine and only ``SSE_MAX_SUBSCRIBERS`` applies.
+
+The list endpoints return the current position in ``X-Last-Event-ID``.
+Subscribing from that position guarantees nothing posted between the fetch
+and the subscribe is missed, though it may be repeated.
+
+The broker lives in one process. With several worker processes, a client
+only sees events published by the worker it is connected to.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+SSE_QUEUE_SIZE = int(os.environ.get('SSE_QUEUE_SIZE', 64))
+SSE_REPLAY_SIZE = int(os.environ.get('SSE_REPLAY_SIZE', 256))
+SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', 15))
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 1000))
+SSE_THREAD_STREAMS = int(os.environ.get('SSE_THREAD_STREAMS', 4))
+MAX_CHANNELS = 4096
+
+RETRY_MS = 3000
+PING = b': ping\n\n'
+RESET = b'event: reset\ndata: {}\n\n'
+# X-Accel-Buffering stops nginx from holding events back in its buffer
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class Event:
+    __slots__ = ('seq', 'data')
+
+    def __init__(self, seq, data):
+        self.seq = seq
+        self.data = data
+
+
+class Channel:
+    __slots__ = ('subscribers', 'replay', 'floor')
+
+    def __init__(self, floor):
+        self.subscribers = set()
+        self.replay = deque(maxlen=SSE_REPLAY_SIZE)
+        # seq of the newest event this channel can no longer replay
+        self.floor = floor
+
+
+class Subscription:
+    """One client's stream. Filled by Broker.publish, drained by get() or wait()."""
+
+    def __init__(self, channel, maxsize, loop=None):
+        self.channel = channel
+        self.maxsize = maxsize
+        self.replay = []
+        self.reset = False
+        self.overflowed = False
+        self._queue = deque()
+        self._loop = loop
+        self._ready = threading.Event() if loop is None else asyncio.Event()
+
+    def _offer(self, event):
+        if self.overflowed:
+            return False
+        if len(self._queue) >= self.maxsize:
+            self.overflowed = True
+        else:
+            self._queue.append(event)
+        if self._loop is None:
+            self._ready.set()
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:  # loop already closed
+                pass
+        return not self.overflowed
+
+    def _drain(self):
+        self._ready.clear()
+        events = []
+        while self._queue:
+            events.append(self._queue.popleft())
+        return events
+
+    def get(self, timeout):
+        """Pending events, waiting up to ``timeout`` seconds for one; [] on timeout."""
+        if not self._queue and not self.overflowed:
+            self._ready.wait(timeout)
+        return self._drain()
+
+    async def wait(self, timeout):
+        """Async get(), for subscriptions created with a loop."""
+        if not self._queue and not self.overflowed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._drain()
+
+    def prelude(self):
+        """First bytes of the stream: reconnect delay, then a reset or the missed events."""
+        parts = [f'retry: {RETRY_MS}\n\n'.encode()]
+        parts += [RESET] if self.reset else [e.data for e in self.replay]
+        return b''.join(parts)
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = OrderedDict()
+        self._seq = 0
+        self._evicted = 0
+        self._subscribers = 0
+        self._thread_streams = 0
+        self.boot = format(int(time.time()), 'x')
+        self.published = 0
+        self.dropped = 0
+
+    def position(self):
+        """Event id of the newest event; a subscriber starting here misses nothing after this point."""
+        return f'{self.boot}-{self._seq}'
+
+    def _channel(self, name):
+        ch = self._channels.get(name)
+        if ch is None:
+            ch = self._channels[name] = Channel(self._evicted)
+            if len(self._channels) > MAX_CHANNELS:
+                for old_name, old in self._channels.items():
+                    if not old.subscribers and old is not ch:
+                        del self._channels[old_name]
+                        if old.replay:
+                            self._evicted = max(self._evicted, old.replay[-1].seq)
+                        break
+        self._channels.move_to_end(name)
+        return ch
+
+    def publish(self, channel, event_type, payload):
+        with self._lock:
+            self._seq += 1
+            data = (f'id: {self.boot}-{self._seq}\nevent: {event_type}\n'
+                    f'data: {json.dumps(payload, ensure_ascii=False, separators=(",", ":"))}\n\n').encode('utf-8')
+            event = Event(self._seq, data)
+            ch = self._channel(channel)
+            if len(ch.replay) == ch.replay.maxlen:
+                ch.floor = ch.replay[0].seq
+            ch.replay.append(event)
+            self.published += 1
+            for sub in list(ch.subscribers):
+                if not sub._offer(event):
+                    ch.subscribers.discard(sub)
+                    self._subscribers -= 1
+                    self.dropped += 1
+        return event
+
+    def _parse_id(self, last_event_id):
+        boot, _, seq = (last_event_id or '').strip().rpartition('-')
+        if boot != self.boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, channel, last_event_id=None, loop=None):
+        """Register a subscriber, with the events it missed since ``last_event_id`` queued for replay."""
+        sub = Subscription(channel, SSE_QUEUE_SIZE, loop)
+        with self._lock:
+            if self._subscribers >= SSE_MAX_SUBSCRIBERS:
+                raise TooManySubscribers()
+            ch = self._channel(channel)
+            if last_event_id:
+                seq = self._parse_id(last_event_id)
+                if seq is None or seq > self._seq or seq < ch.floor:
+                    sub.reset = True
+                else:
+                    sub.replay = [e for e in ch.replay if e.seq > seq]
+            ch.subscribers.add(sub)
+            self._subscribers += 1
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            ch = self._channels.get(sub.channel)
+            if ch is not None and sub in ch.subscribers:
+                ch.subscribers.discard(sub)
+                self._subscribers -= 1
+
+    def open_thread_stream(self, channel, last_event_id=None):
+        """Subscribe for a sync (Flask) stream, taking one of the ``SSE_THREAD_STREAMS`` slots."""
+        with self._lock:
+            if self._thread_streams >= SSE_THREAD_STREAMS:
+                raise TooManySubscribers()
+            self._thread_streams += 1
+        try:
+            return ThreadStream(self.subscribe(channel, last_event_id))
+        except BaseException:
+            self._close_thread_stream(None)
+            raise
+
+    def _close_thread_stream(self, sub):
+        if sub is not None:
+            self.unsubscribe(sub)
+        with self._lock:
+            self._thread_streams -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'subscribers': self._subscribers, 'thread_streams': self._thread_streams,
+                    'channels': len(self._channels), 'published': self.published, 'dropped': self.dropped}
+
+
+EVENTS = Broker()
+
+
+class ThreadStream:
+    """Sync SSE body (the Flask routes). The WSGI server calls close() when the
+    client goes away, even if the body was never iterated; that frees the slot."""
+
+    def __init__(self, sub):
+        self.sub = sub
+        self._closed = False
+
+    def __iter__(self):
+        sub = self.sub
+        yield sub.prelude()
+        while not sub.overflowed and not self._closed:
+            events = sub.get(SSE_HEARTBEAT)
+            yield b''.join(e.data for e in events) if events else PING
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            EVENTS._close_thread_stream(self.sub)
+
+
+def last_event_id(headers, args):
+    # EventSource sends the header on reconnect; the query parameter covers the first connect
+    return headers.get('Last-Event-ID') or args.get('last_event_id')
@@ -0,0 +1,135 @@
+"""Streaming NDJSON export of bills, comments and publishes.
+
+One JSON object per line, produced by generators straight from the storage
+backend: bills are read line by line from billsList.txt (or a SQLite
+cursor), and comments and publishes are walked in place. Memory use
+therefore stays flat however large the dump is. ``since`` keeps only newer
+records:
+
+* bills       bill id, exclusive (``B120`` or ``120``)
+* comments    ISO timestamp, exclusive (legacy comments without one are skipped)
+* publishes   ISO timestamp, exclusive
+
+Served at ``/api/export/<kind>`` and from the command line:
+
+    python export.py comments --since 2025-06-01T00:00:00Z > comments.ndjson
+"""
+import argparse
+import hmac
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+KINDS = ('bills', 'comments', 'publishes')
+
+# lines are joined into chunks of this many records before being written out
+CHUNK_RECORDS = 500
+
+EXPORT_TOKEN = os.environ.get('EXPORT_TOKEN')
+
+
+def parse_timestamp(value):
+    """ISO-8601 -> naive UTC datetime (the format the stores write)."""
+    dt = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def parse_since(kind, value):
+    """Validate ``since`` for ``kind``. Raises KeyError for an unknown kind, ValueError for a bad value."""
+    if kind not in KINDS:
+        raise KeyError(kind)
+    if not value:
+        return None
+    if kind == 'bills':
+        digits = value.strip().upper().removeprefix('B')
+        if not digits.isdigit():
+            raise ValueError('since must be a bill id such as B120')
+        return int(digits)
+    try:
+        return parse_timestamp(value)
+    except ValueError:
+        raise ValueError('since must be an ISO timestamp such as 2025-06-01T00:00:00Z') from None
+
+
+def _newer(ts, since):
+    if not ts:
+        return False
+    try:
+        return parse_timestamp(ts) > since
+    except ValueError:
+        return False
+
+
+def records(storage, kind, since=None):
+    """Yield the records of ``kind``, newer than ``since`` (already parsed) if given."""
+    if kind == 'bills':
+        for bill in storage.bills.iter_all():
+            num = bill['id'][1:]
+            if since is None or (num.isdigit() and int(num) > since):
+                yield bill
+    elif kind == 'comments':
+        for bill_id, c in storage.comments.iter_all():
+            if since is None or _newer(c.get('ts'), since):
+                yield {'bill': bill_id, 'text': c['text'], 'user': c['user'], 'ts': c.get('ts')}
+    elif kind == 'publishes':
+        for p in storage.publishes.iter_all():
+            if since is None or _newer(p.get('timestamp'), since):
+                yield p
+    else:
+        raise KeyError(kind)
+
+
+def ndjson(rows, chunk=CHUNK_RECORDS):
+    """Encode ``rows`` as NDJSON, yielding one bytes chunk per ``chunk`` records."""
+    dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    lines = []
+    for row in rows:
+        lines.append(dumps(row))
+        if len(lines) >= chunk:
+            lines.append('')
+            yield '\n'.join(lines).encode('utf-8')
+            lines = []
+    if lines:
+        lines.append('')
+        yield '\n'.join(lines).encode('utf-8')
+
+
+def authorized(is_admin, authorization):
+    """Admins may export; so may jobs presenting ``Authorization: Bearer $EXPORT_TOKEN``."""
+    if is_admin:
+        return True
+    if not EXPORT_TOKEN or not authorization or not authorization.startswith('Bearer '):
+        return False
+    return hmac.compare_digest(authorization[len('Bearer '):].strip(), EXPORT_TOKEN)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export bills, comments or publishes as NDJSON.')
+    parser.add_argument('kind', choices=KINDS)
+    parser.add_argument('--since', help='bill id (bills) or ISO timestamp (comments, publishes), exclusive')
+    parser.add_argument('--out', help='output file (default: stdout)')
+    args = parser.parse_args(argv)
+    try:
+        since = parse_since(args.kind, args.since)
+    except ValueError as e:
+        parser.error(str(e))
+
+    from storage import open_storage
+    storage = open_storage()
+    storage.load()
+    out = open(args.out, 'wb') if args.out else sys.stdout.buffer
+    try:
+        for chunk in ndjson(records(storage, args.kind, since)):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+        storage.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
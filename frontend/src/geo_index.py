@@ -0,0 +1,202 @@
+"""Spatial index and zoom-level clustering for the map (database/geo.json).
+
+geo.json is a GeoJSON FeatureCollection of points. Each feature has a
+``type`` property (capital, city, district, ...) plus whatever the popup
+shows. The file is re-read when it changes.
+
+Points are projected to Web Mercator and bucketed into a grid, separately
+for each feature type, at every zoom level up to ``CLUSTER_MAX_ZOOM``. A
+grid cell is a quarter of a 256px map tile on each side. Below
+``CLUSTER_MAX_ZOOM`` a cell holding several points is returned as one
+cluster: count, centroid and bounds. A cell holding a single point is
+returned as the point itself. From ``CLUSTER_MAX_ZOOM`` on every point is
+returned, looked up through the finest grid.
+
+A viewport query is answered tile by tile. Each (type, zoom, tile) result
+is cached, so panning around only computes the tiles that newly come into
+view.
+"""
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+
+CLUSTER_MAX_ZOOM = 12
+MAX_ZOOM = 20
+CELLS_PER_TILE = 4
+MAX_TILES = 256
+TILE_CACHE_SIZE = 4096
+MAX_LAT = 85.05112878
+
+
+def project(lng, lat):
+    """(lng, lat) -> Web Mercator (x, y) in [0, 1), y growing southwards."""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    x = (lng + 180.0) / 360.0
+    s = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + s) / (1 - s)) / (4 * math.pi)
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+
+def unproject(x, y):
+    lng = x * 360.0 - 180.0
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return lng, lat
+
+
+class Cluster:
+    __slots__ = ('count', 'sx', 'sy', 'min_x', 'min_y', 'max_x', 'max_y', 'members')
+
+    def __init__(self):
+        self.count = 0
+        self.sx = self.sy = 0.0
+        self.min_x = self.min_y = 1.0
+        self.max_x = self.max_y = 0.0
+        self.members = []
+
+    def add(self, i, x, y):
+        self.count += 1
+        self.sx += x
+        self.sy += y
+        self.min_x, self.max_x = min(self.min_x, x), max(self.max_x, x)
+        self.min_y, self.max_y = min(self.min_y, y), max(self.max_y, y)
+        self.members.append(i)
+
+    def merge(self, other):
+        self.count += other.count
+        self.sx += other.sx
+        self.sy += other.sy
+        self.min_x, self.max_x = min(self.min_x, other.min_x), max(self.max_x, other.max_x)
+        self.min_y, self.max_y = min(self.min_y, other.min_y), max(self.max_y, other.max_y)
+        # a coarse cell only lists its point when it has just the one
+        self.members = other.members if self.count == 1 else None
+
+
+class GeoIndex:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sig = None
+        self.version = 0
+        self.features = []   # output dicts, indexed by position
+        self._points = []    # (x, y) per feature
+        self._grids = {}     # (type, zoom) -> {(cx, cy): Cluster}
+        self.types = []
+        self._tiles = OrderedDict()
+
+    def refresh(self):
+        """Reload geo.json if it changed. A missing file means an empty map."""
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            sig = None
+        if sig == self._sig and self.version:
+            return
+        with self._lock:
+            if sig != self._sig or not self.version:
+                self._load(sig)
+
+    def _load(self, sig):
+        collection = {'features': []}
+        if sig is not None:
+            with open(self.path, encoding='utf-8') as fh:
+                collection = json.load(fh)
+        features, points, grids = [], [], {}
+        for f in collection.get('features', []):
+            geometry = f.get('geometry') or {}
+            if geometry.get('type') != 'Point':
+                continue
+            lng, lat = geometry['coordinates'][:2]
+            props = dict(f.get('properties') or {})
+            ftype = props.get('type') or 'feature'
+            i = len(features)
+            features.append(dict(props, id=f.get('id', i), type=ftype, lat=lat, lng=lng))
+            x, y = project(lng, lat)
+            points.append((x, y))
+            n = CELLS_PER_TILE << CLUSTER_MAX_ZOOM
+            grid = grids.setdefault((ftype, CLUSTER_MAX_ZOOM), {})
+            key = (int(x * n), int(y * n))
+            cell = grid.get(key)
+            if cell is None:
+                cell = grid[key] = Cluster()
+            cell.add(i, x, y)
+        # each coarser grid is built from the one below it: a cell is its four children
+        for ftype in {t for t, _ in grids}:
+            for z in range(CLUSTER_MAX_ZOOM - 1, -1, -1):
+                grid = grids[(ftype, z)] = {}
+                for (cx, cy), child in grids[(ftype, z + 1)].items():
+                    cell = grid.get((cx >> 1, cy >> 1))
+                    if cell is None:
+                        cell = grid[(cx >> 1, cy >> 1)] = Cluster()
+                    cell.merge(child)
+        self.features, self._points, self._grids = features, points, grids
+        self.types = sorted({f['type'] for f in features})
+        self._tiles.clear()
+        self._sig = sig
+        self.version += 1
+
+    def _tile(self, ftype, z, tx, ty):
+        key = (self.version, ftype, z, tx, ty)
+        with self._lock:
+            hit = self._tiles.get(key)
+            if hit is not None:
+                self._tiles.move_to_end(key)
+                return hit
+        features, clusters = [], []
+        zc = min(z, CLUSTER_MAX_ZOOM)
+        grid = self._grids.get((ftype, zc), {})
+        n = CELLS_PER_TILE << zc
+        # tile bounds in world coordinates, then the grid cells they cover
+        x0, x1 = tx / (1 << z), (tx + 1) / (1 << z)
+        y0, y1 = ty / (1 << z), (ty + 1) / (1 << z)
+        for cx in range(int(x0 * n), max(int(x0 * n) + 1, math.ceil(x1 * n))):
+            for cy in range(int(y0 * n), max(int(y0 * n) + 1, math.ceil(y1 * n))):
+                cell = grid.get((cx, cy))
+                if cell is None:
+                    continue
+                if z < CLUSTER_MAX_ZOOM and cell.count > 1:
+                    lng, lat = unproject(cell.sx / cell.count, cell.sy / cell.count)
+                    west, north = unproject(cell.min_x, cell.min_y)
+                    east, south = unproject(cell.max_x, cell.max_y)
+                    clusters.append({'type': ftype, 'count': cell.count, 'lat': round(lat, 6), 'lng': round(lng, 6),
+                                     'bbox': [round(west, 6), round(south, 6), round(east, 6), round(north, 6)]})
+                    continue
+                for i in cell.members:
+                    x, y = self._points[i]
+                    if x0 <= x < x1 and y0 <= y < y1:
+                        features.append(self.features[i])
+        result = (features, clusters)
+        with self._lock:
+            self._tiles[key] = result
+            while len(self._tiles) > TILE_CACHE_SIZE:
+                self._tiles.popitem(last=False)
+        return result
+
+    def query(self, bbox, zoom, types=None):
+        """Features and clusters inside ``bbox`` = (west, south, east, north) at ``zoom``.
+
+        Raises ValueError if the box spans more than ``MAX_TILES`` tiles at that zoom.
+        """
+        self.refresh()
+        west, south, east, north = bbox
+        z = max(0, min(MAX_ZOOM, int(zoom)))
+        x0, y0 = project(max(-180.0, min(180.0, west)), north)
+        x1, y1 = project(max(-180.0, min(180.0, east)), south)
+        scale = 1 << z
+        tx0, tx1 = int(x0 * scale), int(x1 * scale)
+        ty0, ty1 = int(y0 * scale), int(y1 * scale)
+        if tx1 < tx0 or ty1 < ty0:
+            raise ValueError('bbox must be west,south,east,north')
+        if (tx1 - tx0 + 1) * (ty1 - ty0 + 1) > MAX_TILES:
+            raise ValueError('bbox covers too much of the map for this zoom')
+        wanted = self.types if types is None else [t for t in self.types if t in types]
+        features, clusters = [], []
+        for ftype in wanted:
+            for tx in range(tx0, tx1 + 1):
+                for ty in range(ty0, ty1 + 1):
+                    f, c = self._tile(ftype, z, tx, ty)
+                    features += f
+                    clusters += c
+        return {'zoom': z, 'features': features, 'clusters': clusters}
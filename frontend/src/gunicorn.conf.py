@@ -0,0 +1,31 @@
+"""gunicorn settings.
+
+    cd frontend/src && gunicorn 'app:create_app()'
+
+The app is loaded once in the master (``preload_app``). create_app() warms
+every store and index there, and the workers are forked from it, sharing
+that memory copy-on-write. Without preload, each worker runs create_app()
+itself and restores the stores from database/state.snapshot.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+# each open event stream holds one of these threads; leave most of them for normal requests
+os.environ.setdefault('SSE_THREAD_STREAMS', str(max(1, threads // 4)))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+
+def worker_exit(server, worker):
+    # quiz counts not yet flushed; the writer thread is still up here, unlike under atexit
+    from app import QUIZ_STATS
+    QUIZ_STATS.flush()
+
+
+def pre_fork(server, worker):
+    # SQLite connections opened while warming must not be shared with the children
+    if server.cfg.preload_app:
+        from app import STORAGE
+        STORAGE.close()
@@ -0,0 +1,333 @@
+"""Shared HTTP client for the Java backend (JAVA_BACKEND_URL).
+
+Every proxied route goes through one ``JavaBackendClient`` so that a slow
+or dead backend cannot tie up the Flask workers:
+
+* one pooled ``requests.Session`` keeps connections alive across requests;
+* short connect/read timeouts bound how long a worker can wait;
+* a circuit breaker opens after repeated failures (errors, timeouts and
+  5xx responses) and fails fast until a single trial request succeeds
+  again. Backend responses, 5xx included, are passed through as they are;
+* successful GETs are cached for a few seconds. Expired entries are still
+  served (stale-while-revalidate) while one background request refreshes
+  them, and any cached copy is preferred over an error.
+"""
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import span
+
+
+class BackendUnavailable(Exception):
+    """The Java backend failed, timed out or the circuit is open."""
+
+
+class ProxyResponse:
+    __slots__ = ('status', 'content', 'content_type', 'stale')
+
+    def __init__(self, status, content, content_type, stale=False):
+        self.status = status
+        self.content = content
+        self.content_type = content_type
+        self.stale = stale
+
+
+class CircuitBreaker:
+    """closed -> open after ``threshold`` consecutive failures; after
+    ``reset_after`` seconds one trial request is let through (half-open)."""
+
+    TRIAL = 'trial'
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return self.TRIAL
+            self.rejected += 1
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def end_trial(self):
+        """Let the next request try again if a trial ended without success() or failure()."""
+        with self._lock:
+            self._trial = False
+
+
+class JavaBackendClient:
+    def __init__(self, base_url, pool_connections=4, pool_maxsize=16, connect_timeout=1.0,
+                 read_timeout=3.0, failure_threshold=5, reset_after=30.0, cache_ttl=5.0, stale_ttl=60.0):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+        self.pool_maxsize = pool_maxsize
+        self.breaker = CircuitBreaker(failure_threshold, reset_after)
+        self.session = requests.Session()
+        # pool_block=False: past pool_maxsize, extra connections are opened and then discarded
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._cache = {}         # url -> (fetched_at, ProxyResponse)
+        self._refreshing = set()
+        self._stats = {'requests': 0, 'errors': 0, 'cache_hits': 0, 'stale_hits': 0, 'refreshes': 0}
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ.get
+        return cls(
+            env('JAVA_BACKEND_URL', 'http://localhost:8080'),
+            pool_connections=int(env('JAVA_POOL_CONNECTIONS', 4)),
+            pool_maxsize=int(env('JAVA_POOL_MAXSIZE', 16)),
+            connect_timeout=float(env('JAVA_CONNECT_TIMEOUT', 1.0)),
+            read_timeout=float(env('JAVA_READ_TIMEOUT', 3.0)),
+            failure_threshold=int(env('JAVA_BREAKER_FAILURES', 5)),
+            reset_after=float(env('JAVA_BREAKER_RESET', 30.0)),
+            cache_ttl=float(env('JAVA_CACHE_TTL', 5.0)),
+            stale_ttl=float(env('JAVA_CACHE_STALE', 60.0)),
+        )
+
+    def _url(self, path, params=None):
+        url = self.base_url + path
+        if params:
+            url += '?' + urlencode(sorted(params.items()))
+        return url
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _before_request(self):
+        allowed = self.breaker.allow()
+        if not allowed:
+            raise BackendUnavailable('circuit open')
+        self._count('requests')
+        return allowed
+
+    def _after_request(self, allowed):
+        if allowed is CircuitBreaker.TRIAL:
+            self.breaker.end_trial()
+
+    def _failed(self, error):
+        self.breaker.failure()
+        self._count('errors')
+        return BackendUnavailable(str(error))
+
+    def _response(self, status, content, content_type):
+        if status >= 500:
+            # counts against the breaker, but the caller still gets the backend's own answer
+            self.breaker.failure()
+            self._count('errors')
+        else:
+            self.breaker.success()
+        return ProxyResponse(status, content, content_type or 'application/json')
+
+    def _lookup(self, url):
+        """Return (entry, usable response or None, whether to refresh in the background)."""
+        with self._lock:
+            entry = self._cache.get(url)
+        if entry is None:
+            return None, None, False
+        age = time.monotonic() - entry[0]
+        if age < self.cache_ttl:
+            self._count('cache_hits')
+            return entry, entry[1], False
+        if age < self.cache_ttl + self.stale_ttl:
+            self._count('stale_hits')
+            return entry, self._stale(entry), True
+        return entry, None, False
+
+    @staticmethod
+    def _stale(entry):
+        cached = entry[1]
+        return ProxyResponse(cached.status, cached.content, cached.content_type, stale=True)
+
+    def _store(self, url, resp):
+        if resp.status == 200:
+            with self._lock:
+                self._cache[url] = (time.monotonic(), resp)
+        return resp
+
+    def _claim_refresh(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return False
+            self._refreshing.add(url)
+            self._stats['refreshes'] += 1
+            return True
+
+    def _release_refresh(self, url):
+        with self._lock:
+            self._refreshing.discard(url)
+
+    def _invalidate(self, url):
+        with self._lock:
+            self._cache.pop(url, None)
+
+    def _fetch(self, method, url, **kwargs):
+        allowed = self._before_request()
+        try:
+            with span(f'java.{method.lower()}'):
+                r = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            return self._response(r.status_code, r.content, r.headers.get('Content-Type'))
+        except requests.RequestException as e:
+            raise self._failed(e) from e
+        finally:
+            self._after_request(allowed)
+
+    def get(self, path, params=None):
+        """GET through the cache. Raises BackendUnavailable if nothing usable is cached."""
+        url = self._url(path, params)
+        entry, cached, refresh = self._lookup(url)
+        if refresh:
+            self._refresh_async(url)
+        if cached is not None:
+            return cached
+        try:
+            resp = self._fetch('GET', url)
+        except BackendUnavailable:
+            if entry is None:
+                raise
+            return self._stale(entry)
+        return self._fallback(entry, self._store(url, resp))
+
+    def _fallback(self, entry, resp):
+        # a cached copy beats a 5xx; without one, the 5xx is passed through
+        if resp.status >= 500 and entry is not None:
+            return self._stale(entry)
+        return resp
+
+    def _refresh_async(self, url):
+        if self._claim_refresh(url):
+            threading.Thread(target=self._refresh, args=(url,), daemon=True).start()
+
+    def _refresh(self, url):
+        try:
+            self._store(url, self._fetch('GET', url))
+        except BackendUnavailable:
+            pass
+        finally:
+            self._release_refresh(url)
+
+    def send(self, method, path, **kwargs):
+        """Uncached request (POST, PUT, ...). Drops the cached GET for the same path."""
+        url = self._url(path)
+        resp = self._fetch(method, url, **kwargs)
+        self._invalidate(url)
+        return resp
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats)
+            s['cached'] = len(self._cache)
+        s['breaker'] = self.breaker.state
+        s['rejected'] = self.breaker.rejected
+        return s
+
+
+class AsyncJavaBackendClient:
+    """httpx-based twin of JavaBackendClient for the ASGI app.
+
+    Shares the sync client's breaker, cache and counters, so both serving
+    modes see the same backend health. Requires ``httpx``.
+    """
+
+    def __init__(self, sync, max_connections=100):
+        import httpx
+        self.sync = sync
+        connect, read = sync.timeout
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read, connect=connect),
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=sync.pool_maxsize))
+        self._httpx = httpx
+        self._tasks = set()
+
+    async def _fetch(self, method, url, **kwargs):
+        sync = self.sync
+        allowed = sync._before_request()
+        try:
+            with span(f'java.{method.lower()}'):
+                r = await self.client.request(method, url, **kwargs)
+            return sync._response(r.status_code, r.content, r.headers.get('Content-Type'))
+        except self._httpx.HTTPError as e:
+            raise sync._failed(e) from e
+        finally:
+            sync._after_request(allowed)
+
+    async def get(self, path, params=None):
+        sync = self.sync
+        url = sync._url(path, params)
+        entry, cached, refresh = sync._lookup(url)
+        if refresh and sync._claim_refresh(url):
+            task = asyncio.create_task(self._refresh(url))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if cached is not None:
+            return cached
+        try:
+            resp = await self._fetch('GET', url)
+        except BackendUnavailable:
+            if entry is None:
+                raise
+            return sync._stale(entry)
+        return sync._fallback(entry, sync._store(url, resp))
+
+    async def _refresh(self, url):
+        try:
+            self.sync._store(url, await self._fetch('GET', url))
+        except BackendUnavailable:
+            pass
+        finally:
+            self.sync._release_refresh(url)
+
+    async def send(self, method, path, **kwargs):
+        url = self.sync._url(path)
+        resp = await self._fetch(method, url, **kwargs)
+        self.sync._invalidate(url)
+        return resp
+
+    async def aclose(self):
+        await self.client.aclose()
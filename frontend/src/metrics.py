@@ -0,0 +1,237 @@
+"""Request metrics and timing spans, exposed in Prometheus text format.
+
+* ``init_app(app)`` times every Flask request: a latency histogram and a
+  status counter per endpoint (the URL rule, e.g. ``/api/bills/<bill_id>/comments``),
+  plus an in-flight gauge.
+* ``span(name)`` times a block. It feeds a per-span histogram and, during
+  a request, that request's breakdown. ``instrument_storage(storage)`` wraps
+  every repository method in a ``storage.<repo>.<method>`` span; for
+  generators such as ``iter_all`` the span lasts until iteration ends.
+* Requests slower than ``SLOW_REQUEST_MS`` (default 500, 0 disables) are
+  logged to the ``slow_requests`` logger with their span breakdown.
+* ``METRICS.render()`` produces the /metrics page. Other modules can add
+  their own counters and gauges with ``METRICS.add_collector(fn)``.
+"""
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request
+from flask.json.provider import DefaultJSONProvider
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', 500))
+
+slow_log = logging.getLogger('slow_requests')
+
+# spans recorded by the current request: [(name, seconds), ...]
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}     # (endpoint, method, status) -> count
+        self._latency = {}      # (endpoint, method) -> Histogram
+        self._in_flight = {}    # endpoint -> gauge
+        self._spans = {}        # span name -> Histogram
+        self._collectors = []
+
+    def add_collector(self, fn):
+        """``fn()`` returns [(name, 'counter' or 'gauge', help, {labels} or None, value), ...]."""
+        self._collectors.append(fn)
+
+    def request_started(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def request_finished(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+
+    def observe_request(self, endpoint, method, status, seconds):
+        with self._lock:
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            hist = self._latency.get((endpoint, method))
+            if hist is None:
+                hist = self._latency[(endpoint, method)] = Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+
+    def observe_span(self, name, seconds):
+        with self._lock:
+            hist = self._spans.get(name)
+            if hist is None:
+                hist = self._spans[name] = Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                      '# TYPE http_requests_total counter']
+            for (endpoint, method, status), n in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{_labels([("endpoint", endpoint), ("method", method), ("status", status)])} {n}')
+            lines += ['# HELP http_requests_in_flight Requests currently being handled.',
+                      '# TYPE http_requests_in_flight gauge']
+            for endpoint, n in sorted(self._in_flight.items()):
+                lines.append(f'http_requests_in_flight{_labels([("endpoint", endpoint)])} {n}')
+            lines += self._render_histograms('http_request_duration_seconds', 'Request latency in seconds.',
+                                             (([('endpoint', e), ('method', m)], h) for (e, m), h in sorted(self._latency.items())))
+            lines += self._render_histograms('span_duration_seconds', 'Time spent in named spans (storage, proxy, encoding).',
+                                             (([('span', name)], h) for name, h in sorted(self._spans.items())))
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception:
+                continue
+            seen = set()
+            for name, kind, help_text, labels, value in samples:
+                if name not in seen:
+                    seen.add(name)
+                    lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                lines.append(f'{name}{_labels(sorted((labels or {}).items()))} {value}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(name, help_text, series):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, h in series:
+            cumulative = 0
+            for bound, n in zip(h.buckets + (float('inf'),), h.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels(labels + [("le", le)])} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {h.sum:.6f}')
+            lines.append(f'{name}_count{_labels(labels)} {h.count}')
+        return lines
+
+
+METRICS = Registry()
+
+
+@contextmanager
+def span(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        METRICS.observe_span(name, elapsed)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def timed(name):
+    """Decorator form of ``span``. A generator function is timed over its whole iteration."""
+    def decorate(fn):
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator(*args, **kwargs):
+                with span(name):
+                    yield from fn(*args, **kwargs)
+            return generator
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument_storage(storage):
+    """Wrap the public methods of each repository in a ``storage.<repo>.<method>`` span."""
+    for kind in ('users', 'bills', 'comments', 'publishes'):
+        repo = getattr(storage, kind)
+        for attr in dir(type(repo)):
+            if attr.startswith('_') or isinstance(getattr(type(repo), attr), property):
+                continue
+            method = getattr(repo, attr)
+            if callable(method):
+                setattr(repo, attr, timed(f'storage.{kind}.{attr}')(method))
+    return storage
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        with span('json.encode'):
+            return super().response(*args, **kwargs)
+
+
+# -- request tracking (shared by the Flask hooks and the ASGI app) -----------
+
+def begin_request(endpoint):
+    METRICS.request_started(endpoint)
+    _request_spans.set([])
+    return time.perf_counter()
+
+
+def end_request(endpoint, method, status, path, started):
+    elapsed = time.perf_counter() - started
+    spans = _request_spans.get() or []
+    _request_spans.set(None)
+    METRICS.request_finished(endpoint)
+    METRICS.observe_request(endpoint, method, str(status), elapsed)
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        breakdown = ', '.join(f'{name}={seconds * 1000:.1f}ms' for name, seconds in spans) or 'no spans'
+        slow_log.warning('slow request %s %s -> %s in %.1fms [%s]', method, path, status, elapsed * 1000, breakdown)
+
+
+def init_app(app):
+    def endpoint():
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    app.json = TimedJSONProvider(app)
+
+    @app.before_request
+    def _metrics_start():
+        name = endpoint()
+        g._metrics = (name, begin_request(name))
+
+    @app.after_request
+    def _metrics_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        state = g.pop('_metrics', None)
+        if state is None:
+            return
+        name, started = state
+        status = g.pop('_metrics_status', 500)
+        end_request(name, request.method, status, request.full_path.rstrip('?'), started)
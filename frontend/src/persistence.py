@@ -0,0 +1,238 @@
+"""Crash-safe, multi-worker-safe writes for the file-backed stores.
+
+* ``file_lock(path)`` takes an advisory lock on ``<path>.lock`` so workers
+  (e.g. several gunicorn processes) serialize their writes to one file.
+* ``atomic_write(path, data)`` writes to a temp file, fsyncs it and
+  ``os.replace``s it over the target, so readers see the old or the new
+  document but never a truncated one.
+* ``GroupCommitWriter`` coalesces every mutation submitted for the same
+  file within a short window into one locked read-modify-write (or one
+  append) and one fsync. Callers block until their batch is durable. A
+  mutation that raises is rolled back on its own and its caller alone gets
+  the exception; the rest of its batch still commits.
+
+``WRITER`` is the process-wide writer shared by the stores.
+"""
+import copy
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+
+_held = threading.local()
+
+
+@contextmanager
+def file_lock(path):
+    # re-entrant per thread: flock would block on a second descriptor in the same process
+    held = _held.__dict__.setdefault('counts', {})
+    if held.get(path):
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.lock', 'a') as fh:
+        if fcntl:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        held[path] = 1
+        try:
+            yield
+        finally:
+            held[path] = 0
+            if fcntl:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _fsync_dir(path):
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path, data):
+    """Replace ``path`` with ``data`` (bytes) via temp file + fsync + rename."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(path)
+
+
+def read_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return default()
+
+
+def dump_json(data):
+    return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+class Failed:
+    """An ``apply_batch`` result that raises ``error`` in that item's caller only."""
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class _Pending:
+    __slots__ = ('item', 'done', 'result', 'error')
+
+    def __init__(self, item):
+        self.item = item
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class GroupCommitWriter:
+    """Batches mutations per file and applies each batch with one flush."""
+
+    def __init__(self, window=0.005):
+        self.window = window
+        self._cond = threading.Condition()
+        self._queues = {}   # key -> (apply_batch, [pending, ...]) in submission order
+        self._thread = None
+        self._pid = None
+        self._stats = {
+            'flushes': 0, 'mutations': 0, 'errors': 0,
+            'last_batch_size': 0, 'max_batch_size': 0,
+            'last_flush_ms': 0.0, 'max_flush_ms': 0.0, 'total_flush_ms': 0.0,
+        }
+
+    def _ensure_thread(self):
+        # (re)start after fork: threads don't survive into gunicorn workers
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+            self._thread.start()
+
+    def submit(self, key, apply_batch, item):
+        """Queue ``item`` for ``key`` and wait until its batch is flushed.
+
+        ``apply_batch(items)`` runs on the writer thread with every item
+        queued for ``key`` and must return one result per item; a ``Failed``
+        result is raised here instead. If ``apply_batch`` itself raises,
+        every caller in the batch gets the exception.
+        """
+        pending = _Pending(item)
+        with self._cond:
+            self._ensure_thread()
+            queue = self._queues.get(key)
+            if queue is None:
+                self._queues[key] = (apply_batch, [pending])
+            else:
+                queue[1].append(pending)
+            self._cond.notify()
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+            # let concurrent writers join this batch
+            if self.window:
+                time.sleep(self.window)
+            with self._cond:
+                batches, self._queues = self._queues, {}
+            for apply_batch, pendings in batches.values():
+                self._flush(apply_batch, pendings)
+
+    def _flush(self, apply_batch, pendings):
+        started = time.perf_counter()
+        try:
+            results = apply_batch([p.item for p in pendings])
+            for p, result in zip(pendings, results):
+                if isinstance(result, Failed):
+                    p.error = result.error
+                else:
+                    p.result = result
+        except Exception as e:
+            for p in pendings:
+                p.error = e
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._cond:
+            s = self._stats
+            s['flushes'] += 1
+            s['mutations'] += len(pendings)
+            s['errors'] += sum(1 for p in pendings if p.error is not None)
+            s['last_batch_size'] = len(pendings)
+            s['max_batch_size'] = max(s['max_batch_size'], len(pendings))
+            s['last_flush_ms'] = elapsed_ms
+            s['max_flush_ms'] = max(s['max_flush_ms'], elapsed_ms)
+            s['total_flush_ms'] += elapsed_ms
+        for p in pendings:
+            p.done.set()
+
+    def update_json(self, path, mutate, default=dict):
+        """Apply ``mutate(document)`` to the JSON file at ``path`` and return its result.
+
+        The document is re-read under the file lock, so mutations from other
+        workers are never overwritten. If ``mutate`` raises, its changes are
+        discarded and the exception is raised here; the mutations batched
+        with it are still written.
+        """
+        return self.submit(('json', path), lambda mutations: self._apply_json(path, default, mutations), mutate)
+
+    @staticmethod
+    def _apply_json(path, default, mutations):
+        with file_lock(path):
+            doc = read_json(path, default)
+            results = []
+            changed = False
+            for mutate in mutations:
+                # only a batch with neighbours needs a checkpoint to roll one back to
+                before = copy.deepcopy(doc) if len(mutations) > 1 else None
+                try:
+                    results.append(mutate(doc))
+                    changed = True
+                except Exception as e:
+                    results.append(Failed(e))
+                    if before is not None:
+                        doc = before
+            if changed:
+                atomic_write(path, dump_json(doc))
+        return results
+
+    def stats(self):
+        with self._cond:
+            s = dict(self._stats)
+        s['avg_batch_size'] = s['mutations'] / s['flushes'] if s['flushes'] else 0.0
+        s['avg_flush_ms'] = s['total_flush_ms'] / s['flushes'] if s['flushes'] else 0.0
+        return s
+
+
+WRITER = GroupCommitWriter(window=float(os.environ.get('PERSIST_COMMIT_WINDOW_MS', 5)) / 1000)
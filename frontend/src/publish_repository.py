@@ -0,0 +1,133 @@
+"""In-memory repository for publishes (articles and blogs).
+
+Keeps an id -> record dict for O(1) lookups, timeline lists kept in
+(timestamp, id) order by bisect insertion so the newest-first feed is a
+slice rather than a sort, a full-text index for searches, and a persisted
+id counter so new ids never need a scan and are never reused.
+"""
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+
+from persistence import WRITER, atomic_write, dump_json, file_lock
+from search_index import InvertedIndex
+
+
+class PublishRepository:
+    # parsed state saved by state_snapshot
+    SNAPSHOT_FIELDS = ('records', '_by_id', '_timeline', '_by_type', 'index', '_next_id')
+
+    def __init__(self, path, counter_path):
+        self.path = path
+        self.counter_path = counter_path
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.records = []       # file order, as persisted to publishes.json
+        self._by_id = {}
+        self._timeline = []     # [(timestamp, id)] ascending
+        self._by_type = {}      # type (lowercase) -> [(timestamp, id)] ascending
+        self.index = InvertedIndex()
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self.records)
+
+    def load(self):
+        """Load publishes.json. Returns False if the file is missing (caller seeds)."""
+        with self._lock:
+            self._reset()
+            if not os.path.exists(self.path):
+                return False
+            with open(self.path, 'r', encoding='utf-8') as fh:
+                records = json.load(fh)
+            for p in records:
+                self._insert(p)
+            self._next_id = max(self._read_counter(), self._next_id)
+            return True
+
+    def snapshot_sources(self):
+        return [self.path, self.counter_path]
+
+    def seed(self, records):
+        """Replace the contents with ``records`` and persist them."""
+        with self._lock:
+            self._reset()
+            for p in records:
+                self._insert(p)
+            self.save()
+
+    def save(self):
+        try:
+            with file_lock(self.path):
+                atomic_write(self.path, dump_json(self.records))
+        except Exception:
+            # Fail silently; the app will continue to serve in-memory data
+            pass
+
+    def _read_counter(self):
+        try:
+            with open(self.counter_path, 'r', encoding='utf-8') as fh:
+                return int(fh.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_counter(self):
+        atomic_write(self.counter_path, str(self._next_id).encode('ascii'))
+
+    def _insert(self, p):
+        self.records.append(p)
+        self._by_id[p['id']] = p
+        key = (p.get('timestamp', ''), p['id'])
+        bisect.insort(self._timeline, key)
+        bisect.insort(self._by_type.setdefault(p.get('type', '').lower(), []), key)
+        self.index.add(p['id'], p.get('title', ''), p.get('content', ''))
+        if p['id'] >= self._next_id:
+            self._next_id = p['id'] + 1
+
+    def iter_all(self):
+        """Yield every publish in file (id) order."""
+        records = self.records
+        for i in range(len(records)):
+            yield records[i]
+
+    def get(self, pid):
+        return self._by_id.get(pid)
+
+    def newest(self, ptype='', offset=0, limit=None):
+        """Newest-first page of the timeline, optionally restricted to one type."""
+        timeline = self._by_type.get(ptype.lower(), []) if ptype else self._timeline
+        end = len(timeline) - max(offset, 0)
+        start = 0 if limit is None else max(end - limit, 0)
+        return [self._by_id[pid] for _, pid in reversed(timeline[start:max(end, 0)])], len(timeline)
+
+    def search(self, q, ptype=''):
+        """Records matching ``q``, best first, optionally restricted to one type."""
+        results = []
+        ptype = ptype.lower()
+        for pid, _ in self.index.search(q):
+            p = self._by_id.get(pid)
+            if p is not None and (not ptype or p.get('type', '').lower() == ptype):
+                results.append(p)
+        return results
+
+    def add(self, title, content, ptype):
+        """Create a publish with the next id and the current time."""
+        new = {'title': title, 'content': content, 'type': ptype}
+
+        def append(records):
+            # runs under the publishes.json lock, so the counter is shared by all workers
+            with self._lock:
+                new['id'] = max(self._read_counter(), self._next_id)
+                new['timestamp'] = datetime.utcnow().isoformat() + 'Z'
+                self._next_id = new['id'] + 1
+                self._write_counter()
+            records.append(new)
+
+        WRITER.update_json(self.path, append, default=list)
+        with self._lock:
+            self._insert(new)
+        return {k: new[k] for k in ('id', 'title', 'content', 'type', 'timestamp')}
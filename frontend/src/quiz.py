@@ -0,0 +1,275 @@
+"""Civics quiz: question bank, sampling, grading and per-question stats.
+
+The bank is ``database/quiz_questions.jsonl``, one question per line:
+
+    {"id": "Q001", "category": "constitution", "difficulty": "easy",
+     "question": "...", "options": ["...", ...], "answer": 1, "explanation": "..."}
+
+It is read once into parallel arrays indexed by question number. The
+public form of each question (without its answer) is built at load time.
+Every (category, difficulty) combination, including "any", gets its own
+tuple of question numbers. Drawing a quiz is then one ``random.sample`` of
+k numbers from the right tuple, which is O(k) and never scans the bank.
+The file is re-read when it changes.
+
+Grading looks each answer up by question id. Its results go to
+``QuizStats``, which spreads its counters over ``QUIZ_STATS_SHARDS`` shards.
+Each shard has its own lock, and a thread always uses the same shard, so
+a burst of simultaneous submissions rarely waits on a lock. A background
+thread folds the shards into ``database/quiz_stats.json`` every
+``QUIZ_STATS_FLUSH_SECONDS``. It merges under the file lock, so several
+workers can share the file. A corrupt stats file reads as empty and is
+moved aside on the next flush. The last counts are flushed by the server
+(gunicorn's ``worker_exit``, or ``python app.py`` on exit), not by
+``atexit``: the group-commit writer can't be relied on while the
+interpreter shuts down.
+"""
+import json
+import os
+import random
+import threading
+import time
+from array import array
+
+from persistence import WRITER, file_lock, read_json
+
+DEFAULT_QUIZ_SIZE = 10
+MAX_QUIZ_SIZE = 50
+STATS_SHARDS = int(os.environ.get('QUIZ_STATS_SHARDS', 16))
+FLUSH_SECONDS = float(os.environ.get('QUIZ_STATS_FLUSH_SECONDS', 10))
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+class QuestionBank:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sig = None
+        self._loaded = False
+        self.ids = []
+        self.number = {}        # id -> question number
+        self.answers = array('b')
+        self.public = []        # what /api/quiz serves, per question
+        self.explanations = []
+        self.pools = {}         # (category or None, difficulty or None) -> question numbers
+        self.categories = []
+
+    def refresh(self):
+        """Reload the bank if the file changed. A missing file means an empty bank."""
+        try:
+            st = os.stat(self.path)
+            sig = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            sig = None
+        if sig == self._sig and self._loaded:
+            return
+        with self._lock:
+            if sig != self._sig or not self._loaded:
+                self._load(sig)
+
+    def _load(self, sig):
+        ids, number, answers, public, explanations, pools = [], {}, array('b'), [], [], {}
+        if sig is not None:
+            with open(self.path, encoding='utf-8') as fh:
+                for n, line in enumerate(fh, 1):
+                    if not line.strip():
+                        continue
+                    q = json.loads(line)
+                    qid, options, answer = q['id'], q['options'], q['answer']
+                    difficulty = q.get('difficulty', 'medium')
+                    if qid in number or not 0 <= answer < len(options) or difficulty not in DIFFICULTIES:
+                        raise ValueError(f'{self.path}:{n}: duplicate id, bad answer or unknown difficulty')
+                    i = len(ids)
+                    category = q.get('category', 'general')
+                    ids.append(qid)
+                    number[qid] = i
+                    answers.append(answer)
+                    public.append({'id': qid, 'category': category, 'difficulty': difficulty,
+                                   'question': q['question'], 'options': options})
+                    explanations.append(q.get('explanation', ''))
+                    for key in ((None, None), (category, None), (None, difficulty), (category, difficulty)):
+                        pools.setdefault(key, []).append(i)
+        self.ids, self.number, self.answers = ids, number, answers
+        self.public, self.explanations = public, explanations
+        self.pools = {key: tuple(pool) for key, pool in pools.items()}
+        self.categories = sorted({q['category'] for q in public})
+        self._sig = sig
+        self._loaded = True
+
+    def sample(self, count, category=None, difficulty=None):
+        """Up to ``count`` distinct random questions, without their answers."""
+        self.refresh()
+        pool = self.pools.get((category, difficulty), ())
+        return [self.public[i] for i in random.sample(pool, min(count, len(pool)))]
+
+    def grade(self, answers):
+        """``{question id: option index}`` -> (score, per-question results).
+
+        Raises KeyError for an id that is not in the bank.
+        """
+        self.refresh()
+        score, results = 0, []
+        for qid, choice in answers.items():
+            i = self.number[qid]
+            correct = choice == self.answers[i]
+            score += correct
+            results.append({'id': qid, 'correct': correct, 'answer': self.answers[i],
+                            'choice': choice, 'explanation': self.explanations[i]})
+        return score, results
+
+
+class _Shard:
+    __slots__ = ('lock', 'counts', 'batches')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.batches = 0
+
+
+def _merge_counts(into, counts):
+    for key, (attempts, correct) in counts.items():
+        m = into.get(key)
+        if m is None:
+            m = into[key] = [0, 0]
+        m[0] += attempts
+        m[1] += correct
+
+
+class ShardedCounters:
+    """``key -> [attempts, correct]`` counts, spread over independently locked shards."""
+
+    def __init__(self, shards=STATS_SHARDS):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+
+    def _shard(self):
+        return self._shards[threading.get_ident() % len(self._shards)]
+
+    def add(self, outcomes):
+        shard = self._shard()
+        with shard.lock:
+            shard.batches += 1
+            counts = shard.counts
+            for key, correct in outcomes:
+                c = counts.get(key)
+                if c is None:
+                    c = counts[key] = [0, 0]
+                c[0] += 1
+                c[1] += correct
+
+    def restore(self, counts):
+        """Put drained counts back, e.g. after a failed flush."""
+        shard = self._shard()
+        with shard.lock:
+            _merge_counts(shard.counts, counts)
+
+    def drain(self):
+        """Take and reset every shard's counts, merged into one dict."""
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                counts, shard.counts = shard.counts, {}
+            _merge_counts(merged, counts)
+        return merged
+
+    def batches(self):
+        """How many ``add`` calls there have been, ever."""
+        return sum(shard.batches for shard in self._shards)
+
+    def peek(self):
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                _merge_counts(merged, shard.counts)
+        return merged
+
+
+class QuizStats:
+    def __init__(self, path, interval=FLUSH_SECONDS):
+        self.path = path
+        self.interval = interval
+        self.counters = ShardedCounters()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.flushes = 0
+
+    def _ensure_thread(self):
+        # (re)start after fork, like the group-commit writer
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='quiz-stats', daemon=True)
+                self._thread.start()
+
+    def record(self, results):
+        """Count one graded submission."""
+        self.counters.add((r['id'], r['correct']) for r in results)
+        # the shared lock is only taken when the flusher is missing
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            self._ensure_thread()
+
+    @property
+    def submissions(self):
+        return self.counters.batches()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                pass  # the counts were put back; the next round retries
+
+    def flush(self):
+        """Fold the pending counts into the stats file. Returns how many questions changed."""
+        pending = self.counters.drain()
+        if not pending:
+            return 0
+
+        def merge(doc):
+            for qid, (attempts, correct) in pending.items():
+                c = doc.setdefault(qid, {'attempts': 0, 'correct': 0})
+                c['attempts'] += attempts
+                c['correct'] += correct
+
+        try:
+            try:
+                WRITER.update_json(self.path, merge)
+            except ValueError:
+                # torn or corrupt file: the merge never ran, so start a fresh file and retry once
+                self._set_aside()
+                WRITER.update_json(self.path, merge)
+        except Exception:
+            self.counters.restore(pending)
+            raise
+        with self._lock:
+            self.flushes += 1
+        return len(pending)
+
+    def _set_aside(self):
+        # kept for inspection, like a corrupt users.json
+        with file_lock(self.path):
+            try:
+                read_json(self.path, dict)
+            except ValueError:
+                os.replace(self.path, f'{self.path}.corrupt-{int(time.time())}')
+
+    def totals(self):
+        """Flushed plus pending counts: ``{id: {attempts, correct}}``."""
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                doc = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            doc = {}
+        for qid, (attempts, correct) in self.counters.peek().items():
+            c = doc.setdefault(qid, {'attempts': 0, 'correct': 0})
+            c['attempts'] += attempts
+            c['correct'] += correct
+        return doc
+
+
+def open_quiz(database_dir):
+    bank = QuestionBank(os.path.join(database_dir, 'quiz_questions.jsonl'))
+    stats = QuizStats(os.path.join(database_dir, 'quiz_stats.json'))
+    return bank, stats
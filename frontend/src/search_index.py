@@ -0,0 +1,121 @@
+"""Incrementally maintained inverted index with BM25 ranking.
+
+Documents are indexed by id over a title and a body; title terms count
+``title_weight`` times. Every query word is matched as a prefix, so the
+publishes search box works while the user is still typing. A document
+matches only if every query word matches one of its terms (AND), and the
+work done per query is proportional to the postings of the matched terms,
+not to the number of documents.
+"""
+import bisect
+import math
+import re
+import threading
+
+TOKEN_RE = re.compile(r'[0-9a-z]+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    def __init__(self, k1=1.2, b=0.75, title_weight=2):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self._lock = threading.Lock()
+        self._postings = {}   # term -> {doc_id: term frequency}
+        self._doc_terms = {}  # doc_id -> {term: term frequency}
+        self._doc_len = {}
+        self._total_len = 0
+        self._vocab = []      # sorted terms, for prefix expansion
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, title, body):
+        """Index a document, replacing any earlier version with the same id."""
+        tf = {}
+        for term in tokenize(title):
+            tf[term] = tf.get(term, 0) + self.title_weight
+        for term in tokenize(body):
+            tf[term] = tf.get(term, 0) + 1
+        with self._lock:
+            self._remove(doc_id)
+            for term, n in tf.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._vocab, term)
+                postings[doc_id] = n
+            length = sum(tf.values())
+            self._doc_terms[doc_id] = tf
+            self._doc_len[doc_id] = length
+            self._total_len += length
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        tf = self._doc_terms.pop(doc_id, None)
+        if tf is None:
+            return
+        for term in tf:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect.bisect_left(self._vocab, term)]
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def _expand(self, prefix):
+        vocab = self._vocab
+        i = bisect.bisect_left(vocab, prefix)
+        while i < len(vocab) and vocab[i].startswith(prefix):
+            yield vocab[i]
+            i += 1
+
+    def search(self, query):
+        """Return ``[(doc_id, score), ...]`` best first for documents matching every query word."""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            avgdl = self._total_len / n_docs
+            per_word = []
+            for word in words:
+                # best-scoring expansion of this word, per document
+                scores = {}
+                for term in self._expand(word):
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for doc_id, tf in postings.items():
+                        norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avgdl)
+                        s = idf * tf * (self.k1 + 1) / norm
+                        if s > scores.get(doc_id, 0):
+                            scores[doc_id] = s
+                if not scores:
+                    return []
+                per_word.append(scores)
+        # intersect starting from the rarest word
+        per_word.sort(key=len)
+        total = dict(per_word[0])
+        for scores in per_word[1:]:
+            total = {d: s + scores[d] for d, s in total.items() if d in scores}
+            if not total:
+                return []
+        return sorted(total.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,114 @@
+"""Binary snapshot of the parsed file-backed stores, for fast startup.
+
+Parsing users.json, billsList.txt, the comment snapshot and
+publishes.json, and building their indexes, is most of a worker's startup
+time. After a load from the source files, ``FileStorage`` writes the
+in-memory state of every store to ``database/state.snapshot``. The next
+process restores each store whose source files are unchanged straight
+from it, and parses only the stores whose files changed.
+
+A store takes part by declaring ``SNAPSHOT_FIELDS``, the attributes that
+make up its parsed state, and ``snapshot_sources()``, the files that
+state was built from. For each store the snapshot records:
+
+* the field names;
+* the (inode, size, mtime) of every source file, taken before the load;
+* the field values.
+
+On restore a store is skipped if any of these no longer match. The whole
+file is ignored when its magic or ``FORMAT_VERSION`` differs.
+
+A store whose files legitimately change after its state is taken (the
+comment log only grows) instead provides ``snapshot_signature()``, taken
+from its state when the snapshot is written, and ``snapshot_matches(sig)``.
+
+The file is a pickle behind a small header. It is written by the app, next
+to the data it mirrors, and must not come from anywhere else.
+``STATE_SNAPSHOT=0`` turns it off.
+"""
+import logging
+import os
+import pickle
+import struct
+
+from persistence import atomic_write
+
+MAGIC = b'PAPPSNAP'
+FORMAT_VERSION = 2
+HEADER = struct.Struct('>8sI')
+
+log = logging.getLogger(__name__)
+
+
+def source_signature(paths):
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((path, st.st_ino, st.st_size, st.st_mtime_ns))
+        except FileNotFoundError:
+            sig.append((path, None))
+    return tuple(sig)
+
+
+class StateSnapshot:
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        try:
+            with open(self.path, 'rb') as fh:
+                magic, version = HEADER.unpack(fh.read(HEADER.size))
+                if magic != MAGIC or version != FORMAT_VERSION:
+                    return {}
+                return pickle.load(fh)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            # a torn or foreign file only costs a full load
+            log.warning('ignoring state snapshot %s: %s', self.path, e)
+            return {}
+
+    def restore(self, stores):
+        """Restore every store in ``{name: store}`` whose sources are unchanged.
+
+        Returns ``{name: source signature}`` for the stores restored.
+        """
+        saved = self._read()
+        restored = {}
+        for name, store in stores.items():
+            entry = saved.get(name)
+            if entry is None:
+                continue
+            fields, sig, state = entry
+            if fields != store.SNAPSHOT_FIELDS:
+                continue
+            if hasattr(store, 'snapshot_matches'):
+                if not store.snapshot_matches(sig):
+                    continue
+            elif sig != source_signature(store.snapshot_sources()):
+                continue
+            with store._lock:
+                for field, value in zip(fields, state):
+                    setattr(store, field, value)
+            restored[name] = sig
+        return restored
+
+    def write(self, stores, signatures):
+        """Save the stores named in ``signatures`` (name -> source signature taken before loading).
+
+        Stores with ``snapshot_signature()`` supply their own instead.
+        """
+        entries = {}
+        for name, sig in signatures.items():
+            store = stores[name]
+            with store._lock:
+                if hasattr(store, 'snapshot_signature'):
+                    sig = store.snapshot_signature()
+                state = tuple(getattr(store, field) for field in store.SNAPSHOT_FIELDS)
+                entries[name] = (store.SNAPSHOT_FIELDS, sig, state)
+        data = HEADER.pack(MAGIC, FORMAT_VERSION) + pickle.dumps(entries, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            atomic_write(self.path, data)
+        except OSError as e:
+            log.warning('could not write state snapshot %s: %s', self.path, e)
@@ -23,46 +23,15 @@ document.addEventListener("DOMContentLoaded", () => {
   // Default to street map
   streetLayer.addTo(map);
 
-  // State Capitals Data (sample of major state capitals)
-  const stateCapitals = [
-    { name: "Washington, D.C.", state: "Federal District", lat: 38.9072, lng: -77.0369, pop: "700,000", type: "capital", info: "U.S. Capital - Home to federal government" },
-    { name: "Sacramento", state: "California", lat: 38.5816, lng: -121.4944, pop: "525,000", type: "capital", info: "Capital of California - Most populous state" },
-    { name: "Austin", state: "Texas", lat: 30.2672, lng: -97.7431, pop: "978,000", type: "capital", info: "Capital of Texas - Tech hub and cultural center" },
-    { name: "Albany", state: "New York", lat: 42.6526, lng: -73.7562, pop: "100,000", type: "capital", info: "Capital of New York - Historic Hudson River city" },
-    { name: "Tallahassee", state: "Florida", lat: 30.4383, lng: -84.2807, pop: "196,000", type: "capital", info: "Capital of Florida - Home to FSU and FAMU" },
-    { name: "Springfield", state: "Illinois", lat: 39.7817, lng: -89.6501, pop: "114,000", type: "capital", info: "Capital of Illinois - Lincoln's hometown" },
-    { name: "Boston", state: "Massachusetts", lat: 42.3601, lng: -71.0589, pop: "695,000", type: "capital", info: "Capital of Massachusetts - Cradle of American Revolution" },
-    { name: "Atlanta", state: "Georgia", lat: 33.7490, lng: -84.3880, pop: "498,000", type: "capital", info: "Capital of Georgia - Major Southern metropolis" },
-    { name: "Denver", state: "Colorado", lat: 39.7392, lng: -104.9903, pop: "716,000", type: "capital", info: "Capital of Colorado - Mile High City" },
-    { name: "Phoenix", state: "Arizona", lat: 33.4484, lng: -112.0740, pop: "1,660,000", type: "capital", info: "Capital of Arizona - Fastest growing major city" },
-    { name: "Olympia", state: "Washington", lat: 47.0379, lng: -122.9007, pop: "55,000", type: "capital", info: "Capital of Washington - Pacific Northwest gem" },
-    { name: "Salem", state: "Oregon", lat: 44.9429, lng: -123.0351, pop: "175,000", type: "capital", info: "Capital of Oregon - Willamette Valley location" }
-  ];
-
-  // Major Cities (non-capitals)
-  const majorCities = [
-    { name: "New York City", state: "New York", lat: 40.7128, lng: -74.0060, pop: "8,336,000", type: "city", info: "Largest U.S. city - Global financial center" },
-    { name: "Los Angeles", state: "California", lat: 34.0522, lng: -118.2437, pop: "3,979,000", type: "city", info: "Second largest city - Entertainment capital" },
-    { name: "Chicago", state: "Illinois", lat: 41.8781, lng: -87.6298, pop: "2,746,000", type: "city", info: "Third largest city - Midwest hub" },
-    { name: "Houston", state: "Texas", lat: 29.7604, lng: -95.3698, pop: "2,304,000", type: "city", info: "Fourth largest city - Energy capital" },
-    { name: "Philadelphia", state: "Pennsylvania", lat: 39.9526, lng: -75.1652, pop: "1,584,000", type: "city", info: "Birthplace of American democracy" },
-    { name: "San Francisco", state: "California", lat: 37.7749, lng: -122.4194, pop: "874,000", type: "city", info: "Tech hub - Golden Gate Bridge" },
-    { name: "Seattle", state: "Washington", lat: 47.6062, lng: -122.3321, pop: "753,000", type: "city", info: "Emerald City - Tech and coffee capital" },
-    { name: "Miami", state: "Florida", lat: 25.7617, lng: -80.1918, pop: "467,000", type: "city", info: "Gateway to Latin America" }
-  ];
-
-  // Congressional District Examples
-  const congressionalDistricts = [
-    { name: "CA-12", state: "California", lat: 37.7749, lng: -122.4194, representative: "Rep. Nancy Pelosi (D)", type: "district", info: "San Francisco area district" },
-    { name: "NY-14", state: "New York", lat: 40.7489, lng: -73.9680, representative: "Rep. Alexandria Ocasio-Cortez (D)", type: "district", info: "Parts of Bronx and Queens" },
-    { name: "TX-21", state: "Texas", lat: 30.2672, lng: -98.7431, representative: "Rep. Chip Roy (R)", type: "district", info: "Central Texas district" },
-    { name: "FL-27", state: "Florida", lat: 25.7617, lng: -80.3568, representative: "Rep. Maria Elvira Salazar (R)", type: "district", info: "Miami area district" }
-  ];
-
-  // Marker groups
-  let capitalMarkers = L.layerGroup();
-  let cityMarkers = L.layerGroup();
-  let districtMarkers = L.layerGroup();
+  // Features come from /api/map/features for the visible area only; the
+  // server clusters them per zoom level, so dense areas arrive as counts.
+  const markerTypes = {
+    'capitals': ['capital'],
+    'major-cities': ['city'],
+    'representatives': ['district'],
+    'all': ['capital', 'city', 'district']
+  };
+  const markers = L.layerGroup().addTo(map);
 
   // Create custom icons
   const capitalIcon = L.divIcon({
@@ -86,78 +55,81 @@ document.addEventListener("DOMContentLoaded", () => {
     iconAnchor: [7, 7]
   });
 
-  // Add state capitals
-  stateCapitals.forEach(capital => {
-    const marker = L.marker([capital.lat, capital.lng], { icon: capitalIcon })
-      .bindPopup(`
-        <div class="marker-popup">
-          <h4>🏛️ ${capital.name}</h4>
-          <p><strong>State:</strong> ${capital.state}</p>
-          <p><strong>Population:</strong> ${capital.pop}</p>
-          <p><strong>Info:</strong> ${capital.info}</p>
-        </div>
-      `);
-    capitalMarkers.addLayer(marker);
-  });
+  const icons = { capital: capitalIcon, city: cityIcon, district: districtIcon };
+  const colors = { capital: '#667eea', city: '#28a745', district: '#dc3545' };
+  const symbols = { capital: '🏛️', city: '🏙️', district: '📍' };
 
-  // Add major cities
-  majorCities.forEach(city => {
-    const marker = L.marker([city.lat, city.lng], { icon: cityIcon })
-      .bindPopup(`
-        <div class="marker-popup">
-          <h4>🏙️ ${city.name}</h4>
-          <p><strong>State:</strong> ${city.state}</p>
-          <p><strong>Population:</strong> ${city.pop}</p>
-          <p><strong>Info:</strong> ${city.info}</p>
-        </div>
-      `);
-    cityMarkers.addLayer(marker);
-  });
+  function escapeHtml(value) {
+    return String(value ?? '').replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+  }
 
-  // Add congressional districts
-  congressionalDistricts.forEach(district => {
-    const marker = L.marker([district.lat, district.lng], { icon: districtIcon })
-      .bindPopup(`
+  function featurePopup(f) {
+    const detail = f.type === 'district'
+      ? `<p><strong>Representative:</strong> ${escapeHtml(f.representative)}</p>`
+      : `<p><strong>Population:</strong> ${escapeHtml(f.pop)}</p>`;
+    return `
         <div class="marker-popup">
-          <h4>📍 ${district.name}</h4>
-          <p><strong>State:</strong> ${district.state}</p>
-          <p><strong>Representative:</strong> ${district.representative}</p>
-          <p><strong>Info:</strong> ${district.info}</p>
+          <h4>${symbols[f.type] || '📍'} ${escapeHtml(f.name)}</h4>
+          <p><strong>State:</strong> ${escapeHtml(f.state)}</p>
+          ${detail}
+          <p><strong>Info:</strong> ${escapeHtml(f.info)}</p>
         </div>
-      `);
-    districtMarkers.addLayer(marker);
-  });
-
-  // Add default markers (capitals)
-  capitalMarkers.addTo(map);
+      `;
+  }
+
+  function clusterIcon(c) {
+    const size = c.count < 10 ? 28 : c.count < 100 ? 34 : 42;
+    return L.divIcon({
+      className: 'custom-icon',
+      html: `<div style="background: ${colors[c.type] || '#6c757d'}; width: ${size}px; height: ${size}px; line-height: ${size - 4}px; border-radius: 50%; border: 2px solid white; box-shadow: 0 2px 5px rgba(0,0,0,0.3); color: white; font-weight: bold; font-size: 12px; text-align: center;">${c.count}</div>`,
+      iconSize: [size, size],
+      iconAnchor: [size / 2, size / 2]
+    });
+  }
+
+  let request = null;
+  let timer = null;
+
+  function loadFeatures() {
+    const bounds = map.getBounds();
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+      .map(v => v.toFixed(5)).join(',');
+    const types = markerTypes[document.getElementById('markerType').value] || markerTypes.capitals;
+    const params = new URLSearchParams({ bbox, zoom: map.getZoom(), types: types.join(',') });
+    if (request) request.abort();
+    request = new AbortController();
+    fetch(`/api/map/features?${params}`, { signal: request.signal })
+      .then(r => r.ok ? r.json() : Promise.reject(r.status))
+      .then(data => {
+        markers.clearLayers();
+        data.features.forEach(f => {
+          L.marker([f.lat, f.lng], { icon: icons[f.type] || districtIcon })
+            .bindPopup(featurePopup(f))
+            .addTo(markers);
+        });
+        data.clusters.forEach(c => {
+          const [west, south, east, north] = c.bbox;
+          L.marker([c.lat, c.lng], { icon: clusterIcon(c) })
+            .on('click', () => map.fitBounds([[south, west], [north, east]], { padding: [40, 40], maxZoom: data.zoom + 3 }))
+            .addTo(markers);
+        });
+      })
+      .catch(err => {
+        if (err && err.name === 'AbortError') return;
+        console.error('Failed to load map features:', err);
+      });
+  }
+
+  // Panning fires many events; only fetch once the map has settled
+  function scheduleLoad() {
+    clearTimeout(timer);
+    timer = setTimeout(loadFeatures, 150);
+  }
+
+  map.on('moveend', scheduleLoad);
 
   // Handle marker type selection
-  document.getElementById('markerType').addEventListener('change', function(e) {
-    const value = e.target.value;
-    
-    // Remove all markers
-    map.removeLayer(capitalMarkers);
-    map.removeLayer(cityMarkers);
-    map.removeLayer(districtMarkers);
-    
-    // Add selected markers
-    switch(value) {
-      case 'capitals':
-        capitalMarkers.addTo(map);
-        break;
-      case 'major-cities':
-        cityMarkers.addTo(map);
-        break;
-      case 'representatives':
-        districtMarkers.addTo(map);
-        break;
-      case 'all':
-        capitalMarkers.addTo(map);
-        cityMarkers.addTo(map);
-        districtMarkers.addTo(map);
-        break;
-    }
-  });
+  document.getElementById('markerType').addEventListener('change', loadFeatures);
 
   // Handle map style selection
   document.getElementById('mapStyle').addEventListener('change', function(e) {
@@ -182,14 +154,7 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
-  // Add zoom controls feedback
-  map.on('zoomend', function() {
-    const zoom = map.getZoom();
-    if (zoom > 6) {
-      // At higher zoom levels, could show more detailed markers
-      console.log('Zoomed in to level:', zoom);
-    }
-  });
+  loadFeatures();
 
   console.log('Interactive map loaded successfully!');
 });
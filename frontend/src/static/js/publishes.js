@@ -10,18 +10,25 @@ document.addEventListener('DOMContentLoaded', function() {
   const closeBtn = document.getElementById('closePublish');
 
   let publishes = [];
+  let requestSeq = 0;
+  let searchTimer = null;
 
   async function loadPublishes() {
+    clearTimeout(pollTimer);
+    const seq = ++requestSeq;
     list.innerHTML = 'Loading...';
     const q = encodeURIComponent(search.value || '');
     const type = encodeURIComponent(typeSel.value || '');
     try {
-      const res = await fetch(`/api/publishes?q=${q}&type=${type}`);
+      const res = await fetch(`/api/publishes?q=${q}&type=${type}&limit=100`);
       if (!res.ok) throw new Error('Server error ' + res.status);
-      publishes = await res.json();
+      const data = await res.json();
+      if (seq !== requestSeq) return; // a newer search superseded this one
+      publishes = data;
       renderList();
+      follow(res.headers.get('X-Last-Event-ID'));
     } catch (err) {
-      list.innerHTML = `<div class="text-danger">${err.message}</div>`;
+      if (seq === requestSeq) list.innerHTML = `<div class="text-danger">${err.message}</div>`;
     }
   }
 
@@ -40,6 +47,37 @@ document.addEventListener('DOMContentLoaded', function() {
     });
   }
 
+  // New publishes are pushed over Server-Sent Events; the list is polled only if the stream is refused
+  const POLL_MS = 30000;
+  let source = null;
+  let pollTimer = null;
+
+  function follow(position) {
+    if (!window.EventSource || source) return;
+    const qs = position ? `?last_event_id=${encodeURIComponent(position)}` : '';
+    source = new EventSource(`/api/publishes/stream${qs}`);
+    source.addEventListener('publish', e => {
+      const p = JSON.parse(e.data);
+      const type = typeSel.value || '';
+      // searches are ranked, so only the plain newest-first listing takes pushed items
+      if (search.value.trim() || (type && type.toLowerCase() !== (p.type || '').toLowerCase())) return;
+      if (publishes.some(x => x.id === p.id)) return;
+      publishes.unshift(p);
+      renderList();
+    });
+    source.addEventListener('reset', () => {
+      source.close();
+      source = null;
+      loadPublishes();
+    });
+    // refused (e.g. 503 when the server has no stream slots left): poll, and try the stream again then
+    source.addEventListener('error', () => {
+      if (source.readyState !== EventSource.CLOSED) return;
+      source = null;
+      pollTimer = setTimeout(loadPublishes, POLL_MS);
+    });
+  }
+
   async function showPublish(id) {
     try {
       const res = await fetch(`/api/publishes/${id}`);
@@ -57,7 +95,10 @@ document.addEventListener('DOMContentLoaded', function() {
 
   closeBtn.addEventListener('click', () => view.classList.add('d-none'));
   reloadBtn.addEventListener('click', loadPublishes);
-  search.addEventListener('input', loadPublishes);
+  search.addEventListener('input', function() {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(loadPublishes, 200);
+  });
   typeSel.addEventListener('change', loadPublishes);
 
   // initial load
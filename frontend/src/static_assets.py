@@ -0,0 +1,171 @@
+"""Fingerprinted, precompressed static files.
+
+Every file under static/ is hashed at startup, and
+``url_for('static', filename='js/map.js')`` then returns
+``/static/js/map.<hash>.js``. Hashed URLs are served with a one-year
+``immutable`` Cache-Control, so browsers never revalidate them. A changed
+file gets a new hash and therefore a new URL. Plain URLs keep working and
+are revalidated through their ETag.
+
+Each file is gzipped (and brotli-compressed if the optional ``brotli``
+package is installed) once, at maximum level. The variant is then picked
+per request from Accept-Encoding. Files edited while the server runs are
+re-hashed on their next url_for.
+
+    python static_assets.py build --out DIR
+
+writes the hashed files, their .gz/.br variants and a manifest.json to DIR,
+for serving static/ from nginx or a CDN instead.
+"""
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import threading
+
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+from compression import accepted_encoding, brotli, compress
+
+HASH_LEN = 10
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+
+def _signature(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{digest[:HASH_LEN]}{ext}'
+
+
+class Asset:
+    __slots__ = ('name', 'hashed', 'mimetype', 'etag', 'variants', 'sig')
+
+    def __init__(self, name, path):
+        self.sig = _signature(path)
+        with open(path, 'rb') as fh:
+            data = fh.read()
+        digest = hashlib.sha256(data).hexdigest()
+        self.name = name
+        self.hashed = hashed_name(name, digest)
+        self.mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        self.etag = digest[:HASH_LEN]
+        self.variants = {None: data}
+        for encoding in ('gzip', 'br') if brotli is not None else ('gzip',):
+            packed = compress(data, encoding, best=True)
+            if len(packed) < len(data):
+                self.variants[encoding] = packed
+
+
+class StaticAssets:
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._assets = {}      # name -> Asset
+        self._by_hashed = {}   # hashed name -> Asset
+
+    def scan(self):
+        for root, dirs, files in os.walk(self.folder):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for fn in files:
+                if not fn.startswith('.'):
+                    name = os.path.relpath(os.path.join(root, fn), self.folder).replace(os.sep, '/')
+                    self.lookup(name)
+        return self
+
+    def lookup(self, name):
+        """Return the current Asset for ``name``, re-hashing it if the file changed.
+
+        ``name`` comes from the URL; None unless it names a file inside the folder.
+        """
+        path = safe_join(self.folder, name)
+        if path is None:
+            return None
+        asset = self._assets.get(name)
+        try:
+            if asset is not None and asset.sig == _signature(path):
+                return asset
+            fresh = Asset(name, path)
+        except OSError:
+            return None
+        with self._lock:
+            if asset is not None:
+                self._by_hashed.pop(asset.hashed, None)
+            self._assets[name] = fresh
+            self._by_hashed[fresh.hashed] = fresh
+        return fresh
+
+    def resolve(self, filename):
+        """Return (asset, requested by hashed name) for a request path."""
+        asset = self._by_hashed.get(filename)
+        if asset is not None:
+            return asset, True
+        return self.lookup(filename), False
+
+    def url_name(self, filename):
+        asset = self.lookup(filename)
+        return asset.hashed if asset is not None else filename
+
+    def build(self, out):
+        """Write hashed files, compressed variants and manifest.json into ``out``."""
+        manifest = {}
+        for name, asset in sorted(self._assets.items()):
+            manifest[name] = asset.hashed
+            target = os.path.join(out, *asset.hashed.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            for encoding, data in asset.variants.items():
+                suffix = {None: '', 'gzip': '.gz', 'br': '.br'}[encoding]
+                with open(target + suffix, 'wb') as fh:
+                    fh.write(data)
+        with open(os.path.join(out, 'manifest.json'), 'w') as fh:
+            json.dump(manifest, fh, indent=2)
+        return manifest
+
+
+def init_app(app):
+    assets = StaticAssets(app.static_folder).scan()
+
+    @app.url_defaults
+    def _fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = assets.url_name(values['filename'])
+
+    def serve_static(filename):
+        asset, hashed = assets.resolve(filename)
+        if asset is None:
+            abort(404)
+        encoding = accepted_encoding(request.headers.get('Accept-Encoding'), asset.variants)
+        resp = Response(asset.variants[encoding], mimetype=asset.mimetype)
+        if encoding:
+            resp.headers['Content-Encoding'] = encoding
+        resp.vary.add('Accept-Encoding')
+        # each encoding is a different representation, so it gets its own strong ETag
+        resp.set_etag(f'{asset.etag}-{encoding}' if encoding else asset.etag)
+        resp.headers['Cache-Control'] = IMMUTABLE if hashed else REVALIDATE
+        return resp.make_conditional(request)
+
+    app.view_functions['static'] = serve_static
+    return assets
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write fingerprinted, precompressed static files.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--static', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
+    parser.add_argument('--out', required=True, help='output directory')
+    args = parser.parse_args(argv)
+    manifest = StaticAssets(args.static).scan().build(args.out)
+    for name, hashed in manifest.items():
+        print(f'{name} -> {hashed}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""Pluggable persistence for users, bills, comments and publishes.
+
+Every backend exposes the same four repositories:
+
+* ``users``      get(username), exists(username), add(username, password, is_admin), items()
+* ``bills``      payload(), query(q, category, limit, cursor), get(bill_id), add(title, description, category), add_many(bills), bills(), iter_all()
+* ``comments``   get(bill_id), summaries(bill_ids, newest), append(bill_id, text, user) -> comment, iter_all(), since(cursor)
+* ``publishes``  get(pid), newest(ptype, offset, limit), search(q, ptype), add(title, content, ptype), seed(records), records, iter_all()
+
+Pick the backend with ``STORAGE_BACKEND=file`` (default: the JSON/text files
+in database/) or ``STORAGE_BACKEND=sqlite`` (``SQLITE_PATH``, default
+database/political_app.db). ``DATABASE_DIR`` points either backend at another
+data directory. Move existing data over with ``python -m storage.migrate``.
+"""
+import os
+
+DATABASE_DIR = os.path.abspath(os.environ.get('DATABASE_DIR') or
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'database'))
+DEFAULT_SQLITE_PATH = os.path.join(DATABASE_DIR, 'political_app.db')
+
+
+def open_storage(backend=None, db_dir=None, sqlite_path=None):
+    backend = (backend or os.environ.get('STORAGE_BACKEND') or 'file').strip().lower()
+    db_dir = db_dir or DATABASE_DIR
+    if backend == 'file':
+        from storage.file_backend import FileStorage
+        return FileStorage(db_dir)
+    if backend == 'sqlite':
+        from storage.sqlite_backend import SQLiteStorage
+        return SQLiteStorage(sqlite_path or os.environ.get('SQLITE_PATH') or os.path.join(db_dir, 'political_app.db'))
+    raise ValueError(f'unknown STORAGE_BACKEND {backend!r} (expected "file" or "sqlite")')
@@ -0,0 +1,80 @@
+"""The original file formats in database/, behind the repository interface."""
+import os
+
+from bill_index import BillIndex
+from comment_store import CommentStore, DEFAULT_COMPACT_RATIO
+from publish_repository import PublishRepository
+from state_snapshot import StateSnapshot, source_signature
+from user_store import JsonUserStore
+
+
+class FileStorage:
+    name = 'file'
+
+    def __init__(self, db_dir, snapshot=None):
+        self.db_dir = db_dir
+        self.users = JsonUserStore(os.path.join(db_dir, 'users.json'))
+        # Bills are parsed once from billsList.txt and re-parsed only when the file changes
+        self.bills = BillIndex(os.path.join(db_dir, 'billsList.txt'))
+        # Comments: append-only JSONL log + periodic snapshot, indexed in memory by bill id.
+        # The legacy comments.json is imported once when neither file exists yet.
+        self.comments = CommentStore(
+            os.path.join(db_dir, 'comments.jsonl'), os.path.join(db_dir, 'comments.snapshot.json'),
+            legacy_path=os.path.join(db_dir, 'comments.json'),
+            compact_ratio=float(os.environ.get('COMMENTS_COMPACT_RATIO', DEFAULT_COMPACT_RATIO)))
+        # The id counter lives next to publishes.json so new ids never require a scan
+        self.publishes = PublishRepository(
+            os.path.join(db_dir, 'publishes.json'), os.path.join(db_dir, 'publishes.next_id'))
+        # Parsed state of all four, restored at startup when their files are unchanged
+        if snapshot is None:
+            snapshot = os.environ.get('STATE_SNAPSHOT', '1') != '0'
+        self.snapshot = StateSnapshot(os.path.join(db_dir, 'state.snapshot')) if snapshot else None
+
+    def load(self, indexes=None):
+        """Load every store, from the state snapshot where possible. Returns False if publishes still need seeding.
+
+        ``indexes`` ({name: index}) are built from the comments, e.g. the
+        trending ActivityTracker, and are snapshotted along with them.
+        """
+        stores = {'users': self.users, 'bills': self.bills, 'comments': self.comments, 'publishes': self.publishes}
+        indexes = indexes or {}
+        for index in indexes.values():
+            index.comments = self.comments
+        restored = self.snapshot.restore(dict(stores, **indexes)) if self.snapshot else {}
+        if 'comments' not in restored:
+            # an index only matches the comments it was counted from
+            for name in indexes:
+                restored.pop(name, None)
+        # signatures are taken before parsing, so a file that changes meanwhile is re-read next time
+        loaded = {name: source_signature(store.snapshot_sources())
+                  for name, store in stores.items() if name not in restored}
+        if 'users' in loaded:
+            self.users.load()
+        if 'comments' in loaded:
+            self.comments.load()
+        else:
+            self.comments.refresh()
+        if 'bills' in loaded:
+            try:
+                self.bills.refresh()
+                self.bills.payload()
+            except OSError:
+                pass
+        seeded = True
+        if 'publishes' in loaded:
+            try:
+                seeded = self.publishes.load()
+            except Exception:
+                seeded = False
+            if not seeded:
+                del loaded['publishes']
+        for name, index in indexes.items():
+            index.sync(self.comments, restored=name in restored)
+            if name not in restored:
+                loaded[name] = None  # the index signs its own entry (snapshot_signature)
+        if self.snapshot and loaded:
+            self.snapshot.write(dict(stores, **indexes), dict(restored, **loaded))
+        return seeded
+
+    def close(self):
+        pass
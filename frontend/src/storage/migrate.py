@@ -0,0 +1,53 @@
+"""Copy the file-backed data in database/ into a SQLite database.
+
+Usage (from frontend/src):
+
+    python -m storage.migrate [--source DIR] [--db PATH] [--force]
+
+Then start the app with STORAGE_BACKEND=sqlite (and SQLITE_PATH=PATH if
+you picked a non-default location). The source files are only read.
+"""
+import argparse
+import os
+import sys
+
+from storage import DATABASE_DIR
+from storage.file_backend import FileStorage
+from storage.sqlite_backend import SQLiteStorage
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Migrate database/ JSON and text files into SQLite.')
+    parser.add_argument('--source', default=DATABASE_DIR, help='directory holding users.json, billsList.txt, ...')
+    parser.add_argument('--db', default=None, help='SQLite file to create (default: <source>/political_app.db)')
+    parser.add_argument('--force', action='store_true', help='replace an existing database file')
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join(args.source, 'political_app.db')
+    if os.path.exists(db_path):
+        if not args.force:
+            print(f'{db_path} already exists; pass --force to replace it', file=sys.stderr)
+            return 1
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    source = FileStorage(args.source)
+    source.users.load()
+    source.comments.load()
+    source.publishes.load()
+
+    target = SQLiteStorage(db_path)
+    try:
+        counts = target.import_from(source)
+        target.pool.get().execute('PRAGMA optimize')
+    finally:
+        target.close()
+    for kind, n in counts.items():
+        print(f'{kind}: {n}')
+    print(f'wrote {db_path}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,490 @@
+"""SQLite backend: indexed tables in WAL mode, one connection per thread.
+
+Reads never block on writers (WAL), every lookup goes through an index,
+comment and publish counts are kept in counter tables by triggers, and
+full-text search for bills and publishes uses FTS5 with prefix queries.
+All SQL lives in module constants so each connection's statement cache
+(``cached_statements``) keeps them prepared across requests.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from bill_index import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, category_keys, normalize_title
+from search_index import tokenize
+from user_store import DEFAULT_USERS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+INSERT OR IGNORE INTO meta (key, value) VALUES ('bills_version', 0);
+
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    is_admin INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS bills (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    num INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bills_by_num ON bills (num);
+CREATE TABLE IF NOT EXISTS bill_categories (
+    key TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (key, seq)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS bills_fts USING fts5(
+    id, title, description, category, content='bills', content_rowid='seq');
+CREATE TRIGGER IF NOT EXISTS bills_ai AFTER INSERT ON bills BEGIN
+    INSERT INTO bills_fts (rowid, id, title, description, category)
+        VALUES (new.seq, new.id, new.title, new.description, new.category);
+    UPDATE meta SET value = value + 1 WHERE key = 'bills_version';
+END;
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY,
+    bill_id TEXT NOT NULL,
+    text TEXT NOT NULL,
+    user TEXT NOT NULL,
+    ts TEXT
+);
+CREATE INDEX IF NOT EXISTS comments_by_bill ON comments (bill_id, id);
+CREATE TABLE IF NOT EXISTS comment_counts (
+    bill_id TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS comments_ai AFTER INSERT ON comments BEGIN
+    INSERT INTO comment_counts (bill_id, count) VALUES (new.bill_id, 1)
+        ON CONFLICT (bill_id) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TABLE IF NOT EXISTS publishes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    type TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS publishes_timeline ON publishes (timestamp, id);
+CREATE INDEX IF NOT EXISTS publishes_type_timeline ON publishes (lower(type), timestamp, id);
+CREATE TABLE IF NOT EXISTS publish_counts (
+    type_key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS publishes_fts USING fts5(
+    title, content, content='publishes', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS publishes_ai AFTER INSERT ON publishes BEGIN
+    INSERT INTO publishes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    INSERT INTO publish_counts (type_key, count) VALUES ('', 1), (lower(new.type), 1)
+        ON CONFLICT (type_key) DO UPDATE SET count = count + 1;
+END;
+"""
+
+# users
+SQL_USER_GET = 'SELECT password, is_admin FROM users WHERE username = ?'
+SQL_USER_INSERT = 'INSERT OR IGNORE INTO users (username, password, is_admin) VALUES (?, ?, ?)'
+SQL_USER_ALL = 'SELECT username, password, is_admin FROM users ORDER BY username'
+SQL_USER_COUNT = 'SELECT EXISTS (SELECT 1 FROM users)'
+
+# bills
+SQL_BILLS_VERSION = "SELECT value FROM meta WHERE key = 'bills_version'"
+SQL_BILLS_ALL = 'SELECT id, title, description, category FROM bills ORDER BY seq'
+SQL_BILL_GET = 'SELECT id, title, description, category FROM bills WHERE id = ?'
+SQL_BILL_SEQ = 'SELECT seq FROM bills WHERE id = ?'
+SQL_BILL_MAX_NUM = 'SELECT MAX(num) FROM bills'
+SQL_BILL_TITLES = 'SELECT id, title FROM bills ORDER BY seq'
+SQL_BILL_INSERT = 'INSERT INTO bills (id, num, title, description, category) VALUES (?, ?, ?, ?, ?)'
+SQL_BILL_CATEGORY_INSERT = 'INSERT OR IGNORE INTO bill_categories (key, seq) VALUES (?, ?)'
+SQL_BILLS_FILTER_CATEGORY = ' AND seq IN (SELECT seq FROM bill_categories WHERE key = :category)'
+SQL_BILLS_FILTER_TEXT = ' AND seq IN (SELECT rowid FROM bills_fts WHERE bills_fts MATCH :match)'
+
+# comments
+SQL_COMMENTS_FOR_BILL = 'SELECT text, user FROM comments WHERE bill_id = ? ORDER BY id'
+SQL_COMMENTS_NEWEST = 'SELECT text, user FROM comments WHERE bill_id = ? ORDER BY id DESC LIMIT ?'
+SQL_COMMENT_COUNT = 'SELECT count FROM comment_counts WHERE bill_id = ?'
+SQL_COMMENT_INSERT = 'INSERT INTO comments (bill_id, text, user, ts) VALUES (?, ?, ?, ?)'
+SQL_COMMENTS_ALL = 'SELECT bill_id, text, user, ts FROM comments ORDER BY bill_id, id'
+SQL_COMMENT_LAST_ID = 'SELECT max(id) FROM comments'
+SQL_COMMENTS_SINCE = 'SELECT bill_id, text, user, ts FROM comments WHERE id > ? AND id <= ? ORDER BY id'
+
+# publishes
+PUBLISH_COLUMNS = 'p.id, p.title, p.content, p.type, p.timestamp'
+SQL_PUBLISH_GET = f'SELECT {PUBLISH_COLUMNS} FROM publishes p WHERE p.id = ?'
+SQL_PUBLISH_COUNT = 'SELECT count FROM publish_counts WHERE type_key = ?'
+SQL_PUBLISH_NEWEST = f'SELECT {PUBLISH_COLUMNS} FROM publishes p ORDER BY p.timestamp DESC, p.id DESC LIMIT ? OFFSET ?'
+SQL_PUBLISH_NEWEST_TYPE = (f'SELECT {PUBLISH_COLUMNS} FROM publishes p WHERE lower(p.type) = ? '
+                           'ORDER BY p.timestamp DESC, p.id DESC LIMIT ? OFFSET ?')
+SQL_PUBLISH_SEARCH = (f'SELECT {PUBLISH_COLUMNS} FROM publishes_fts f JOIN publishes p ON p.id = f.rowid '
+                      'WHERE publishes_fts MATCH :match AND (:type = \'\' OR lower(p.type) = :type) '
+                      'ORDER BY bm25(publishes_fts, 2.0, 1.0)')
+SQL_PUBLISH_INSERT = 'INSERT INTO publishes (title, content, type, timestamp) VALUES (?, ?, ?, ?)'
+SQL_PUBLISH_INSERT_WITH_ID = 'INSERT INTO publishes (id, title, content, type, timestamp) VALUES (?, ?, ?, ?, ?)'
+SQL_PUBLISH_ALL = f'SELECT {PUBLISH_COLUMNS} FROM publishes p ORDER BY p.id'
+
+
+def fts_prefix_query(q):
+    # every word must match as a prefix: "tax" "pol" -> "tax"* AND "pol"*
+    words = list(dict.fromkeys(tokenize(q)))
+    return ' AND '.join(f'"{w}"*' for w in words)
+
+
+class ConnectionPool:
+    """One SQLite connection per thread, created on first use.
+
+    A thread's connection is closed once the thread has ended (checked
+    whenever a new one is opened), so short-lived threads don't leak them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = {}   # thread -> its connection
+
+    def get(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False,
+                                   cached_statements=256, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('PRAGMA busy_timeout = 10000')
+            self._local.conn = conn
+            with self._lock:
+                for thread in [t for t in self._all if not t.is_alive()]:
+                    _close(self._all.pop(thread))
+                self._all[threading.current_thread()] = conn
+        return conn
+
+    def transaction(self):
+        return _Transaction(self.get())
+
+    def close_all(self):
+        with self._lock:
+            for conn in self._all.values():
+                _close(conn)
+            self._all = {}
+        self._local = threading.local()
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front so concurrent writers queue instead of deadlocking
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class SQLiteUserRepository:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def load(self):
+        # seed admin user if missing
+        if not self.pool.get().execute(SQL_USER_COUNT).fetchone()[0]:
+            with self.pool.transaction() as conn:
+                for name, u in DEFAULT_USERS.items():
+                    conn.execute(SQL_USER_INSERT, (name, u['password'], int(u['is_admin'])))
+
+    def get(self, username):
+        row = self.pool.get().execute(SQL_USER_GET, (username,)).fetchone()
+        if row is None:
+            return None
+        return {'password': row['password'], 'is_admin': bool(row['is_admin'])}
+
+    def exists(self, username):
+        return self.get(username) is not None
+
+    def add(self, username, password, is_admin=False):
+        with self.pool.transaction() as conn:
+            return conn.execute(SQL_USER_INSERT, (username, password, int(is_admin))).rowcount == 1
+
+    def items(self):
+        return [(r['username'], {'password': r['password'], 'is_admin': bool(r['is_admin'])})
+                for r in self.pool.get().execute(SQL_USER_ALL)]
+
+
+class SQLiteBillRepository:
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.Lock()
+        self._cached = (None, None, None)  # (bills_version, body, etag)
+
+    def refresh(self):
+        pass
+
+    @staticmethod
+    def _row(row):
+        return {'id': row['id'], 'title': row['title'], 'description': row['description'], 'category': row['category']}
+
+    def bills(self):
+        return [self._row(r) for r in self.pool.get().execute(SQL_BILLS_ALL)]
+
+    def iter_all(self):
+        # the cursor fetches rows lazily, so memory stays flat however many bills there are
+        for r in self.pool.get().execute(SQL_BILLS_ALL):
+            yield self._row(r)
+
+    def get(self, bill_id):
+        row = self.pool.get().execute(SQL_BILL_GET, (bill_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def payload(self):
+        # the bills_version counter is bumped by trigger, so one key lookup validates the cache
+        version = self.pool.get().execute(SQL_BILLS_VERSION).fetchone()[0]
+        cached_version, body, etag = self._cached
+        if cached_version != version:
+            with self._lock:
+                body = json.dumps(self.bills(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                etag = hashlib.sha1(body).hexdigest()
+                self._cached = (version, body, etag)
+        return body, etag
+
+    def query(self, q='', category='', limit=DEFAULT_PAGE_SIZE, cursor=None):
+        conn = self.pool.get()
+        params = {}
+        where = ''
+        if category:
+            where += SQL_BILLS_FILTER_CATEGORY
+            params['category'] = category.strip().lower()
+        match = fts_prefix_query(q)
+        if match:
+            where += SQL_BILLS_FILTER_TEXT
+            params['match'] = match
+        total = conn.execute('SELECT COUNT(*) FROM bills WHERE 1' + where, params).fetchone()[0]
+        after = 0
+        if cursor:
+            row = conn.execute(SQL_BILL_SEQ, (cursor,)).fetchone()
+            if row is None:
+                raise KeyError(cursor)
+            after = row['seq']
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        rows = conn.execute(
+            'SELECT id, title, description, category FROM bills WHERE seq > :after' + where
+            + ' ORDER BY seq LIMIT :limit', dict(params, after=after, limit=limit + 1)).fetchall()
+        page = [self._row(r) for r in rows[:limit]]
+        next_cursor = page[-1]['id'] if len(rows) > limit else None
+        return page, next_cursor, total
+
+    def _insert(self, conn, bill):
+        num = int(bill['id'][1:]) if bill['id'][1:].isdigit() else 0
+        seq = conn.execute(SQL_BILL_INSERT, (bill['id'], num, bill['title'], bill['description'],
+                                             bill['category'])).lastrowid
+        for key in category_keys(bill['category']):
+            conn.execute(SQL_BILL_CATEGORY_INSERT, (key, seq))
+
+    def add(self, title, description, category):
+        with self.pool.transaction() as conn:
+            next_num = (conn.execute(SQL_BILL_MAX_NUM).fetchone()[0] or 0) + 1
+            bill_id = f'B{next_num:03d}'
+            self._insert(conn, {'id': bill_id, 'title': title, 'description': description, 'category': category})
+        return bill_id
+
+    def add_many(self, bills):
+        """Insert many bills with contiguous new ids in one transaction, skipping taken titles.
+
+        Returns ``(bill_id, duplicate_of)`` per input bill, one of them None.
+        """
+        results = []
+        with self.pool.transaction() as conn:
+            taken = {}
+            for r in conn.execute(SQL_BILL_TITLES):
+                taken.setdefault(normalize_title(r['title']), r['id'])
+            next_num = (conn.execute(SQL_BILL_MAX_NUM).fetchone()[0] or 0) + 1
+            for bill in bills:
+                key = normalize_title(bill['title'])
+                if key in taken:
+                    results.append((None, taken[key]))
+                    continue
+                bill_id = f'B{next_num:03d}'
+                next_num += 1
+                self._insert(conn, {'id': bill_id, 'title': bill['title'], 'description': bill['description'],
+                                    'category': bill['category']})
+                taken[key] = bill_id
+                results.append((bill_id, None))
+        return results
+
+
+class SQLiteCommentRepository:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def load(self):
+        pass
+
+    def get(self, bill_id):
+        return [{'text': r['text'], 'user': r['user']}
+                for r in self.pool.get().execute(SQL_COMMENTS_FOR_BILL, (bill_id,))]
+
+    def summaries(self, bill_ids, newest=3):
+        conn = self.pool.get()
+        out = {}
+        for bill_id in bill_ids:
+            row = conn.execute(SQL_COMMENT_COUNT, (bill_id,)).fetchone()
+            latest = conn.execute(SQL_COMMENTS_NEWEST, (bill_id, newest)).fetchall() if newest > 0 else []
+            out[bill_id] = {
+                'count': row['count'] if row else 0,
+                'latest': [{'text': r['text'], 'user': r['user']} for r in latest],
+            }
+        return out
+
+    def append(self, bill_id, text, user):
+        ts = datetime.utcnow().isoformat() + 'Z'
+        with self.pool.transaction() as conn:
+            conn.execute(SQL_COMMENT_INSERT, (bill_id, text, user, ts))
+        return {'text': text, 'user': user, 'ts': ts}
+
+    def iter_all(self):
+        for r in self.pool.get().execute(SQL_COMMENTS_ALL):
+            yield r['bill_id'], {'text': r['text'], 'user': r['user'], 'ts': r['ts']}
+
+    def since(self, cursor):
+        """Comments after ``cursor``, the last comment id seen (see CommentStore.since)."""
+        last = self.pool.get().execute(SQL_COMMENT_LAST_ID).fetchone()[0] or 0
+        return last, cursor is None, self._between(cursor or 0, last)
+
+    def _between(self, after, last):
+        for r in self.pool.get().execute(SQL_COMMENTS_SINCE, (after, last)):
+            yield r['bill_id'], {'text': r['text'], 'user': r['user'], 'ts': r['ts']}
+
+
+class SQLitePublishRepository:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __len__(self):
+        row = self.pool.get().execute(SQL_PUBLISH_COUNT, ('',)).fetchone()
+        return row['count'] if row else 0
+
+    def load(self):
+        return len(self) > 0
+
+    @staticmethod
+    def _row(row):
+        return {'id': row['id'], 'title': row['title'], 'content': row['content'],
+                'type': row['type'], 'timestamp': row['timestamp']}
+
+    @property
+    def records(self):
+        return [self._row(r) for r in self.pool.get().execute(SQL_PUBLISH_ALL)]
+
+    def iter_all(self):
+        for r in self.pool.get().execute(SQL_PUBLISH_ALL):
+            yield self._row(r)
+
+    def get(self, pid):
+        row = self.pool.get().execute(SQL_PUBLISH_GET, (pid,)).fetchone()
+        return self._row(row) if row else None
+
+    def newest(self, ptype='', offset=0, limit=None):
+        conn = self.pool.get()
+        limit = -1 if limit is None else max(limit, 0)
+        offset = max(offset, 0)
+        ptype = ptype.lower()
+        if ptype:
+            rows = conn.execute(SQL_PUBLISH_NEWEST_TYPE, (ptype, limit, offset))
+        else:
+            rows = conn.execute(SQL_PUBLISH_NEWEST, (limit, offset))
+        results = [self._row(r) for r in rows]
+        total = conn.execute(SQL_PUBLISH_COUNT, (ptype,)).fetchone()
+        return results, total['count'] if total else 0
+
+    def search(self, q, ptype=''):
+        match = fts_prefix_query(q)
+        if not match:
+            return []
+        rows = self.pool.get().execute(SQL_PUBLISH_SEARCH, {'match': match, 'type': ptype.lower()})
+        return [self._row(r) for r in rows]
+
+    def add(self, title, content, ptype):
+        ts = datetime.utcnow().isoformat() + 'Z'
+        with self.pool.transaction() as conn:
+            pid = conn.execute(SQL_PUBLISH_INSERT, (title, content, ptype, ts)).lastrowid
+        return {'id': pid, 'title': title, 'content': content, 'type': ptype, 'timestamp': ts}
+
+    def seed(self, records):
+        with self.pool.transaction() as conn:
+            for p in records:
+                conn.execute(SQL_PUBLISH_INSERT_WITH_ID,
+                             (p['id'], p['title'], p['content'], p['type'], p['timestamp']))
+
+
+class SQLiteStorage:
+    name = 'sqlite'
+
+    def __init__(self, path):
+        self.path = path
+        self.pool = ConnectionPool(path)
+        self.pool.get().executescript(SCHEMA)
+        self.users = SQLiteUserRepository(self.pool)
+        self.bills = SQLiteBillRepository(self.pool)
+        self.comments = SQLiteCommentRepository(self.pool)
+        self.publishes = SQLitePublishRepository(self.pool)
+
+    def load(self, indexes=None):
+        """Seed defaults if needed, then build ``indexes`` from the comments. Returns False if publishes still need seeding."""
+        self.users.load()
+        seeded = self.publishes.load()
+        for index in (indexes or {}).values():
+            index.sync(self.comments)
+        return seeded
+
+    def import_from(self, source):
+        """Copy every record of another storage backend into this (empty) database."""
+        counts = {}
+        with self.pool.transaction() as conn:
+            n = 0
+            for username, u in source.users.items():
+                conn.execute(SQL_USER_INSERT, (username, u.get('password', ''), int(bool(u.get('is_admin')))))
+                n += 1
+            counts['users'] = n
+            try:
+                bills = source.bills.bills()
+            except OSError:
+                bills = []
+            for bill in bills:
+                self.bills._insert(conn, bill)
+            counts['bills'] = len(bills)
+            n = 0
+            for bill_id, c in source.comments.iter_all():
+                conn.execute(SQL_COMMENT_INSERT, (bill_id, c['text'], c['user'], c.get('ts')))
+                n += 1
+            counts['comments'] = n
+            n = 0
+            for p in source.publishes.records:
+                conn.execute(SQL_PUBLISH_INSERT_WITH_ID,
+                             (p['id'], p['title'], p['content'], p.get('type', 'Article'), p.get('timestamp', '')))
+                n += 1
+            counts['publishes'] = n
+        return counts
+
+    def is_empty(self):
+        conn = self.pool.get()
+        return not any(conn.execute(f'SELECT EXISTS (SELECT 1 FROM {t})').fetchone()[0]
+                       for t in ('users', 'bills', 'comments', 'publishes'))
+
+    def close(self):
+        self.pool.close_all()
@@ -0,0 +1,261 @@
+"""Trending bills and most active users, kept up to date as comments arrive.
+
+Each comment updates a few counters for its bill and for its author:
+
+* a time-decayed score. Every comment is worth 1 when posted and halves
+  every ``TRENDING_HALF_LIFE_HOURS`` (default 6).
+* comment counts for the last hour and the last day. These windows slide
+  in buckets (1 minute for the hour, 15 minutes for the day).
+* a total.
+
+The score is stored as a log relative to a fixed epoch. Scores therefore
+only ever grow, and bills keep their order as time passes. This lets a
+bounded top-K set track the leaders exactly as comments arrive. The window
+leaderboards are ranked over the keys active in that window only, and
+cached for ``TRENDING_CACHE_SECONDS``.
+
+The counters follow the comment store rather than the request that posted
+a comment, so every worker counts the comments posted through the others
+too. Each read first folds in what the store has gained since the last one
+(``comments.since(cursor)``), and starts over if the store has reloaded
+and renumbered its comments. ``sync(storage.comments)`` builds the counters
+at startup. With the file backend they are kept in the state snapshot
+together with the comments they were counted from, so a warm start only
+folds in the comments that came after. Legacy comments without a timestamp
+count towards totals only.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+HALF_LIFE_SECONDS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS', 6)) * 3600
+DECAY = math.log(2) / HALF_LIFE_SECONDS
+CACHE_SECONDS = float(os.environ.get('TRENDING_CACHE_SECONDS', 5))
+TOP_K = 100
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+_UNIX = datetime(1970, 1, 1)
+# window name -> (length in seconds, bucket size in seconds)
+WINDOWS = {'hour': (3600, 60), 'day': (86400, 900)}
+WINDOW_INDEX = {name: i for i, name in enumerate(WINDOWS)}
+
+
+def _logaddexp(a, b):
+    if a is None:
+        return b
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def to_epoch(ts):
+    """Stored comment timestamp (naive UTC ISO) -> seconds, or None for legacy comments."""
+    if not ts:
+        return None
+    try:
+        # the stores write naive UTC + 'Z'; parsed directly, since a rebuild converts every comment
+        dt = datetime.fromisoformat(ts[:-1] if ts.endswith('Z') else ts)
+    except ValueError:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _UNIX).total_seconds()
+
+
+class Window:
+    __slots__ = ('length', 'bucket', 'buckets', 'count')
+
+    def __init__(self, length, bucket):
+        self.length = length
+        self.bucket = bucket
+        self.buckets = deque()  # [bucket start, count], oldest first
+        self.count = 0
+
+    def add(self, t):
+        start = t - t % self.bucket
+        if self.buckets and self.buckets[-1][0] == start:
+            self.buckets[-1][1] += 1
+        elif not self.buckets or start > self.buckets[-1][0]:
+            self.buckets.append([start, 1])
+        else:
+            # out-of-order timestamp (rebuild or clock skew); rare, so a linear insert is fine
+            for i, b in enumerate(self.buckets):
+                if b[0] == start:
+                    b[1] += 1
+                    break
+                if b[0] > start:
+                    self.buckets.insert(i, [start, 1])
+                    break
+        self.count += 1
+
+    def expire(self, now):
+        cutoff = now - self.length
+        while self.buckets and self.buckets[0][0] + self.bucket <= cutoff:
+            self.count -= self.buckets.popleft()[1]
+        return self.count
+
+
+class Activity:
+    __slots__ = ('total', 'log_score', 'last', 'windows')
+
+    def __init__(self):
+        self.total = 0
+        self.log_score = None
+        self.last = None
+        self.windows = tuple(Window(*spec) for spec in WINDOWS.values())
+
+    def score(self, now):
+        if self.log_score is None:
+            return 0.0
+        return math.exp(self.log_score - DECAY * (now - EPOCH))
+
+
+class Leaderboard:
+    """Activity per key (bill id or username) plus an exact top-K by decayed score."""
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.items = {}
+        self._top = {}          # key -> log score, the k highest
+        self._floor = None      # lowest log score in _top once it is full
+        self._active = tuple(set() for _ in WINDOWS)
+        self._cache = {}        # window -> (expires, ranked keys)
+
+    def record(self, key, t, now=None):
+        a = self.items.get(key)
+        if a is None:
+            a = self.items[key] = Activity()
+        a.total += 1
+        if t is None:
+            return
+        a.last = t if a.last is None else max(a.last, t)
+        for window, active in zip(a.windows, self._active):
+            if now is None or t > now - window.length:
+                window.add(t)
+                active.add(key)
+        a.log_score = _logaddexp(a.log_score, DECAY * (t - EPOCH))
+        if now is None:
+            self._promote(key, a.log_score)
+
+    def _promote(self, key, log_score):
+        # log scores only grow, so a key can only enter the top-k by being updated itself
+        top = self._top
+        if key in top or len(top) < self.k:
+            top[key] = log_score
+        elif log_score > self._floor:
+            del top[min(top, key=top.get)]
+            top[key] = log_score
+        else:
+            return
+        if len(top) >= self.k:
+            self._floor = min(top.values())
+
+    def rank(self):
+        # after a bulk load (record with ``now``), pick the top-k in one pass
+        scored = [(a.log_score, key) for key, a in self.items.items() if a.log_score is not None]
+        self._top = {key: log_score for log_score, key in heapq.nlargest(self.k, scored)}
+        self._floor = min(self._top.values()) if len(self._top) >= self.k else None
+
+    def top(self, window, limit, now):
+        """[(key, Activity)] for the leaders by decayed score or by count in ``window``."""
+        if window == 'score':
+            ranked = sorted(self._top, key=self._top.get, reverse=True)
+        else:
+            expires, ranked = self._cache.get(window, (0, None))
+            if ranked is None or now >= expires:
+                i = WINDOW_INDEX[window]
+                active = self._active[i]
+                for key in [k for k in active if not self.items[k].windows[i].expire(now)]:
+                    active.discard(key)
+                ranked = heapq.nlargest(self.k, active, key=lambda k: (self.items[k].windows[i].count, self.items[k].last))
+                self._cache[window] = (now + CACHE_SECONDS, ranked)
+        return [(key, self.items[key]) for key in ranked[:limit]]
+
+    def summary(self, key, now):
+        a = self.items.get(key)
+        if a is None:
+            return None
+        return {
+            'comments': a.total,
+            'last_hour': a.windows[WINDOW_INDEX['hour']].expire(now),
+            'last_day': a.windows[WINDOW_INDEX['day']].expire(now),
+            'score': round(a.score(now), 4),
+            'last_comment_at': (datetime.fromtimestamp(a.last, timezone.utc).isoformat().replace('+00:00', 'Z')
+                                if a.last is not None else None),
+        }
+
+
+class ActivityTracker:
+    # parsed state saved by state_snapshot, restored only along with the comment store's
+    SNAPSHOT_FIELDS = ('bills', 'users', 'cursor')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bills = Leaderboard()
+        self.users = Leaderboard()
+        self.comments = None    # the comment store counted from
+        self.cursor = None      # its since() cursor for the comments counted so far
+
+    # counted from the comment store's state, so it matches exactly when that state does
+    def snapshot_signature(self):
+        return self.comments.snapshot_signature()
+
+    def snapshot_matches(self, sig):
+        return self.comments is not None and self.comments.snapshot_matches(sig)
+
+    def rebuild(self, comments):
+        """Recompute from ``(bill_id, comment)`` pairs; the cursor is left to the caller."""
+        bills, users = Leaderboard(), Leaderboard()
+        now = time.time()
+        for bill_id, c in comments:
+            t = to_epoch(c.get('ts'))
+            bills.record(bill_id, t, now)
+            users.record(c.get('user'), t, now)
+        bills.rank()
+        users.rank()
+        self.bills, self.users = bills, users
+
+    def sync(self, comments, restored=False):
+        """Count ``comments`` (a comment store) at startup.
+
+        ``restored``: this state came from the snapshot along with the
+        store's, so only the comments it has gained since are folded in.
+        """
+        with self._lock:
+            self.comments = comments
+            if not restored:
+                self.cursor = None
+            self._catch_up()
+
+    def _catch_up(self):
+        # caller holds the lock
+        if self.comments is None:
+            return
+        cursor, rebuilt, rows = self.comments.since(self.cursor)
+        if rebuilt:
+            self.rebuild(rows)
+        else:
+            for bill_id, c in rows:
+                t = to_epoch(c.get('ts'))
+                self.bills.record(bill_id, t)
+                self.users.record(c.get('user'), t)
+        self.cursor = cursor
+
+    def top(self, kind, window, limit):
+        """[{key, comments, last_hour, last_day, score, last_comment_at}] for 'bills' or 'users'."""
+        with self._lock:
+            self._catch_up()
+            now = time.time()
+            board = getattr(self, kind)
+            return [dict(board.summary(key, now), key=key) for key, _ in board.top(window, limit, now)]
+
+    def summary(self, kind, key):
+        with self._lock:
+            self._catch_up()
+            return getattr(self, kind).summary(key, time.time())
+
+
+ACTIVITY = ActivityTracker()
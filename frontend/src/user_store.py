@@ -0,0 +1,253 @@
+"""users.json-backed user directory: {username: {"password", "is_admin"}}.
+
+The file is parsed once into a dict, so logins and duplicate checks are
+O(1) lookups. Each request only stats the file to notice changes made by
+other workers. When a file only grew (same inode, larger size), just the
+new tail is parsed. Accounts are held as slotted ``User`` records under
+interned names; ``get()`` and ``items()`` hand out the plain dict form.
+
+Signups don't rewrite the document. New entries are written over the
+closing brace, formatted exactly as ``json.dump(..., indent=2)`` would
+format them, so users.json stays valid, readable JSON. Signups that arrive
+together share one write and one fsync through the group-commit writer.
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+from persistence import WRITER, atomic_write, dump_json, file_lock
+
+# seeded when users.json is missing or unreadable
+DEFAULT_USERS = {
+    'admin': {'password': '1234', 'is_admin': True}
+}
+
+# every entry appended by JsonUserStore starts with this, which lets a torn append be cut off
+ENTRY_SEPARATOR = b',\n  "'
+
+
+def _default_users():
+    return {name: dict(u) for name, u in DEFAULT_USERS.items()}
+
+
+class User:
+    """One account, held in slots rather than a dict; ``as_dict()`` gives the users.json form."""
+
+    __slots__ = ('password', 'is_admin', 'extra')
+
+    def __init__(self, record):
+        record = dict(record)
+        self.password = record.pop('password', None)
+        self.is_admin = record.pop('is_admin', False)
+        self.extra = record or None
+
+    def as_dict(self):
+        d = {'password': self.password, 'is_admin': self.is_admin}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+
+def _compact(users):
+    return {sys.intern(name): User(u) for name, u in users.items()}
+
+
+def _sig(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+CLOSING = b'\n}\n'
+
+
+def _insertion_point(data):
+    # offset just past the last entry, i.e. before the whitespace and "}" that close the document
+    end = len(data.rstrip())
+    if not end or data[end - 1:end] != b'}':
+        raise ValueError('users file does not end with a JSON object')
+    return len(data[:end - 1].rstrip())
+
+
+def _format_entries(users, first):
+    # '{\n  "name": {...}\n}' -> '\n  "name": {...}', then separate from existing entries
+    inner = json.dumps(users, ensure_ascii=False, indent=2).encode('utf-8')[1:-2]
+    return (b'' if first else b',') + inner + CLOSING
+
+
+class JsonUserStore:
+    # parsed state saved by state_snapshot
+    SNAPSHOT_FIELDS = ('_users', '_sig', '_end')
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._users = {}
+        self._sig = None
+        self._end = 0  # insertion point for new entries as of self._sig
+
+    # -- loading ---------------------------------------------------------
+
+    def load(self):
+        with self._lock:
+            self._full_load()
+
+    def snapshot_sources(self):
+        return [self.path]
+
+    def _read(self):
+        """(signature, contents) of the file; (None, None) if it does not exist."""
+        try:
+            with open(self.path, 'rb') as fh:
+                st = os.fstat(fh.fileno())
+                return (st.st_ino, st.st_size, st.st_mtime_ns), fh.read()
+        except FileNotFoundError:
+            return None, None
+
+    def _full_load(self):
+        sig, data = self._read()
+        users = self._parse(data)
+        if users is None:
+            # Missing, torn by a signup in progress, or damaged. Signups rewrite the end of the
+            # file in place, so look again under the lock: only a file no writer is in the middle
+            # of may be repaired, set aside or seeded.
+            with file_lock(self.path):
+                sig, data = self._read()
+                users = self._parse(data)
+                if users is None:
+                    sig, data, users = self._repair(data)
+        self._users, self._sig, self._end = _compact(users), sig, _insertion_point(data)
+
+    @staticmethod
+    def _parse(data):
+        """The users in ``data``, or None if it is missing or not a complete document."""
+        if data is None:
+            return None
+        try:
+            users = json.loads(data)
+            _insertion_point(data)
+        except ValueError:
+            return None
+        return users if isinstance(users, dict) else None
+
+    def _repair(self, data):
+        """Rewrite an unreadable or missing file. Caller holds the file lock."""
+        users = self._recover(data) if data is not None else None
+        if users is None:
+            if data is not None:
+                # unreadable: keep it for inspection instead of overwriting accounts
+                os.replace(self.path, f'{self.path}.corrupt-{int(time.time())}')
+            # seed admin user if missing
+            users = _default_users()
+        data = dump_json(users)
+        try:
+            atomic_write(self.path, data)
+            sig = _sig(self.path)
+        except Exception:
+            sig = None
+        return sig, data, users
+
+    @staticmethod
+    def _recover(data):
+        text = data.decode('utf-8', errors='replace')
+        try:
+            # a complete document followed by junk
+            users, _ = json.JSONDecoder().raw_decode(text.lstrip())
+            return users if isinstance(users, dict) else None
+        except ValueError:
+            pass
+        # a crash mid-append leaves a torn last entry; drop it and keep the rest
+        cut = data.rfind(ENTRY_SEPARATOR)
+        if cut == -1:
+            return None
+        try:
+            return json.loads(data[:cut] + CLOSING)
+        except ValueError:
+            return None
+
+    def _refresh(self):
+        """Pick up changes made by other processes. Caller holds the lock."""
+        sig = _sig(self.path)
+        if sig == self._sig:
+            return
+        if sig and self._sig and sig[0] == self._sig[0] and sig[1] > self._sig[1]:
+            # appended by another worker: parse only the new entries
+            try:
+                with open(self.path, 'rb') as fh:
+                    fh.seek(self._end)
+                    tail = fh.read()
+                body = tail.lstrip()
+                body = body[1:] if body.startswith(b',') else body
+                new = json.loads(b'{' + body)
+                self._users.update(_compact(new))
+                self._sig = sig
+                self._end += _insertion_point(tail)
+                return
+            except ValueError:
+                pass
+        self._full_load()
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if self._sig is None:
+                self._full_load()
+            else:
+                self._refresh()
+
+    # -- reads -----------------------------------------------------------
+
+    def get(self, username):
+        self._ensure_fresh()
+        u = self._users.get(username)
+        return u.as_dict() if u is not None else None
+
+    def exists(self, username):
+        self._ensure_fresh()
+        return username in self._users
+
+    def __len__(self):
+        self._ensure_fresh()
+        return len(self._users)
+
+    def items(self):
+        self._ensure_fresh()
+        with self._lock:
+            return [(name, u.as_dict()) for name, u in self._users.items()]
+
+    # -- writes ----------------------------------------------------------
+
+    def add(self, username, password, is_admin=False):
+        """Create an account. Returns False if the username is taken."""
+        if self.exists(username):
+            return False
+        return WRITER.submit(('append', self.path), self._append_batch,
+                             (username, {'password': password, 'is_admin': is_admin}))
+
+    def _append_batch(self, items):
+        with self._lock, file_lock(self.path):
+            if self._sig is None:
+                self._full_load()
+            else:
+                self._refresh()
+            new = {}
+            results = []
+            for username, record in items:
+                taken = username in self._users or username in new
+                if not taken:
+                    new[username] = record
+                results.append(not taken)
+            if new:
+                with open(self.path, 'r+b') as fh:
+                    fh.seek(self._end)
+                    fh.write(_format_entries(new, first=not self._users))
+                    fh.truncate()
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                    self._end = fh.tell() - len(CLOSING)
+                self._users.update(_compact(new))
+                self._sig = _sig(self.path)
+        return results
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test that the token buckets answer 429 with Retry-After once a client's burst is spent
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from flask import Flask, jsonify, session  # noqa: E402
+
+import admission  # noqa: E402
+from admission import Admission, Policy, Rejected, TokenBuckets  # noqa: E402
+
+
+def test_bucket_refill():
+    """A bucket holds ``burst`` tokens, refills at the per-minute rate and reports the wait"""
+    print("\n=== Testing Token Bucket ===")
+    buckets = TokenBuckets(max_keys=2)
+    # 30 per minute: one token every 2 seconds, at most 3 saved up
+    assert [buckets.take('a', 30, 3, 100.0) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('a', 30, 3, 100.0) == 2.0
+    assert buckets.take('a', 30, 3, 101.5) == 0.5
+    assert buckets.take('a', 30, 3, 102.0) == 0
+    # a long pause refills only up to the burst
+    assert [buckets.take('a', 30, 3, 1000.0) for _ in range(4)] == [0, 0, 0, 2.0]
+    # the least recently used key is evicted once max_keys is exceeded, and starts full again
+    buckets.take('b', 30, 3, 1000.0)
+    buckets.take('c', 30, 3, 1000.0)
+    assert len(buckets) == 2
+    assert buckets.take('a', 30, 3, 1000.0) == 0
+    print("✓ Refill, wait and eviction as configured")
+
+
+def test_admit_rejects_with_retry_after():
+    """Per-IP and per-user buckets both apply; a rejection carries 429 and whole seconds to wait"""
+    print("\n=== Testing Admission Rate Limit ===")
+    gate = Admission({'write': Policy(6, 2, 60, 1, 4, 0)})
+    for _ in range(2):
+        gate.admit('write', '10.0.0.1')
+        gate.release('write')
+    try:
+        gate.admit('write', '10.0.0.1')
+    except Rejected as e:
+        print(f"Rejected: {e.status} {e.reason}, retry after {e.retry_after}s")
+        assert (e.status, e.reason, e.retry_after) == (429, 'rate', 10)
+    else:
+        raise AssertionError('the third request was admitted')
+    # another address has its own bucket, but the same user is limited across addresses
+    gate.admit('write', '10.0.0.2', user='alice')
+    gate.release('write')
+    try:
+        gate.admit('write', '10.0.0.3', user='alice')
+    except Rejected as e:
+        assert (e.status, e.retry_after) == (429, 1)
+    else:
+        raise AssertionError("alice's second request was admitted")
+    assert gate.stats()['rejected'][('write', 'rate')] == 2
+    assert gate.stats()['admitted']['write'] == 3
+    print("✓ Rejected per IP and per user")
+
+
+def test_route_returns_429():
+    """A rate-limited POST gets a 429 JSON body and Retry-After header; GETs are never limited"""
+    print("\n=== Testing 429 Response ===")
+    app = Flask(__name__)
+    app.secret_key = 'test'
+
+    @app.route('/login', methods=['GET', 'POST'])
+    def login():
+        session['user'] = 'alice'
+        return jsonify({'success': True})
+
+    admission.init_app(app)
+    saved = admission.ADMISSION
+    admission.ADMISSION = Admission({'auth': Policy(20, 3, None, None, 4, 0)})
+    try:
+        client = app.test_client()
+        statuses = [client.post('/login').status_code for _ in range(4)]
+        assert statuses == [200, 200, 200, 429]
+        resp = client.post('/login')
+        print(f"Status {resp.status_code}, Retry-After {resp.headers.get('Retry-After')}, body {resp.get_json()}")
+        assert resp.status_code == 429
+        assert resp.headers['Retry-After'] == '3'
+        assert resp.get_json() == {'error': 'too many requests, slow down', 'retry_after': 3}
+        assert all(client.get('/login').status_code == 200 for _ in range(5))
+        # another client address is not affected
+        assert client.post('/login', environ_base={'REMOTE_ADDR': '10.9.9.9'}).status_code == 200
+        # every admitted request gave its concurrency slot back
+        assert admission.ADMISSION.stats()['in_flight'] == {'auth': 0}
+    finally:
+        admission.ADMISSION = saved
+    print("✓ 429 with Retry-After; reads untouched")
+
+
+if __name__ == '__main__':
+    test_bucket_refill()
+    test_admit_rejects_with_retry_after()
+    test_route_returns_429()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test BillIndex prefix search and cursor paging
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from bill_index import BillIndex, format_bill_line  # noqa: E402
+
+BILLS = [
+    ('Clean Water Act', 'Protects rivers and lakes', 'Environment'),
+    ('Solar Credit Act', 'Tax credits for solar panels', 'Environment/Energy'),
+    ('School Lunch Act', 'Funds school meals', 'Education'),
+    ('Water Rights Act', 'Settles water disputes', 'Agriculture'),
+    ('Teacher Pay Act', 'Raises teacher salaries', 'Education'),
+]
+
+
+def open_index(tmp, bills=BILLS):
+    path = os.path.join(tmp, 'billsList.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('# header comment\n')
+        for i, (title, description, category) in enumerate(bills, 1):
+            f.write(format_bill_line(f'B{i:03d}', title, description, category))
+    return BillIndex(path)
+
+
+def ids(page):
+    return [bill['id'] for bill in page]
+
+
+def test_prefix_search():
+    """Every word must prefix-match a word of the id, title, description or category"""
+    print("\n=== Testing Prefix Search ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = open_index(tmp)
+        assert ids(index.query('wat')[0]) == ['B001', 'B004']
+        assert ids(index.query('wat dis')[0]) == ['B004']
+        assert ids(index.query('ENERG')[0]) == ['B002']
+        assert ids(index.query('b003')[0]) == ['B003']
+        assert index.query('ater') == ([], None, 0)
+        assert ids(index.query('act', category='education')[0]) == ['B003', 'B005']
+        # a category with a slash is also reachable through each part
+        assert ids(index.query(category='energy')[0]) == ['B002']
+        assert ids(index.query(category='Environment')[0]) == ['B001', 'B002']
+        print("✓ Prefix, multi-word and category filters match")
+
+
+def test_cursor_paging():
+    """Following next_cursor visits every match once, in file order"""
+    print("\n=== Testing Cursor Paging ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = open_index(tmp, [(f'Act {i}', f'Bill number {i}', 'General') for i in range(23)])
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor, total = index.query('act', limit=5, cursor=cursor)
+            assert total == 23
+            seen.extend(ids(page))
+            pages += 1
+            if cursor is None:
+                break
+            assert cursor == page[-1]['id']
+        print(f"Pages: {pages}, bills: {len(seen)}")
+        assert pages == 5
+        assert seen == [f'B{i:03d}' for i in range(1, 24)]
+        try:
+            index.query('act', cursor='B999')
+        except KeyError:
+            pass
+        else:
+            raise AssertionError('an unknown cursor was accepted')
+        print("✓ Every bill seen once; unknown cursor rejected")
+
+
+def test_added_bills_are_searchable():
+    """Bills appended through add_many are found without a re-parse, and the cursor stays valid"""
+    print("\n=== Testing Search After add_many ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        index = open_index(tmp)
+        page, cursor, _ = index.query('act', limit=3)
+        assert ids(page) == ['B001', 'B002', 'B003']
+        results = index.add_many([
+            {'title': 'Wind Farm Act', 'description': 'Offshore turbines', 'category': 'Energy'},
+            {'title': 'clean  water act', 'description': 'Duplicate', 'category': 'Environment'},
+        ])
+        assert results == [('B006', None), (None, 'B001')]
+        assert ids(index.query('turb')[0]) == ['B006']
+        page, cursor, total = index.query('act', limit=3, cursor=cursor)
+        assert (ids(page), cursor, total) == (['B004', 'B005', 'B006'], None, 6)
+        # a fresh index parsing the file agrees
+        assert ids(BillIndex(index.path).query('turb')[0]) == ['B006']
+        print("✓ New bill found by prefix and reached by the old cursor")
+
+
+if __name__ == '__main__':
+    test_prefix_search()
+    test_cursor_paging()
+    test_added_bills_are_searchable()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test that bulk bill ingestion reports bad CSV/JSONL rows by line and stores the rest
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from bill_index import BillIndex, format_bill_line  # noqa: E402
+from bill_ingest import MAX_FIELD_CHARS, format_for, ingest  # noqa: E402
+
+
+def open_bills(tmp):
+    path = os.path.join(tmp, 'billsList.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(format_bill_line('B001', 'Clean Water Act', 'Protects rivers', 'Environment'))
+    return BillIndex(path)
+
+
+def errors_by_line(report):
+    return {e['line']: e['error'] for e in report['errors']}
+
+
+def test_csv_rows_are_checked_one_by_one():
+    """Bad CSV rows are rejected with their line number; the good ones are added with contiguous ids"""
+    print("\n=== Testing CSV Ingest ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        bills = open_bills(tmp)
+        data = ('\ufefftitle,description,category\n'            # 1: header, with a byte order mark
+                'Solar Credit Act,Tax credits for panels,Energy\n'  # 2
+                'No Description Act,,Energy\n'                  # 3
+                'clean water act,Same title as B001,\n'         # 4
+                'School Lunch Act,Funds meals,\n'               # 5: category defaults
+                '"Two Line Act","first\nsecond",Misc\n'         # 6-7
+                'Dash — Act,Title has a dash,Misc\n'            # 8
+                f'Long Act,{"x" * (MAX_FIELD_CHARS + 1)},Misc\n'  # 9
+                'solar credit act,Repeat within the batch,Energy\n'  # 10
+                ).encode('utf-8') + b'Bad Bytes Act,\xff\xfe,Misc\n'  # 11
+        report = ingest(bills, io.BytesIO(data), 'csv')
+        print(f"Created: {report['created']}")
+        assert report['rows'] == 9
+        assert report['created'] == [{'line': 2, 'id': 'B002', 'title': 'Solar Credit Act'},
+                                     {'line': 5, 'id': 'B003', 'title': 'School Lunch Act'}]
+        errors = errors_by_line(report)
+        print(f"Errors: {errors}")
+        assert errors == {
+            3: 'title and description required',
+            4: 'duplicate title (existing bill B001)',
+            7: 'fields must be single-line',
+            8: 'title, description or category contains characters that cannot be stored',
+            9: f'description is longer than {MAX_FIELD_CHARS} characters',
+            10: 'duplicate title (existing bill B002)',
+            11: 'description is not valid UTF-8',
+        }
+        assert bills.get('B003')['category'] == 'General'
+        # the file reads back the same bills
+        assert [b['id'] for b in BillIndex(bills.path).bills()] == ['B001', 'B002', 'B003']
+        print("✓ Good rows stored, bad rows reported by line")
+
+
+def test_csv_header_and_syntax_errors():
+    """A missing header column rejects the file; a CSV syntax error stops at its line"""
+    print("\n=== Testing CSV Header And Syntax ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        bills = open_bills(tmp)
+        report = ingest(bills, io.BytesIO(b'name,description\nA,B\n'), 'csv')
+        assert report == {'rows': 1, 'created': [],
+                          'errors': [{'line': 1, 'error': 'CSV header must include title'}]}
+        huge = b'title,description\nFirst Act,Fine\nHuge Act,' + b'y' * 200000 + b'\nLast Act,Never read\n'
+        report = ingest(bills, io.BytesIO(huge), 'csv')
+        assert [c['id'] for c in report['created']] == ['B002']
+        assert len(report['errors']) == 1 and report['errors'][0]['error'].startswith('malformed CSV')
+        assert bills.get('B003') is None
+        print("✓ Header and syntax errors reported")
+
+
+def test_jsonl_errors():
+    """Invalid JSON, non-objects and non-string fields are rejected per line; blank lines are skipped"""
+    print("\n=== Testing JSONL Ingest ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        bills = open_bills(tmp)
+        lines = [
+            json.dumps({'title': 'Wind Act', 'description': 'Turbines', 'category': 'Energy'}),  # 1
+            '{"title": "Broken", ',                                                              # 2
+            '',                                                                                   # 3
+            json.dumps(['Wind Act', 'not an object']),                                           # 4
+            json.dumps({'title': 'Number Act', 'description': 42}),                              # 5
+            json.dumps({'title': 'Line Act', 'description': 'a\rb'}),                            # 6
+            json.dumps({'title': 'Roads Act', 'description': 'Potholes', 'extra': 'ignored'}),   # 7
+        ]
+        report = ingest(bills, io.BytesIO('\n'.join(lines).encode('utf-8')), 'jsonl')
+        assert report['rows'] == 6
+        assert [(c['line'], c['id']) for c in report['created']] == [(1, 'B002'), (7, 'B003')]
+        errors = errors_by_line(report)
+        print(f"Errors: {errors}")
+        assert errors[2].startswith('invalid JSON')
+        assert errors[4] == 'each line must be a JSON object'
+        assert errors[5] == 'description must be a string'
+        assert errors[6] == 'fields must be single-line'
+        assert set(errors) == {2, 4, 5, 6}
+        assert bills.get('B003') == {'id': 'B003', 'title': 'Roads Act', 'description': 'Potholes',
+                                     'category': 'General'}
+        print("✓ Bad lines reported, good lines stored")
+
+
+def test_format_detection():
+    """The format comes from the Content-Type, else from the file extension"""
+    print("\n=== Testing Format Detection ===")
+    assert format_for('text/csv; charset=utf-8') == 'csv'
+    assert format_for('application/x-ndjson') == 'jsonl'
+    assert format_for(None, 'session.NDJSON') == 'jsonl'
+    assert format_for('application/octet-stream', 'bills.csv') == 'csv'
+    assert format_for('application/json', 'bills.txt') is None
+    print("✓ Formats detected")
+
+
+if __name__ == '__main__':
+    test_csv_rows_are_checked_one_by_one()
+    test_csv_header_and_syntax_errors()
+    test_jsonl_errors()
+    test_format_detection()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test that CommentStore tails other workers' appends and survives compaction and reloads
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from comment_store import CommentStore  # noqa: E402
+
+
+def open_store(tmp):
+    # compact_ratio=0: only explicit compact() calls fold the log
+    return CommentStore(os.path.join(tmp, 'comments.jsonl'), os.path.join(tmp, 'comments.snapshot.json'),
+                        compact_ratio=0)
+
+
+def texts(store, bill_id):
+    return [c['text'] for c in store.get(bill_id)]
+
+
+def test_tail_other_workers_appends():
+    """Appends made through another store show up on the next read, a torn last line only once complete"""
+    print("\n=== Testing Log Tailing ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        mine, other = open_store(tmp), open_store(tmp)
+        mine.append('B001', 'first', 'alice')
+        other.append('B001', 'second', 'bob')
+        other.append('B002', 'elsewhere', 'bob')
+        assert texts(mine, 'B001') == ['first', 'second']
+        summary = mine.summaries(['B001', 'B002', 'B003'], newest=1)
+        assert summary['B001']['count'] == 2
+        assert summary['B001']['latest'] == [{'text': 'second', 'user': 'bob'}]
+        assert summary['B003'] == {'count': 0, 'latest': []}
+
+        # a writer that crashed mid-line: the half record is neither read nor kept
+        with open(mine.log_path, 'ab') as f:
+            f.write(b'{"seq": 4, "bill": "B001", "te')
+        assert texts(mine, 'B001') == ['first', 'second']
+        other.append('B001', 'third', 'carol')
+        assert texts(mine, 'B001') == ['first', 'second', 'third']
+        with open(mine.log_path, 'rb') as f:
+            seqs = [json.loads(line)['seq'] for line in f]
+        print(f"Log sequence numbers: {seqs}")
+        assert seqs == [1, 2, 3, 4]
+        print("✓ Tail picked up, torn line replaced")
+
+
+def test_compaction_folds_the_log():
+    """compact() moves every record into the snapshot; a fresh load sees the same comments"""
+    print("\n=== Testing Compaction ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = open_store(tmp)
+        for i in range(10):
+            store.append(f'B00{i % 2}', f'comment {i}', 'alice')
+        before = {bill: store.get(bill) for bill in ('B000', 'B001')}
+        saved_log = os.path.join(tmp, 'saved.jsonl')
+        shutil.copy(store.log_path, saved_log)
+        store.compact()
+        assert os.path.getsize(store.log_path) == 0
+        with open(store.snapshot_path) as f:
+            assert json.load(f)['last_seq'] == 10
+        store.append('B000', 'after compaction', 'bob')
+
+        fresh = open_store(tmp)
+        assert fresh.get('B001') == before['B001']
+        assert fresh.get('B000') == before['B000'] + [{'text': 'after compaction', 'user': 'bob'}]
+
+        # a crash between the snapshot rename and the log truncation leaves folded records
+        # in the log; their sequence numbers are skipped on replay
+        with open(saved_log, 'rb') as f:
+            folded = f.read()
+        with open(store.log_path, 'rb') as f:
+            tail = f.read()
+        with open(store.log_path, 'wb') as f:
+            f.write(folded + tail)
+        replayed = open_store(tmp)
+        counts = {bill: len(replayed.get(bill)) for bill in ('B000', 'B001')}
+        print(f"Counts after replaying folded records: {counts}")
+        assert counts == {'B000': 6, 'B001': 5}
+        print("✓ Snapshot holds everything, folded records not replayed twice")
+
+
+def test_reload_after_another_worker_compacts():
+    """A store whose files were compacted underneath it reloads and keeps appending in sequence"""
+    print("\n=== Testing Reload After Compaction ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        mine, other = open_store(tmp), open_store(tmp)
+        mine.append('B001', 'one', 'alice')
+        mine.append('B001', 'two', 'alice')
+        other.load()
+        other.append('B002', 'three', 'bob')
+        other.compact()
+        other.append('B001', 'four', 'bob')
+        generation = mine._generation
+        assert texts(mine, 'B001') == ['one', 'two', 'four']
+        assert texts(mine, 'B002') == ['three']
+        assert mine._generation == generation + 1
+        mine.append('B002', 'five', 'alice')
+        with open(mine.log_path, 'rb') as f:
+            assert [json.loads(line)['seq'] for line in f] == [4, 5]
+        assert texts(open_store(tmp), 'B002') == ['three', 'five']
+        print("✓ Reloaded once, sequence numbers continue")
+
+
+if __name__ == '__main__':
+    test_tail_other_workers_appends()
+    test_compaction_folds_the_log()
+    test_reload_after_another_worker_compacts()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test that MappedTextBuffer reads back what was appended, across growth, fork and pickling
+"""
+import os
+import pickle
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+import compact  # noqa: E402
+from compact import MIN_MAPPED_CAPACITY, MappedTextBuffer, TextBuffer  # noqa: E402
+
+SAMPLES = ['plain', '', 'naïve café', '议会法案', 'emoji 🗳️', 'lone \udc80 surrogate']
+
+
+def fill(buf, texts):
+    return [(buf.append(t), t) for t in texts]
+
+
+def test_reads_match_appends():
+    """Every (offset, length) reads back its own text, as in TextBuffer"""
+    print("\n=== Testing Mapped Reads ===")
+    mapped, plain = MappedTextBuffer(), TextBuffer()
+    for (loc, text), (plain_loc, _) in zip(fill(mapped, SAMPLES), fill(plain, SAMPLES)):
+        assert loc == plain_loc, text
+        assert mapped.get(*loc) == plain.get(*loc) == text
+    assert len(mapped) == len(plain)
+    print("✓ Same offsets and texts as TextBuffer")
+
+
+def test_growth_with_concurrent_readers():
+    """Reads stay correct while appends grow the file past its mapped capacity"""
+    print("\n=== Testing Growth ===")
+    buf = MappedTextBuffer()
+    chunk = 'x' * 4096 + '🗳'
+    written = [buf.append(chunk)]
+    errors = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            for loc in list(written):
+                if buf.get(*loc) != chunk:
+                    errors.append(loc)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for t in readers:
+        t.start()
+    while len(buf) < 3 * MIN_MAPPED_CAPACITY:
+        written.append(buf.append(chunk))
+    done.set()
+    for t in readers:
+        t.join()
+    print(f"Appended {len(written)} chunks, {len(buf)} bytes, capacity {buf._capacity}")
+    assert not errors, errors[:5]
+    assert buf._capacity >= len(buf)
+    assert all(buf.get(*loc) == chunk for loc in written)
+    print("✓ Every chunk read back during and after growth")
+
+
+def test_forked_child_appends_privately():
+    """A forked worker appends to its own copy; the parent's buffer is unchanged"""
+    print("\n=== Testing Fork ===")
+    if not hasattr(os, 'fork'):
+        print("(skipped: no fork on this platform)")
+        return
+    buf = MappedTextBuffer()
+    before = fill(buf, SAMPLES)
+    size = len(buf)
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            mine = buf.append('child only')
+            ok = buf.get(*mine) == 'child only' and all(buf.get(*loc) == text for loc, text in before)
+        finally:
+            os.write(w, b'1' if ok else b'0')
+            os._exit(0)
+    os.close(w)
+    child_ok = os.read(r, 1)
+    os.close(r)
+    os.waitpid(pid, 0)
+    assert child_ok == b'1'
+    assert len(buf) == size
+    loc = buf.append('parent only')
+    assert loc[0] == size and buf.get(*loc) == 'parent only'
+    assert all(buf.get(*loc) == text for loc, text in before)
+    print("✓ Child and parent each see only their own appends")
+
+
+def test_pickle_round_trip():
+    """Both buffers pickle as bytes and come back as the configured kind with the same contents"""
+    print("\n=== Testing Pickle ===")
+    mapped = MappedTextBuffer()
+    locs = fill(mapped, SAMPLES)
+    saved = compact.MMAP_TEXT
+    try:
+        for setting, kind in ((False, TextBuffer), (True, MappedTextBuffer)):
+            compact.MMAP_TEXT = setting
+            for source in (mapped, pickle.loads(pickle.dumps(mapped))):
+                restored = pickle.loads(pickle.dumps(source))
+                assert type(restored) is kind
+                assert all(restored.get(*loc) == text for loc, text in locs)
+        compact.MMAP_TEXT = True
+        assert len(pickle.loads(pickle.dumps(MappedTextBuffer()))) == 0
+    finally:
+        compact.MMAP_TEXT = saved
+    print("✓ Contents survive pickling either way")
+
+
+def test_comment_store_on_mapped_text():
+    """The comment store reads the same comments with COMMENTS_TEXT_MMAP on"""
+    print("\n=== Testing Comment Store On Mapped Text ===")
+    from comment_store import CommentStore
+    saved = compact.MMAP_TEXT
+    compact.MMAP_TEXT = True
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = CommentStore(os.path.join(tmp, 'comments.jsonl'), os.path.join(tmp, 'comments.snapshot.json'))
+            for text in SAMPLES[:5]:
+                store.append('B001', text, 'alice')
+            assert isinstance(store._text, MappedTextBuffer)
+            assert [c['text'] for c in store.get('B001')] == SAMPLES[:5]
+            assert [c['text'] for _, c in store.iter_all()] == SAMPLES[:5]
+    finally:
+        compact.MMAP_TEXT = saved
+    print("✓ Comments read back from the mapped buffer")
+
+
+if __name__ == '__main__':
+    test_reads_match_appends()
+    test_growth_with_concurrent_readers()
+    test_forked_child_appends_privately()
+    test_pickle_round_trip()
+    test_comment_store_on_mapped_text()
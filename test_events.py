@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test that event streams replay what a reconnecting client missed (Last-Event-ID)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+import events  # noqa: E402
+from events import RESET, Broker  # noqa: E402
+
+
+def event_ids(data):
+    return [line[4:] for line in data.decode('utf-8').split('\n') if line.startswith('id: ')]
+
+
+def test_replay_after_last_event_id():
+    """A subscriber gets exactly the events of its channel published after its Last-Event-ID"""
+    print("\n=== Testing Replay From Last-Event-ID ===")
+    broker = Broker()
+    first = broker.publish('comments:B001', 'comment', {'text': 'one'})
+    seen = broker.position()
+    broker.publish('comments:B002', 'comment', {'text': 'other bill'})
+    missed = [broker.publish('comments:B001', 'comment', {'text': t}) for t in ('two', 'three')]
+    sub = broker.subscribe('comments:B001', seen)
+    prelude = sub.prelude()
+    print(f"Prelude: {prelude!r}")
+    assert prelude.startswith(f'retry: {events.RETRY_MS}\n\n'.encode())
+    assert event_ids(prelude) == [f'{broker.boot}-3', f'{broker.boot}-4']
+    assert b'"text":"three"' in prelude and b'"text":"one"' not in prelude
+    assert [e.seq for e in sub.replay] == [e.seq for e in missed]
+    # nothing published since: an up-to-date client gets no replay, a first connect neither
+    assert broker.subscribe('comments:B001', broker.position()).replay == []
+    assert broker.subscribe('comments:B001').prelude() == f'retry: {events.RETRY_MS}\n\n'.encode()
+    # live events follow the replay without repeating it
+    broker.publish('comments:B001', 'comment', {'text': 'four'})
+    assert event_ids(b''.join(e.data for e in sub.get(0))) == [f'{broker.boot}-5']
+    assert event_ids(first.data) == [f'{broker.boot}-1']
+    print("✓ Missed events replayed once, in order")
+
+
+def test_reset_when_events_are_gone():
+    """Ids from another boot, from the future or older than the replay buffer get a reset event"""
+    print("\n=== Testing Reset ===")
+    broker = Broker()
+    old = broker.position()
+    for i in range(events.SSE_REPLAY_SIZE + 1):
+        broker.publish('publishes', 'publish', {'id': i})
+    assert broker.subscribe('publishes', old).reset
+    for stale in ('0-1', f'{broker.boot}-999999', 'garbage'):
+        sub = broker.subscribe('publishes', stale)
+        assert sub.reset and sub.prelude().endswith(RESET), stale
+    # the oldest event still buffered can be resumed from
+    resumable = broker.subscribe('publishes', f'{broker.boot}-1')
+    assert not resumable.reset and len(resumable.replay) == events.SSE_REPLAY_SIZE
+    print("✓ Unreplayable positions reset the client")
+
+
+def test_stream_route_replays_from_header():
+    """GET /api/publishes/stream sends the missed events first, using the header or the query parameter"""
+    print("\n=== Testing Stream Route ===")
+    import app as app_module
+    client = app_module.app.test_client()
+    broker = app_module.EVENTS
+    position = broker.position()
+    broker.publish('publishes', 'publish', {'id': 'missed'})
+    expected = [broker.position()]
+    for kwargs in ({'headers': {'Last-Event-ID': position}}, {'query_string': {'last_event_id': position}}):
+        resp = client.get('/api/publishes/stream', buffered=False, **kwargs)
+        try:
+            assert resp.status_code == 200 and resp.mimetype == 'text/event-stream'
+            assert resp.headers['Cache-Control'] == 'no-cache'
+            prelude = next(iter(resp.response))
+            assert event_ids(prelude) == expected, prelude
+        finally:
+            resp.close()
+    assert broker.stats()['thread_streams'] == 0
+    print("✓ Route replays the missed event and frees its slot on close")
+
+
+if __name__ == '__main__':
+    test_replay_after_last_event_id()
+    test_reset_when_events_are_gone()
+    test_stream_route_replays_from_header()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test that one failing mutation in a group-commit batch does not sink the others
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from persistence import GroupCommitWriter  # noqa: E402
+
+
+def test_failing_mutation_rolls_back_alone():
+    """The raising caller gets its exception; its batch neighbours still commit"""
+    print("\n=== Testing Failing Mutation In A Batch ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'doc.json')
+        # a long window so all three submissions land in one batch
+        writer = GroupCommitWriter(window=0.2)
+        outcomes = {}
+
+        def set_key(name):
+            def mutate(doc):
+                doc[name] = True
+                return name
+            return mutate
+
+        def bad(doc):
+            doc['bad'] = True
+            raise ValueError('rejected')
+
+        def submit(name, mutate):
+            try:
+                outcomes[name] = writer.update_json(path, mutate)
+            except Exception as e:
+                outcomes[name] = e
+
+        threads = [threading.Thread(target=submit, args=('a', set_key('a'))),
+                   threading.Thread(target=submit, args=('bad', bad)),
+                   threading.Thread(target=submit, args=('b', set_key('b')))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with open(path) as f:
+            doc = json.load(f)
+        print(f"Outcomes: {outcomes}, on disk: {doc}")
+        assert writer.stats()['flushes'] == 1
+        assert outcomes['a'] == 'a' and outcomes['b'] == 'b'
+        assert isinstance(outcomes['bad'], ValueError)
+        assert doc == {'a': True, 'b': True}
+        assert writer.stats()['errors'] == 1
+        print("✓ Only the failing mutation was rolled back")
+
+
+def test_lone_failing_mutation_writes_nothing():
+    """A batch of one that raises leaves the file as it was"""
+    print("\n=== Testing Lone Failing Mutation ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'doc.json')
+        writer = GroupCommitWriter(window=0)
+        writer.update_json(path, lambda doc: doc.update(kept=1))
+
+        def bad(doc):
+            doc.clear()
+            raise KeyError('boom')
+
+        try:
+            writer.update_json(path, bad)
+        except KeyError:
+            pass
+        else:
+            raise AssertionError('the mutation error was not raised')
+        with open(path) as f:
+            assert json.load(f) == {'kept': 1}
+        print("✓ File unchanged")
+
+
+if __name__ == '__main__':
+    test_failing_mutation_rolls_back_alone()
+    test_lone_failing_mutation_writes_nothing()
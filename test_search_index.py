@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test the BM25 ranking of the publishes search index
+"""
+import math
+import os
+import pickle
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from publish_repository import PublishRepository  # noqa: E402
+from search_index import InvertedIndex  # noqa: E402
+
+
+def ranked(index, query):
+    return [doc_id for doc_id, _ in index.search(query)]
+
+
+def test_bm25_score():
+    """A single-term score equals the BM25 formula worked out by hand"""
+    print("\n=== Testing BM25 Score ===")
+    index = InvertedIndex(k1=1.2, b=0.75, title_weight=2)
+    index.add(1, 'Solar', 'panels on every roof')     # solar: tf 2 (title), length 6
+    index.add(2, 'Wind', 'turbines and solar farms')  # solar: tf 1, length 6
+    index.add(3, 'Budget', 'the annual budget')       # length 5
+    avgdl = 17 / 3
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+
+    def bm25(tf, dl):
+        return idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * dl / avgdl))
+
+    scores = dict(index.search('solar'))
+    print(f"Scores: {scores}")
+    assert set(scores) == {1, 2}
+    assert math.isclose(scores[1], bm25(2, 6))
+    assert math.isclose(scores[2], bm25(1, 6))
+    print("✓ Scores match the formula")
+
+
+def test_ranking_order():
+    """Title hits and short documents rank higher; every word must match"""
+    print("\n=== Testing Ranking Order ===")
+    index = InvertedIndex()
+    index.add('title', 'Healthcare reform', 'a plan for the country')
+    index.add('body', 'A plan for the country', 'healthcare reform')
+    index.add('long', 'Notes', 'healthcare ' + 'filler words about other topics ' * 20)
+    index.add('other', 'Tax reform', 'lower rates for everyone')
+    assert ranked(index, 'healthcare') == ['title', 'body', 'long']
+    assert ranked(index, 'reform healthcare') == ['title', 'body']
+    # two title hits: the shorter document goes first
+    assert ranked(index, 'reform') == ['other', 'title', 'body']
+    assert ranked(index, 'healthcare taxes') == []
+    # words are matched as prefixes, so a query typed halfway already finds them
+    assert ranked(index, 'heal ref') == ['title', 'body']
+    assert ranked(index, '') == []
+    print("✓ Order follows title weight and length")
+
+
+def test_updates_and_pickling():
+    """Re-adding a document replaces it, removing drops its terms, and pickling keeps the index"""
+    print("\n=== Testing Index Updates ===")
+    index = InvertedIndex()
+    index.add(1, 'Water', 'clean rivers')
+    index.add(2, 'Water', 'dams')
+    index.add(1, 'Roads', 'new highways')
+    assert ranked(index, 'water') == [2]
+    assert ranked(index, 'high') == [1]
+    index.remove(2)
+    assert ranked(index, 'water') == []
+    assert index._vocab == ['highways', 'new', 'roads']
+    restored = pickle.loads(pickle.dumps(index))
+    restored.add(3, 'Highway tolls', 'pricing')
+    assert ranked(restored, 'highway') == [3, 1]
+    print("✓ Replaced, removed and restored")
+
+
+def test_repository_search():
+    """PublishRepository.search returns records best first and filters by type"""
+    print("\n=== Testing Publish Search ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = PublishRepository(os.path.join(tmp, 'publishes.json'), os.path.join(tmp, 'counter.txt'))
+        repo.seed([
+            {'id': 1, 'title': 'Budget news', 'content': 'climate spending', 'type': 'Article',
+             'timestamp': '2024-01-01T00:00:00Z'},
+            {'id': 2, 'title': 'Climate plan', 'content': 'what it means', 'type': 'Blog',
+             'timestamp': '2024-01-02T00:00:00Z'},
+        ])
+        assert [p['id'] for p in repo.search('clim')] == [2, 1]
+        assert [p['id'] for p in repo.search('clim', 'article')] == [1]
+        new = repo.add('Climate march', 'thousands attend', 'Article')
+        assert [p['id'] for p in repo.search('march')] == [new['id']] == [3]
+        print("✓ Repository search ranks, filters and sees new publishes")
+
+
+if __name__ == '__main__':
+    test_bm25_score()
+    test_ranking_order()
+    test_updates_and_pickling()
+    test_repository_search()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test that the SQLite backend answers every repository call like the file backend
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from bill_index import format_bill_line  # noqa: E402
+from storage.file_backend import FileStorage  # noqa: E402
+from storage.migrate import main as migrate  # noqa: E402
+from storage.sqlite_backend import SQLiteStorage  # noqa: E402
+
+CATEGORIES = ['Environment/Energy', 'Education', 'Health', 'Tax Policy']
+WORDS = ['water', 'solar', 'school', 'hospital', 'tax', 'credit', 'rural', 'urban', 'reform', 'fund']
+
+
+def write_data(tmp):
+    with open(os.path.join(tmp, 'users.json'), 'w') as f:
+        json.dump({'admin': {'password': '1234', 'is_admin': True},
+                   'alice': {'password': 'pw', 'is_admin': False}}, f)
+    with open(os.path.join(tmp, 'billsList.txt'), 'w', encoding='utf-8') as f:
+        for i in range(1, 41):
+            title = f'{WORDS[i % 10].title()} {WORDS[i * 3 % 10].title()} Act {i}'
+            f.write(format_bill_line(f'B{i:03d}', title, f'About {WORDS[i * 7 % 10]} programs',
+                                     CATEGORIES[i % 4]))
+    with open(os.path.join(tmp, 'comments.jsonl'), 'w') as f:
+        for seq in range(1, 61):
+            f.write(json.dumps({'seq': seq, 'bill': f'B{seq % 7 + 1:03d}', 'text': f'comment {seq}',
+                                'user': ['alice', 'bob', 'carol'][seq % 3], 'ts': f'2024-01-01T00:00:{seq:02d}Z'})
+                    + '\n')
+    with open(os.path.join(tmp, 'publishes.json'), 'w') as f:
+        json.dump([{'id': i, 'title': f'{WORDS[i % 10].title()} update', 'content': f'news on {WORDS[i * 3 % 10]}',
+                    'type': 'Article' if i % 2 else 'Blog', 'timestamp': f'2024-02-{i:02d}T00:00:00Z'}
+                   for i in range(1, 13)], f)
+
+
+def open_pair(tmp):
+    write_data(tmp)
+    db = os.path.join(tmp, 'political_app.db')
+    assert migrate(['--source', tmp, '--db', db]) == 0
+    files = FileStorage(tmp, snapshot=False)
+    files.load()
+    sqlite = SQLiteStorage(db)
+    sqlite.load()
+    return files, sqlite
+
+
+def all_pages(bills, q, category, limit):
+    pages, cursor = [], None
+    while True:
+        page, cursor, total = bills.query(q, category, limit, cursor)
+        pages.append(([b['id'] for b in page], cursor, total))
+        if cursor is None:
+            return pages
+
+
+def comments_by_bill(comments):
+    out = {}
+    for bill_id, c in comments.iter_all():
+        out.setdefault(bill_id, []).append(c)
+    return out
+
+
+def assert_same(files, sqlite):
+    assert sorted(files.users.items()) == sorted(sqlite.users.items())
+    assert files.users.get('alice') == sqlite.users.get('alice')
+    assert files.bills.bills() == sqlite.bills.bills() == list(sqlite.bills.iter_all())
+    assert files.bills.payload() == sqlite.bills.payload()
+    assert files.bills.get('B007') == sqlite.bills.get('B007')
+    for q, category, limit in [('', '', 50), ('', '', 7), ('wat', '', 3), ('act sol', '', 2),
+                               ('', 'energy', 4), ('tax', 'tax policy', 5), ('b01', '', 4), ('nomatch', '', 5)]:
+        assert all_pages(files.bills, q, category, limit) == all_pages(sqlite.bills, q, category, limit), \
+            (q, category, limit)
+
+    bill_ids = [f'B{i:03d}' for i in range(1, 10)]
+    for bill_id in bill_ids:
+        assert files.comments.get(bill_id) == sqlite.comments.get(bill_id)
+    assert files.comments.summaries(bill_ids, 2) == sqlite.comments.summaries(bill_ids, 2)
+    assert comments_by_bill(files.comments) == comments_by_bill(sqlite.comments)
+
+    assert files.publishes.records == sqlite.publishes.records
+    for ptype, offset, limit in [('', 0, None), ('', 3, 4), ('blog', 0, 2), ('ARTICLE', 1, None), ('none', 0, 5)]:
+        assert files.publishes.newest(ptype, offset, limit) == sqlite.publishes.newest(ptype, offset, limit)
+    for q, ptype in [('water', ''), ('upd', 'blog'), ('news sch', ''), ('zzz', '')]:
+        # FTS5 weighs title and content as separate columns, so only the matches must agree
+        assert sorted(p['id'] for p in files.publishes.search(q, ptype)) == \
+            sorted(p['id'] for p in sqlite.publishes.search(q, ptype)), (q, ptype)
+
+
+def test_migrated_data_reads_the_same():
+    """After storage.migrate every read returns what the file backend returns"""
+    print("\n=== Testing Backend Reads ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        files, sqlite = open_pair(tmp)
+        try:
+            assert_same(files, sqlite)
+        finally:
+            sqlite.close()
+        print("✓ Users, bills, comments and publishes match")
+
+
+def test_writes_keep_backends_in_step():
+    """The same writes through both backends leave them answering the same"""
+    print("\n=== Testing Backend Writes ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        files, sqlite = open_pair(tmp)
+        try:
+            for storage in (files, sqlite):
+                assert storage.users.add('dave', 'pw') is True
+                assert storage.users.add('alice', 'other') is False
+                assert storage.bills.add('Wind Power Act', 'Offshore turbines', 'Environment/Energy') == 'B041'
+                assert storage.bills.add_many([
+                    {'title': 'Rural Clinics Act', 'description': 'More clinics', 'category': 'Health'},
+                    {'title': 'wind  power act', 'description': 'Again', 'category': 'Energy'},
+                ]) == [('B042', None), (None, 'B041')]
+                storage.comments.append('B041', 'first on wind', 'dave')
+                storage.comments.append('B001', 'late comment', 'alice')
+                new = storage.publishes.add('Turbine news', 'wind farms', 'Blog')
+                assert new['id'] == 13
+            assert_same_after_writes(files, sqlite)
+        finally:
+            sqlite.close()
+        print("✓ Both backends agree after the same writes")
+
+
+def without_ts(rows):
+    # records written during the test carry the current time, which differs between the two
+    return [{k: v for k, v in row.items() if k not in ('ts', 'timestamp')} for row in rows]
+
+
+def assert_same_after_writes(files, sqlite):
+    assert sorted(files.users.items()) == sorted(sqlite.users.items())
+    assert files.bills.payload() == sqlite.bills.payload()
+    assert all_pages(files.bills, 'turb', '', 5) == all_pages(sqlite.bills, 'turb', '', 5) == [(['B041'], None, 1)]
+    assert all_pages(files.bills, 'act', '', 9) == all_pages(sqlite.bills, 'act', '', 9)
+    assert all_pages(files.bills, '', 'health', 3) == all_pages(sqlite.bills, '', 'health', 3)
+    files_comments, sqlite_comments = comments_by_bill(files.comments), comments_by_bill(sqlite.comments)
+    assert files_comments.keys() == sqlite_comments.keys()
+    for bill_id in files_comments:
+        assert without_ts(files_comments[bill_id]) == without_ts(sqlite_comments[bill_id])
+    assert files.comments.get('B041') == sqlite.comments.get('B041') == [{'text': 'first on wind', 'user': 'dave'}]
+    assert without_ts(files.publishes.records) == without_ts(sqlite.publishes.records)
+    assert without_ts(files.publishes.newest('blog', 0, 3)[0]) == without_ts(sqlite.publishes.newest('blog', 0, 3)[0])
+    assert [p['id'] for p in files.publishes.search('turb')] == [13]
+    assert [p['id'] for p in sqlite.publishes.search('turb')] == [13]
+
+
+if __name__ == '__main__':
+    test_migrated_data_reads_the_same()
+    test_writes_keep_backends_in_step()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test that the trending counters follow comments posted through other workers
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from comment_store import CommentStore  # noqa: E402
+from trending import ActivityTracker  # noqa: E402
+
+
+def open_store(tmp):
+    # compact_ratio=0: only explicit compact() calls fold the log
+    return CommentStore(os.path.join(tmp, 'comments.jsonl'), os.path.join(tmp, 'comments.snapshot.json'),
+                        compact_ratio=0)
+
+
+def totals(tracker, kind):
+    return {row['key']: row['comments'] for row in tracker.top(kind, 'score', 100)}
+
+
+def test_comments_from_other_workers_are_counted():
+    """Two stores on the same files stand in for two gunicorn workers"""
+    print("\n=== Testing Trending Across Workers ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        mine, other = open_store(tmp), open_store(tmp)
+        mine.load()
+        other.load()
+        tracker = ActivityTracker()
+        tracker.sync(mine)
+        mine.append('B001', 'first', 'alice')
+        other.append('B002', 'from the other worker', 'bob')
+        other.append('B002', 'again', 'bob')
+        print(f"Bills: {totals(tracker, 'bills')}, users: {totals(tracker, 'users')}")
+        assert totals(tracker, 'bills') == {'B002': 2, 'B001': 1}
+        assert totals(tracker, 'users') == {'bob': 2, 'alice': 1}
+        # reading again must not count anything twice
+        assert totals(tracker, 'bills') == {'B002': 2, 'B001': 1}
+        print("✓ Other worker's comments counted once")
+
+
+def test_reload_after_compaction_recounts():
+    """Another worker compacts, this store reloads and renumbers; the counts stay exact"""
+    print("\n=== Testing Trending After Another Worker Compacts ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        mine, other = open_store(tmp), open_store(tmp)
+        for i in range(5):
+            mine.append(f'B00{i % 3}', f'comment {i}', 'alice')
+        tracker = ActivityTracker()
+        tracker.sync(mine)
+        assert sum(totals(tracker, 'bills').values()) == 5
+        other.load()
+        other.append('B009', 'before compaction', 'bob')
+        other.compact()
+        other.append('B001', 'after compaction', 'bob')
+        bills = totals(tracker, 'bills')
+        print(f"Bills: {bills}")
+        assert bills == {'B000': 2, 'B001': 3, 'B002': 1, 'B009': 1}
+        assert totals(tracker, 'users') == {'alice': 5, 'bob': 2}
+        print("✓ Counts match the store after the reload")
+
+
+if __name__ == '__main__':
+    test_comments_from_other_workers_are_counted()
+    test_reload_after_compaction_recounts()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test that signups survive other workers reading users.json at the same time
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'frontend', 'src'))
+
+from user_store import JsonUserStore  # noqa: E402
+
+
+def test_signups_alongside_reads():
+    """Signups through one store while other stores keep re-reading the file"""
+    print("\n=== Testing Signups Alongside Reads ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.json')
+        writer = JsonUserStore(path)
+        writer.load()
+        done = threading.Event()
+        errors = []
+
+        def read():
+            # a separate store per thread, like a separate worker process
+            reader = JsonUserStore(path)
+            while not done.is_set():
+                try:
+                    reader.load()
+                    reader.get('admin')
+                except Exception as e:
+                    errors.append(e)
+
+        def sign_up(worker):
+            for i in range(100):
+                writer.add(f'user{worker}_{i}', 'pw')
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        writers = [threading.Thread(target=sign_up, args=(w,)) for w in range(4)]
+        for t in readers + writers:
+            t.start()
+        for t in writers:
+            t.join()
+        done.set()
+        for t in readers:
+            t.join()
+
+        with open(path) as f:
+            on_disk = json.load(f)
+        missing = [f'user{w}_{i}' for w in range(4) for i in range(100) if f'user{w}_{i}' not in on_disk]
+        print(f"Users on disk: {len(on_disk)}, missing: {len(missing)}, reader errors: {len(errors)}")
+        fresh = JsonUserStore(path)
+        fresh.load()
+        assert not errors, errors
+        assert not missing, missing[:10]
+        assert len(fresh) == len(on_disk) == 401
+        print("✓ No signup was lost")
+
+
+def test_torn_append_is_recovered():
+    """A crash mid-append leaves a torn last entry; the earlier accounts are kept"""
+    print("\n=== Testing Torn Append Recovery ===")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.json')
+        store = JsonUserStore(path)
+        store.load()
+        store.add('alice', 'pw')
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(data.rstrip()[:-1] + b',\n  "bob": {\n    "passw')
+        store = JsonUserStore(path)
+        store.load()
+        assert store.get('alice') == {'password': 'pw', 'is_admin': False}
+        assert store.get('bob') is None
+        with open(path) as f:
+            assert 'alice' in json.load(f)
+        print("✓ Torn entry dropped, alice kept, file repaired")
+
+
+if __name__ == '__main__':
+    test_signups_alongside_reads()
+    test_torn_append_is_recovered()